@@ -0,0 +1,64 @@
+import hashlib
+import os
+
+import pygame
+
+# Nedskalerede billeder gemmes her, så de store PNG'er kun skal dekodes første gang
+ASSET_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".asset_cache")
+
+_hashes = {}
+_loaded = {}
+
+
+def file_hash(path):
+    """SHA-1 af kildefilen. Genberegnes kun hvis filen er ændret siden sidst."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    digest = _hashes.get(key)
+    if digest is None:
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _hashes[key] = digest
+    return digest
+
+
+def cache_path(path, size, flip_x=False):
+    name = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    suffix = "-flip" if flip_x else ""
+    return os.path.join(ASSET_CACHE_DIR, f"{name}-{file_hash(path)[:16]}-{size[0]}x{size[1]}{suffix}.png")
+
+
+def load_scaled(path, size, flip_x=False):
+    """Henter path skaleret til size (og evt. spejlet), fra disk-cachen hvis den findes."""
+    size = (int(size[0]), int(size[1]))
+    cached = cache_path(path, size, flip_x)
+    image = _loaded.get(cached)
+    if image is not None:
+        return image
+
+    if os.path.exists(cached):
+        image = pygame.image.load(cached)
+    else:
+        image = pygame.transform.scale(pygame.image.load(path), size)
+        if flip_x:
+            image = pygame.transform.flip(image, True, False)
+        try:
+            os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+            pygame.image.save(image, cached)
+        except (OSError, pygame.error):
+            # Uden skriveadgang virker spillet stadig, bare uden cache
+            pass
+
+    # convert_alpha kræver et vindue
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha()
+        _loaded[cached] = image
+    return image
+
+
+def load_sprite(path, size):
+    """Returnerer (højrevendt, venstrevendt) udgave af et spillerbillede."""
+    return load_scaled(path, size), load_scaled(path, size, flip_x=True)
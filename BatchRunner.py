@@ -0,0 +1,152 @@
+"""Spiller mange headless kampe på alle CPU-kerner og samler statistik til balance-test.
+
+    python BatchRunner.py --matches 2000 --policy random
+    python BatchRunner.py --matches 500 --policy chase --bomb-timer 2500 --csv kampe.csv
+
+Viser sejre efter startside, kamplængde, fald mod bombedrab og hvor meget af
+banen der er tilbage over tid.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from Policies import POLICIES
+from Simulation import BOMB_TIMER, EXPLOSION_RADIUS, FPS, JUMP_STRENGTH, GameState
+
+MAX_TICKS = FPS * 60 * 5  # Kampe der ikke er afgjort efter 5 minutter tæller som uafgjort
+SAMPLE_TICKS = FPS * 5  # Hvor tit platformene tælles
+
+
+# KAMPE
+def play_match(job):
+    """Spiller én kamp. Køres i en worker-proces, så alt ind og ud er simple værdier."""
+    seed, policy_names, rules, max_ticks = job
+    rng = random.Random(seed)
+    game = GameState(**rules)
+    policies = [POLICIES[name](random.Random(rng.random())) for name in policy_names]
+
+    tiles_start = int(game.map.tiles.sum())
+    survival = []
+    while game.winner is None and game.tick < max_ticks:
+        game.step([policy(game, index) for index, policy in enumerate(policies)])
+        if game.tick % SAMPLE_TICKS == 0:
+            survival.append(int(game.map.tiles.sum()) / tiles_start if tiles_start else 0.0)
+
+    winner = game.winner
+    return {
+        "seed": seed,
+        "winner": winner,
+        "winner_spawn_x": game.players[winner].start_x if winner is not None else None,
+        "ticks": game.tick,
+        "falls": sum(1 for _, cause, _ in game.events if cause == "fall"),
+        "bomb_kills": sum(1 for _, cause, _ in game.events if cause == "bomb"),
+        "platforms_left": int(game.map.tiles.sum()) / tiles_start if tiles_start else 0.0,
+        "survival": survival,
+    }
+
+
+def run_matches(matches, policy_names, rules, seed=0, max_ticks=MAX_TICKS, workers=None):
+    jobs = [(seed + number, policy_names, rules, max_ticks) for number in range(matches)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [play_match(job) for job in jobs]
+    else:
+        chunksize = max(1, matches // (workers * 8))
+        with multiprocessing.Pool(workers) as pool:
+            results = list(pool.imap_unordered(play_match, jobs, chunksize))
+    results.sort(key=lambda result: result["seed"])
+    return results
+
+
+# STATISTIK
+def summarize(results):
+    decided = [result for result in results if result["winner"] is not None]
+    summary = {
+        "matches": len(results),
+        "decided": len(decided),
+        "average_ticks": sum(result["ticks"] for result in results) / len(results) if results else 0.0,
+        "wins_by_spawn_x": {},
+        "falls": sum(result["falls"] for result in results),
+        "bomb_kills": sum(result["bomb_kills"] for result in results),
+        "survival": [],
+    }
+    for result in decided:
+        spawn_x = result["winner_spawn_x"]
+        summary["wins_by_spawn_x"][spawn_x] = summary["wins_by_spawn_x"].get(spawn_x, 0) + 1
+
+    # Gennemsnit af platforme tilbage for de kampe der stadig kørte på tidspunktet
+    longest = max((len(result["survival"]) for result in results), default=0)
+    for sample in range(longest):
+        values = [result["survival"][sample] for result in results if len(result["survival"]) > sample]
+        summary["survival"].append(((sample + 1) * SAMPLE_TICKS, sum(values) / len(values), len(values)))
+    return summary
+
+
+def print_summary(summary, elapsed):
+    matches = summary["matches"]
+    decided = summary["decided"]
+    print(f"Kampe: {matches}  afgjort: {decided}  uafgjort: {matches - decided}  ({elapsed:.1f} s)")
+    average = summary["average_ticks"]
+    print(f"Gennemsnitlig kamplængde: {average:.0f} ticks ({average / FPS:.1f} s)")
+
+    print("Sejre efter startside:")
+    for spawn_x, wins in sorted(summary["wins_by_spawn_x"].items()):
+        print(f"  start x={spawn_x:<5} {wins:>6}  {wins / decided:6.1%}")
+
+    deaths = summary["falls"] + summary["bomb_kills"]
+    if deaths:
+        print(f"Dødsårsager: fald {summary['falls']} ({summary['falls'] / deaths:.1%}), "
+              f"bombe {summary['bomb_kills']} ({summary['bomb_kills'] / deaths:.1%})")
+
+    if summary["survival"]:
+        print("Platforme tilbage over tid:")
+        print(f"  {'tid':>6}  {'tilbage':>8}  {'kampe':>6}")
+        for tick, left, count in summary["survival"]:
+            print(f"  {tick / FPS:5.0f}s  {left:8.1%}  {count:6}")
+
+
+def write_csv(path, results):
+    fields = ["seed", "winner", "winner_spawn_x", "ticks", "falls", "bomb_kills", "platforms_left"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spil mange headless kampe og vis balance-statistik.")
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random",
+                        help="hvordan begge spillere styres")
+    parser.add_argument("--policy2", choices=sorted(POLICIES), default=None,
+                        help="anden policy til spiller 2 (standard: samme som --policy)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for første kamp; kamp n bruger seed + n")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument("--workers", type=int, default=None, help="antal processer (standard: alle kerner)")
+    parser.add_argument("--bomb-timer", type=int, default=BOMB_TIMER, help="millisekunder før en bombe springer")
+    parser.add_argument("--explosion-radius", type=int, default=EXPLOSION_RADIUS)
+    parser.add_argument("--jump-strength", type=float, default=JUMP_STRENGTH)
+    parser.add_argument("--chain-reactions", action="store_true", help="bomber i en eksplosion springer også")
+    parser.add_argument("--csv", default=None, help="skriv en linje pr. kamp til denne fil")
+    args = parser.parse_args()
+
+    policy_names = (args.policy, args.policy2 or args.policy)
+    rules = {"bomb_timer": args.bomb_timer, "explosion_radius": args.explosion_radius,
+             "jump_strength": args.jump_strength, "chain_reactions": args.chain_reactions}
+
+    start = time.perf_counter()
+    results = run_matches(args.matches, policy_names, rules, args.seed, args.max_ticks, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print_summary(summarize(results), elapsed)
+    if args.csv:
+        write_csv(args.csv, results)
+        print(f"Skrev {len(results)} kampe til {args.csv}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
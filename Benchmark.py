@@ -0,0 +1,360 @@
+"""Benchmarks for spillets varme stier, med baseline og regressionsgrænse.
+
+Kører headless (SDL's dummy-driver) og viser ops/s og percentiler for hver
+måling. Resultatet sammenlignes med benchmark_baseline.json, og en måling der
+er mere end --threshold langsommere (median) end baselinen tæller som en
+regression (exit-kode 1).
+
+    python Benchmark.py --save-baseline     # først: gem en baseline for denne maskine
+    python Benchmark.py                     # alle målinger mod baselinen
+    python Benchmark.py --filter bomb       # kun målinger med "bomb" i navnet
+
+Baselinen afhænger af maskinen og ligger derfor ikke i git (se .gitignore).
+Gem en ny på den maskine der sammenlignes på, fx før en ændring.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import importlib.util
+import itertools
+import json
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pygame
+
+from LevelGenerator import random_tiles
+from Levels import LEVEL_DIR, load_level
+from Map import PlatformGrid, span_rect
+from Policies import ChasePolicy
+from Replay import INPUT_TABLE
+from Simulation import (COLUMNS, ROWS, SCREEN_HEIGHT, SCREEN_WIDTH, TILE_HEIGHT, TILE_WIDTH, Bomb, GameState,
+                        Map)
+from World import CHUNK_HEIGHT, CHUNK_WIDTH, load_world
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "benchmark_baseline.json")
+THRESHOLD = 0.25  # 25 % langsommere end baselinen er en regression
+SECONDS = 0.5  # Tid pr. måling
+MIN_SAMPLES = 30
+WARMUP = 5
+
+
+def load_frontend():
+    """'Bombs in main.py' har mellemrum i navnet og kan ikke importeres med import."""
+    spec = importlib.util.spec_from_file_location("bombs_in_main", os.path.join(HERE, "Bombs in main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def random_platforms(rng, count):
+    platforms = []
+    for _ in range(count):
+        col = rng.randrange(COLUMNS)
+        row = rng.randrange(1, ROWS - 2)
+        span = (col, row, min(COLUMNS, col + rng.randint(1, 4)), row + 1)
+        platforms.append(span_rect(span, TILE_WIDTH, TILE_HEIGHT))
+    return platforms
+
+
+# MÅLINGER
+# Hver måling returnerer (op, before): op tages tid på, before (eller None) køres
+# uden tidtagning før hver prøve.
+def player_update(count):
+    def setup():
+        game = GameState()
+        platforms = random_platforms(random.Random(count), count)
+        game.map.set_terrain(game.map.tiles, platforms, PlatformGrid(TILE_WIDTH, TILE_HEIGHT, platforms))
+        player = game.players[0]
+        rng = random.Random(1)
+        inputs = itertools.cycle([INPUT_TABLE[rng.randrange(16)] for _ in range(1024)])
+        return lambda: player.update(next(inputs), game), None
+    return setup
+
+
+def bomb_update(count):
+    """update_bombs med count bomber i luften. Bomber der er landet koster intet (se
+    GameState.falling), så de sættes tilbage og vækkes før hver prøve."""
+    def setup():
+        game = GameState()
+        game.bomb_fuse_ticks = 1 << 30  # Ingen eksplosioner, kun fald og kollision
+        rng = random.Random(count)
+        for _ in range(count):
+            game.drop_bomb(rng.randrange(SCREEN_WIDTH), rng.randrange(SCREEN_HEIGHT - 50))
+        starts = [bomb.rect.topleft for bomb in game.bombs]
+
+        def before():
+            for bomb, start in zip(game.bombs, starts):
+                bomb.rect.topleft = start
+                if not bomb.falling:
+                    bomb.falling = True
+                    game.falling.append(bomb)
+
+        return game.update_bombs, before
+    return setup
+
+
+def bomb_explode():
+    game = GameState()
+    start = game.map.snapshot()
+    targets = [platform.center for platform in game.map.platforms]
+    rng = random.Random(0)
+    bomb = Bomb()
+
+    def before():
+        game.map.restore(start)
+        bomb.reset(*rng.choice(targets), game.tick)
+
+    return lambda: bomb.explode(game), before
+
+
+def map_load():
+    game_map = Map()
+    return game_map.load_map, None
+
+
+def map_load_compiled():
+    game_map = Map(load_level(os.path.join(LEVEL_DIR, "01-bombs.json")))
+    return game_map.load_map, None
+
+
+def map_view(full):
+    def setup():
+        frontend = load_frontend()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        view = frontend.MapView(GameState().map)
+        view.draw(screen)
+        if full:
+            return view.render, None
+        return lambda: view.draw(screen), None
+    return setup
+
+
+def game_step(player_count=None):
+    """Et tick med bots for alle spillere. Med player_count en arena (se GameState.add_player)."""
+    def setup():
+        game = GameState(player_count=player_count)
+        policies = [ChasePolicy(random.Random(index)) for index in range(len(game.players))]
+
+        def op():
+            game.step([policy(game, index) for index, policy in enumerate(policies)])
+            if game.winner is not None:
+                game.reset()
+        return op, None
+    return setup
+
+
+def headless_frame(bomb_count=0):
+    """Et helt frame som i main(): tick, sprites, bane, HUD og flip.
+
+    Med bomb_count holdes så mange bomber i spil hele tiden (nye smides tilfældigt
+    ind når andre springer), med kædereaktioner slået til.
+    """
+    def setup():
+        frontend = load_frontend()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        game = GameState(chain_reactions=bomb_count > 0)
+        start = game.map.snapshot()
+        rng = random.Random(bomb_count)
+        policies = [ChasePolicy(random.Random(index)) for index in range(len(game.players))]
+        view = frontend.MapView(game.map)
+        sprites = pygame.sprite.Group(frontend.PlayerSprite(game.players[0], "Boneca Ambalabu.png"),
+                                      frontend.PlayerSprite(game.players[1], "Frigo Camelo.png"))
+        bombs_group = pygame.sprite.Group()
+        bomb_pool = frontend.BombPool(frontend.load_scaled("bombeRealistic.png", (20, 20)), bombs_group)
+        font = pygame.font.SysFont(None, 36)
+        labels = [frontend.ScoreLabel(font, "P1 Score: ", (10, 10)),
+                  frontend.ScoreLabel(font, "P2 Score: ", (SCREEN_WIDTH - 140, 10))]
+        hud = pygame.sprite.Group(labels)
+
+        def op():
+            for sprite in sprites:
+                sprite.remember()
+            bomb_pool.remember()
+            while len(game.bombs) < bomb_count:
+                game.drop_bomb(rng.randrange(SCREEN_WIDTH), rng.randrange(SCREEN_HEIGHT - 100))
+            game.step([policy(game, index) for index, policy in enumerate(policies)])
+            if game.winner is not None:
+                game.reset()
+            if bomb_count and game.tick % 600 == 0:
+                # Banen bygges op igen, så bomberne har noget at lande på
+                game.map.restore(start)
+            bomb_pool.sync(game.bombs)
+            sprites.update()
+            bombs_group.update()
+            for label, player in zip(labels, game.players):
+                label.set_value(player.score)
+            view.draw(screen)
+            sprites.draw(screen)
+            bombs_group.draw(screen)
+            hud.draw(screen)
+            pygame.display.flip()
+        return op, None
+    return setup
+
+
+def world_frame(screens_x, screens_y):
+    """Et frame i en verden på screens_x x screens_y skærme, med et kamera der glider hen over den.
+
+    Kameraet flytter sig en halv bid pr. frame, så nye bidder læses ind og
+    tegnes hele tiden. Tiden skal være den samme uanset hvor stor verdenen er.
+    """
+    def setup():
+        frontend = load_frontend()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        rng = np.random.default_rng(screens_x * screens_y)
+        rows = np.vstack([np.hstack([random_tiles(rng) for _ in range(screens_x)]) for _ in range(screens_y)])
+        path = os.path.join(tempfile.gettempdir(), f"benchmark-world-{screens_x}x{screens_y}.txt")
+        with open(path, "w") as f:
+            f.write("\n".join("".join("X" if tile else "." for tile in row) for row in rows))
+        world = load_world(path)
+        game = GameState(world, world.spawn_points)
+        policies = [ChasePolicy(random.Random(index)) for index in range(len(game.players))]
+        camera = frontend.Camera(game.map.bounds())
+        view = frontend.WorldView(game.map)
+        sprites = pygame.sprite.Group(frontend.player_sprites(game))
+        route = itertools.cycle([(x, y) for y in range(CHUNK_HEIGHT, world.height - CHUNK_HEIGHT, CHUNK_HEIGHT * 3)
+                                 for x in range(0, world.width, CHUNK_WIDTH // 2)])
+
+        def op():
+            game.step([policy(game, index) for index, policy in enumerate(policies)])
+            if game.winner is not None:
+                game.reset()
+            sprites.update()
+            camera.rect.topleft = next(route)
+            camera.rect.clamp_ip(camera.bounds)
+            game.map.prefetch(camera.rect.inflate(CHUNK_WIDTH, CHUNK_HEIGHT))
+            view.draw(screen, camera)
+            frontend.draw_shifted(sprites, screen, camera)
+            pygame.display.flip()
+        return op, None
+    return setup
+
+
+CASES = [
+    ("player_update_100", player_update(100), 100),
+    ("player_update_1000", player_update(1000), 100),
+    ("player_update_10000", player_update(10000), 100),
+    ("bomb_update_1", bomb_update(1), 1),
+    ("bomb_update_10", bomb_update(10), 1),
+    ("bomb_update_100", bomb_update(100), 1),
+    ("bomb_update_500", bomb_update(500), 1),
+    ("bomb_explode", bomb_explode, 1),
+    ("map_load", map_load, 1),
+    ("map_load_compiled", map_load_compiled, 10),
+    ("map_draw", map_view(False), 1),
+    ("map_render_full", map_view(True), 1),
+    ("game_step", game_step(), 10),
+    ("arena_step_16", game_step(16), 1),
+    ("headless_frame", headless_frame(), 1),
+    ("bomb_stress_500", headless_frame(500), 1),
+    ("world_frame_30", world_frame(10, 3), 1),
+    ("world_frame_100", world_frame(10, 10), 1),
+]
+
+# Målinger der er et helt frame og skal kunne holde 60 FPS (p99 i mikrosekunder)
+FRAME_BUDGET_US = 1e6 / 60
+FRAME_CASES = ("headless_frame", "bomb_stress_500", "world_frame_30", "world_frame_100")
+
+
+# KØRSEL
+def measure(op, before=None, batch=1, seconds=SECONDS, min_samples=MIN_SAMPLES):
+    """Tid pr. op i mikrosekunder, en prøve pr. batch, sorteret."""
+    for _ in range(WARMUP):
+        if before is not None:
+            before()
+        op()
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while len(samples) < min_samples or time.perf_counter() < deadline:
+        if before is not None:
+            before()
+        start = time.perf_counter_ns()
+        for _ in range(batch):
+            op()
+        samples.append((time.perf_counter_ns() - start) / batch / 1000)
+    samples.sort()
+    return samples
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def summarize(samples):
+    p50 = percentile(samples, 0.5)
+    return {"ops_per_sec": round(1e6 / p50 if p50 else 0.0, 1), "p50_us": round(p50, 3),
+            "p95_us": round(percentile(samples, 0.95), 3), "p99_us": round(percentile(samples, 0.99), 3),
+            "max_us": round(samples[-1], 3), "samples": len(samples)}
+
+
+def run(cases, seconds=SECONDS):
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    results = {}
+    for name, setup, batch in cases:
+        op, before = setup()
+        results[name] = summarize(measure(op, before, batch, seconds))
+        yield name, results[name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mål spillets varme stier og sammenlign med baselinen.")
+    parser.add_argument("--filter", default="", help="kør kun målinger med denne tekst i navnet")
+    parser.add_argument("--seconds", type=float, default=SECONDS, help="tid pr. måling")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="tilladt forværring af medianen")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="gem resultatet som ny baseline")
+    parser.add_argument("--json", default=None, help="skriv resultatet til denne fil")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"Ingen baseline i {args.baseline}, kør først python Benchmark.py --save-baseline")
+
+    cases = [case for case in CASES if args.filter in case[0]]
+    print(f"{'måling':22}{'ops/s':>12}{'p50 us':>11}{'p95 us':>11}{'p99 us':>11}{'max us':>11}  baseline")
+    results = {}
+    regressions = []
+    for name, result in run(cases, args.seconds):
+        results[name] = result
+        line = (f"{name:22}{result['ops_per_sec']:12.0f}{result['p50_us']:11.2f}{result['p95_us']:11.2f}"
+                f"{result['p99_us']:11.2f}{result['max_us']:11.2f}")
+        reference = baseline.get(name)
+        if reference:
+            ratio = result["p50_us"] / reference["p50_us"]
+            line += f"  {ratio - 1:+7.1%}"
+            if ratio > 1 + args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        if name in FRAME_CASES and result["p99_us"] > FRAME_BUDGET_US:
+            line += "  OVER 60 FPS"
+            regressions.append(name)
+        print(line, flush=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline gemt i {args.baseline}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if regressions:
+        print(f"{len(regressions)} regression(er) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
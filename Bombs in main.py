@@ -1,17 +1,48 @@
+import os
+import random
+import time
+from collections import OrderedDict
+
 import pygame
 import sys
 
-# Konstanter
-SCREEN_WIDTH = 1000
-SCREEN_HEIGHT = 650
-FPS = 60
-GRAVITY = 0.9
-PLAYER_SIZE = 50
-PLAYER_SPEED = 4
-BOMB_SIZE = 10
-BOMB_SPEED = 3 # Pixels per frame
-EXPLOSION_RADIUS = 30
-BOMB_TIMER = 3000  # Millisekunder før eksplosion
+from Assets import load_scaled, load_sprite
+from LevelGenerator import generate_level
+from Levels import LevelRotation
+from Policies import ChasePolicy
+from Profiler import FrameProfiler, ProfilerOverlay
+from Replay import ReplayRecorder
+from Simulation import (BOMB_SIZE, EXPLOSION_RADIUS, FPS, PLAYER_SIZE, SCREEN_HEIGHT, SCREEN_WIDTH,
+                        GameState, read_input)
+from TextCache import render_text
+from World import CHUNK_HEIGHT, CHUNK_WIDTH, load_world
+
+# Tegn kun de områder der er ændret (pygame.display.update(rects)) i stedet for hele skærmen
+DIRTY_RENDERING = False
+# Spillet simuleres med FPS ticks i sekundet, men tegnes så tit skærmen kan følge med
+RENDER_FPS = 144
+TICK_MS = 1000 / FPS
+# Længere pauser end dette (fx når vinduet flyttes) indhentes ikke
+MAX_FRAME_MS = 250
+# Gem input fra hver kamp i REPLAY_DIR, så den kan afspilles igen med Replay.py
+RECORD_REPLAYS = False
+REPLAY_DIR = "replays"
+# Lav en ny tilfældig bane hver runde (LevelGenerator.py) i stedet for banerne i levels/
+GENERATED_LEVELS = False
+# Tag tid på hver fase af et frame. F3 viser overlayet, F4 gemmer de sidste frames i PROFILE_DIR.
+# Slået fra som standard; start spillet med --profile eller JUMPMAN_PROFILE=1 for at slå det til.
+PROFILE = "--profile" in sys.argv[1:] or os.environ.get("JUMPMAN_PROFILE", "0") not in ("", "0")
+PROFILE_DIR = "profiles"
+# Antal spillere (op til 16). De første LOCAL_PLAYERS styres fra tastaturet, resten er bots.
+ARENA_PLAYERS = 2
+LOCAL_PLAYERS = 2
+# Spring over interpolation ved respawn o.l., så spilleren ikke glider hen over skærmen
+TELEPORT_DISTANCE = 100
+# Spil i en stor verden (World.py) med et kamera der følger spillerne, fx "worlds/01-huler.txt".
+# None = banerne i levels/
+WORLD = None
+CAMERA_SMOOTHING = 0.15  # Hvor stor en del af vejen hen til spillerne kameraet flytter sig pr. frame
+VIEW_LAYERS = 6  # Forudtegnede bidder af verdenen der gemmes (kameraet ser højst 4)
 
 # Farver
 WHITE = (255, 255, 255)
@@ -22,34 +53,27 @@ BTN_BG = (60, 60, 60)
 BTN_BG_HOVER = (90, 90, 90)
 ORANGE = (255, 165, 0)
 
-# LEVEL MAP
-LEVEL_MAP = [
-    "................................................................................",
-    "................XXXX........................................XXXX................",
-    "..........................XXXXXXXX............XXXXXXXX..........................",
-    ".........XXXX......................................................XXXX.........",
-    "XXX..........................................................................XXX",
-    ".................XXXXXXXX..............................XXXXXXXX.................",
-    "................................................................................",
-    "...XXXXXX.........................XXXXXXXXXXXX.........................XXXXXX...",
-    "................................................................................",
-    ".............XXXXXXXX......................................XXXXXXXX.............",
-    "..........XXXX................XXXX............XXXX................XXXX..........",
-    "................................XXXX........XXXX................................",
-    ".....................XXXXXXXX......................XXXXXXXX.....................",
-    "XXXXXXXX................................................................XXXXXXXX",
-    "....................................XXXXXXX.....................................",
-    "................................................................................",
-    "XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX",
-    "................................................................................",
-    "XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX",
-    "................................................................................"
+# Spillere
+PLAYER_IMAGES = ["Boneca Ambalabu.png", "Frigo Camelo.png"]
+# Farvetone til spiller 3 og frem, så spillere med samme billede kan skelnes
+PLAYER_TINTS = [(255, 120, 120), (120, 255, 120), (120, 160, 255), (255, 255, 120), (255, 120, 255),
+                (120, 255, 255), (255, 180, 90), (180, 120, 255), (160, 160, 160)]
+# Taster for de spillere der styres fra tastaturet
+CONTROLS = [
+    {"up": pygame.K_w, "left": pygame.K_a, "right": pygame.K_d, "drop": pygame.K_LSHIFT},
+    {"up": pygame.K_UP, "left": pygame.K_LEFT, "right": pygame.K_RIGHT, "drop": pygame.K_RCTRL},
+    {"up": pygame.K_i, "left": pygame.K_j, "right": pygame.K_l, "drop": pygame.K_SPACE},
+    {"up": pygame.K_KP8, "left": pygame.K_KP4, "right": pygame.K_KP6, "drop": pygame.K_KP0},
 ]
 
-ROWS = len(LEVEL_MAP)
-COLUMNS = len(LEVEL_MAP[0])
-TILE_WIDTH = SCREEN_WIDTH / COLUMNS
-TILE_HEIGHT = SCREEN_HEIGHT / ROWS
+
+def interpolate(previous, current, alpha):
+    """Position mellem forrige og nuværende tick. alpha er hvor langt vi er inde i næste tick."""
+    dx = current[0] - previous[0]
+    dy = current[1] - previous[1]
+    if abs(dx) > TELEPORT_DISTANCE or abs(dy) > TELEPORT_DISTANCE:
+        return current
+    return round(previous[0] + dx * alpha), round(previous[1] + dy * alpha)
 
 
 # STARTSKÆRM
@@ -65,6 +89,9 @@ def show_start_screen(screen, clock):
         "Instruktioner:",
         "Spiller 1: A/D for at gå, W for at hoppe, LSHIFT for at smide bomber",
         "Spiller 2: Venstre/Højre for at gå, Pil op for at hoppe, RCTRL for at smide bomber",
+        *(["Spiller 3: J/L for at gå, I for at hoppe, SPACE for at smide bomber"] if LOCAL_PLAYERS > 2 else []),
+        *(["Spiller 4: Numpad 4/6 for at gå, 8 for at hoppe, 0 for at smide bomber"] if LOCAL_PLAYERS > 3 else []),
+        *([f"Spiller {LOCAL_PLAYERS + 1}-{ARENA_PLAYERS} styres af computeren"] if ARENA_PLAYERS > LOCAL_PLAYERS else []),
         "",
         "Mål: Ramme modstanderen med bombe eller få dem til at at falde ned fra banen.",
         "Første spiller til at nå 3 point vinder.",
@@ -99,7 +126,7 @@ def show_start_screen(screen, clock):
 
         y = start_y
         for line in instructions:
-            surf = text_font.render(line, True, WHITE)
+            surf = render_text(text_font, line, WHITE)
             rect = surf.get_rect(center=(SCREEN_WIDTH // 2, y))
             screen.blit(surf, rect)
             y += line_height
@@ -107,7 +134,7 @@ def show_start_screen(screen, clock):
         mouse_pos = pygame.mouse.get_pos()
         hovered = btn_rect.collidepoint(mouse_pos)
         pygame.draw.rect(screen, BTN_BG_HOVER if hovered else BTN_BG, btn_rect, border_radius=12)
-        btn_text = btn_font.render("START", True, WHITE)
+        btn_text = render_text(btn_font, "START", WHITE)
         btn_text_rect = btn_text.get_rect(center=btn_rect.center)
         screen.blit(btn_text, btn_text_rect)
 
@@ -116,177 +143,304 @@ def show_start_screen(screen, clock):
 
 
 # MAP
-class Map:
-    def __init__(self):
-        self.platforms = []
-        self.ground = None
-        self.load_map()
-
-    def load_map(self):
-        self.platforms.clear()
-        for row_index, row in enumerate(LEVEL_MAP):
-            for col_index, tile in enumerate(row):
-                if tile == "X":
-                    rect = pygame.Rect(col_index * TILE_WIDTH, row_index * TILE_HEIGHT, TILE_WIDTH, TILE_HEIGHT)
-                    self.platforms.append(rect)
-        self.ground = pygame.Rect(0, SCREEN_HEIGHT - TILE_HEIGHT, SCREEN_WIDTH, TILE_HEIGHT)
+class MapView:
+    """Tegner Simulation.Map. Banen ligger forudtegnet i et lag der blittes i et hug."""
+
+    def __init__(self, game_map):
+        self.game_map = game_map
+        game_map.track_changes = True
+        # Forudtegnet baggrund, bund og platforme
+        self.layer = None
+        self.generation = None
+
+    def changed(self):
+        """Sand hvis terrænet er ændret siden sidste draw (så skal hele skærmen opdateres)."""
+        return (self.layer is None or self.generation != self.game_map.generation
+                or bool(self.game_map.dirty_regions))
+
+    def render(self, region=None):
+        """Tegner baggrund, bund og platforme ind i laget, evt. kun inden for region."""
+        game_map = self.game_map
+        if region is None:
+            region = game_map.bounds()
+            platforms = game_map.platforms
+        else:
+            platforms = game_map.nearby(region)
+
+        self.layer.set_clip(region)
+        self.layer.fill(BG_COLOR)
+        if game_map.ground.colliderect(region):
+            pygame.draw.rect(self.layer, GROUND_COLOR, game_map.ground)
+        for platform in platforms:
+            pygame.draw.rect(self.layer, PLATFORM_COLOR, platform)
+        self.layer.set_clip(None)
 
     def draw(self, screen):
-        pygame.draw.rect(screen, GROUND_COLOR, self.ground)
-        for platform in self.platforms:
-            pygame.draw.rect(screen, PLATFORM_COLOR, platform)
+        if self.layer is None:
+            self.layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            if pygame.display.get_surface() is not None:
+                self.layer = self.layer.convert()
+
+        if self.generation != self.game_map.generation:
+            # Ny bane (fx ny runde): hele laget tegnes forfra
+            self.render()
+            self.generation = self.game_map.generation
+        else:
+            # Kun de områder en eksplosion har ændret tegnes igen
+            for region in self.game_map.dirty_regions:
+                self.render(region)
+        self.game_map.dirty_regions.clear()
+
+        # Hele banen (inkl. baggrund) tegnes med en enkelt blit
+        screen.blit(self.layer, (0, 0))
+
+
+# WORLD
+class Camera:
+    """Det udsnit af verdenen der er på skærmen. Følger spillerne blødt og bliver inden for verdenen."""
+
+    def __init__(self, bounds, smoothing=CAMERA_SMOOTHING):
+        self.bounds = bounds
+        self.smoothing = smoothing
+        self.rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.center = None
+
+    def follow(self, rects):
+        """Flytter kameraet et stykke mod midten af rects. Første gang springer det direkte derhen."""
+        x = sum(rect.centerx for rect in rects) / len(rects)
+        y = sum(rect.centery for rect in rects) / len(rects)
+        if self.center is not None:
+            x = self.center[0] + (x - self.center[0]) * self.smoothing
+            y = self.center[1] + (y - self.center[1]) * self.smoothing
+        self.center = (x, y)
+        self.rect.center = (round(x), round(y))
+        self.rect.clamp_ip(self.bounds)
+
+
+class WorldView:
+    """Tegner en stor verden (World.WorldMap) gennem et kamera.
+
+    Hver bid kameraet ser ligger forudtegnet i sit eget lag, som tegnes forfra
+    når en eksplosion ændrer bidden. Der gemmes højst VIEW_LAYERS lag, og et lag
+    der smides ud genbruges til den næste bid.
+    """
+
+    def __init__(self, game_map, capacity=VIEW_LAYERS):
+        self.game_map = game_map
+        self.capacity = capacity
+        self.layers = OrderedDict()  # (cx, cy) -> (tiles laget er tegnet ud fra, lag)
+
+    def render(self, chunk, layer=None):
+        if layer is None:
+            layer = pygame.Surface(chunk.rect.size)
+            if pygame.display.get_surface() is not None:
+                layer = layer.convert()
+        layer.fill(BG_COLOR)
+        ground = self.game_map.ground
+        if ground.colliderect(chunk.rect):
+            pygame.draw.rect(layer, GROUND_COLOR, ground.move(-chunk.rect.x, -chunk.rect.y))
+        for platform in chunk.platforms:
+            pygame.draw.rect(layer, PLATFORM_COLOR, platform.move(-chunk.rect.x, -chunk.rect.y))
+        return layer
+
+    def draw(self, screen, camera):
+        view = camera.rect
+        if not self.game_map.bounds().contains(view):
+            # Verdenen er mindre end skærmen
+            screen.fill(BG_COLOR)
+        for key in self.game_map.chunk_keys(view):
+            chunk = self.game_map.chunk(key)
+            entry = self.layers.get(key)
+            if entry is None or entry[0] is not chunk.tiles:
+                layer = entry[1] if entry is not None else None
+                if layer is None and len(self.layers) >= self.capacity:
+                    _, (_, layer) = self.layers.popitem(last=False)
+                entry = (chunk.tiles, self.render(chunk, layer))
+                self.layers[key] = entry
+            self.layers.move_to_end(key)
+            screen.blit(entry[1], (chunk.rect.x - view.x, chunk.rect.y - view.y))
+
+
+def draw_shifted(sprites, screen, camera):
+    """Som Group.draw, men sprites står i verdens-koordinater. Dem kameraet ikke ser springes over."""
+    view = camera.rect
+    for sprite in sprites:
+        if sprite.rect.colliderect(view):
+            screen.blit(sprite.image, (sprite.rect.x - view.x, sprite.rect.y - view.y))
+
+
+# HUD
+class ScoreLabel(pygame.sprite.DirtySprite):
+    def __init__(self, font, prefix, pos):
+        super().__init__()
+        self.font = font
+        self.prefix = prefix
+        self.pos = pos
+        self.value = None
+        self.set_value(0)
+
+    def set_value(self, value):
+        # Teksten tegnes kun igen når pointene ændres
+        if value == self.value:
+            return
+        self.value = value
+        self.image = render_text(self.font, f"{self.prefix}{value}", WHITE)
+        self.rect = self.image.get_rect(topleft=self.pos)
+        self.dirty = 1
 
 
 # BOMB
-class Bomb(pygame.sprite.Sprite):
-    def __init__(self, x, y, image, game_map, players):
+class BombSprite(pygame.sprite.DirtySprite):
+    def __init__(self, pool):
         super().__init__()
-        self.image = pygame.transform.scale(image, (BOMB_SIZE * 2, BOMB_SIZE * 2))
-        self.rect = self.image.get_rect(center=(x, y))
-        self.spawn_time = pygame.time.get_ticks()
-        self.exploded = False
-        self.explosion_time = 0
-        self.game_map = game_map
-        self.players = players
-
-    def update(self):
-        current_time = pygame.time.get_ticks()
-
-        if not self.exploded:
-            # Bombe falder
-            self.rect.y += BOMB_SPEED
-
-            # Stopper ovenpå platform eller ground
-            for platform in self.game_map.platforms + [self.game_map.ground]:
-                if self.rect.colliderect(platform):
-                    self.rect.bottom = platform.top
-                    break
-            # Eksploderer bomben hvis timeren er gået
-            if current_time - self.spawn_time >= BOMB_TIMER:
-                self.explode()
-        else:
-            # Eksplosion fjernes efter 1 sekund
-            if current_time - self.explosion_time >= 1000:
-                self.kill()
-
-    def explode(self):
-        self.exploded = True
-        self.explosion_time = pygame.time.get_ticks()
-
-        # Tegn explosion
-        self.image = pygame.Surface((EXPLOSION_RADIUS * 2, EXPLOSION_RADIUS * 2), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, ORANGE, (EXPLOSION_RADIUS, EXPLOSION_RADIUS), EXPLOSION_RADIUS)
-        self.rect = self.image.get_rect(center=self.rect.center)
-
-        # Updateret platform array
-        new_platforms = []
-        explosion_area = pygame.Rect(
-            self.rect.centerx - EXPLOSION_RADIUS, self.rect.centery - EXPLOSION_RADIUS,
-            EXPLOSION_RADIUS * 2, EXPLOSION_RADIUS * 2)
-
-        # Loop gennem alle platforme
-        for platform in self.game_map.platforms:
-            # Hvis eksplosion kollidere med platform skippes den.
-            if platform.colliderect(explosion_area):
-                continue
-            # Hvis den ikke gør det tilføj den til det nye array
-            new_platforms.append(platform)
-        # Updateres til det nye platform array
-        self.game_map.platforms = new_platforms
-
-        for player in self.players:
-            if self.rect.colliderect(player.rect):
-                player.opponent.score += 1
-                player.respawn()
+        self.pool = pool
+        self.bomb = None
+        self.image = pool.bomb_image
+        self.rect = self.image.get_rect()
+        self.previous = (0, 0)
+        self.seen = 0
+
+    def bind(self, bomb):
+        self.bomb = bomb
+        self.previous = bomb.rect.center
+
+    def remember(self):
+        self.previous = self.bomb.rect.center
+
+    def update(self, alpha=1.0):
+        # Bomben falder og eksploderer, så den tegnes hver frame
+        self.dirty = 2
+        self.image = self.pool.explosion_image if self.bomb.exploded else self.pool.bomb_image
+        self.rect.size = self.image.get_size()
+        self.rect.center = interpolate(self.previous, self.bomb.rect.center, alpha)
+
+
+class BombPool:
+    """Et sprite pr. bombe i spillet. Sprites genbruges, så det ikke koster allokeringer at smide en bombe.
+
+    Alle bomber deler det samme skalerede bombebillede og det samme
+    eksplosionsbillede.
+    """
+
+    def __init__(self, bomb_image, group, size=12):
+        bomb_size = (BOMB_SIZE * 2, BOMB_SIZE * 2)
+        if bomb_image.get_size() != bomb_size:
+            bomb_image = pygame.transform.scale(bomb_image, bomb_size)
+        self.bomb_image = bomb_image
+
+        self.explosion_image = pygame.Surface((EXPLOSION_RADIUS * 2, EXPLOSION_RADIUS * 2), pygame.SRCALPHA)
+        pygame.draw.circle(self.explosion_image, ORANGE, (EXPLOSION_RADIUS, EXPLOSION_RADIUS), EXPLOSION_RADIUS)
+
+        self.group = group
+        self.free = [BombSprite(self) for _ in range(size)]
+        self.active = {}
+        self.frame = 0
+
+    def sync(self, bombs):
+        """Giver hver bombe i spillet et sprite og lægger sprites for fjernede bomber tilbage."""
+        self.frame += 1
+        for bomb in bombs:
+            sprite = self.active.get(id(bomb))
+            if sprite is None:
+                sprite = self.free.pop() if self.free else BombSprite(self)
+                sprite.bind(bomb)
+                self.active[id(bomb)] = sprite
+                self.group.add(sprite)
+            sprite.seen = self.frame
+
+        if len(self.active) > len(bombs):
+            for key, sprite in list(self.active.items()):
+                if sprite.seen != self.frame:
+                    self.release(key, sprite)
+
+    def remember(self):
+        for sprite in self.active.values():
+            sprite.remember()
+
+    def release(self, key, sprite):
+        sprite.kill()
+        sprite.bomb = None
+        del self.active[key]
+        self.free.append(sprite)
 
 
 # PLAYER
-class Player(pygame.sprite.Sprite):
-    def __init__(self, x, y, image_path, controls):
+class PlayerSprite(pygame.sprite.DirtySprite):
+    def __init__(self, player, image_path, tint=None):
         super().__init__()
-        self.original_image = pygame.image.load(image_path).convert_alpha()
-        self.original_image = pygame.transform.scale(self.original_image, (PLAYER_SIZE, PLAYER_SIZE))
-        self.image = self.original_image.copy()
-        self.rect = self.image.get_rect(center=(x, y))
-
-        self.controls = controls
-        self.speed = PLAYER_SPEED
-        self.facing_right = True
-
-        self.velocity_y = 0
-        self.jump_strength = -15
-        self.on_ground = False
-
-        self.score = 0
-        self.start_x = x
-        self.start_y = y
-
-        self.drop_cooldown = 0
-
-        self.opponent = None
-
-    def update(self, pressed_keys, game_map, ground, opponent, bombs_group, bomb_img, players):
-        dx = 0
-        if pressed_keys[self.controls["left"]]:
-            dx = -self.speed
-            if self.facing_right:
-                self.image = pygame.transform.flip(self.original_image, True, False)
-                self.facing_right = False
-        if pressed_keys[self.controls["right"]]:
-            dx = self.speed
-            if not self.facing_right:
-                self.image = self.original_image.copy()
-                self.facing_right = True
-
-        self.rect.x += dx
-
-        for platform in game_map.platforms:
-            if self.rect.colliderect(platform):
-                if dx > 0:
-                    self.rect.right = platform.left
-                elif dx < 0:
-                    self.rect.left = platform.right
-
-        if pressed_keys[self.controls["up"]] and self.on_ground:
-            self.velocity_y = self.jump_strength
-            self.on_ground = False
-
-        self.velocity_y += GRAVITY
-        self.rect.y += self.velocity_y
-
-        self.on_ground = False
-        for platform in game_map.platforms:
-            if self.rect.colliderect(platform):
-                if self.velocity_y > 0:
-                    self.rect.bottom = platform.top
-                    self.velocity_y = 0
-                    self.on_ground = True
-                elif self.velocity_y < 0:
-                    self.rect.top = platform.bottom
-                    self.velocity_y = 0
-
-        if self.rect.colliderect(ground):
-            opponent.score += 1
-            self.respawn()
-
-        # Drop bombe
-        if "drop" in self.controls and pressed_keys[self.controls["drop"]] and self.drop_cooldown == 0:
-            # Bombe oprettes
-            bomb = Bomb(self.rect.centerx, self.rect.bottom, bomb_img, game_map, players)
-            bombs_group.add(bomb)
-            # Vent 100 frames for at kunne droppe en bombe mere (forhindrer bombe spam)
-            self.drop_cooldown = 50
-
-        # Cooldown timer
-        if self.drop_cooldown > 0:
-            self.drop_cooldown -= 1
-
-        # Borders/Vægge
-        self.rect.x = max(0, min(self.rect.x, SCREEN_WIDTH - PLAYER_SIZE))
-
-    def respawn(self):
-        self.rect.center = (self.start_x, self.start_y)
-        self.velocity_y = 0
+        self.dirty = 2
+        self.player = player
+        # Færdigskalerede og spejlede billeder fra asset-cachen
+        self.original_image, self.flipped_image = load_sprite(image_path, (PLAYER_SIZE, PLAYER_SIZE))
+        if tint is not None:
+            # Billederne i cachen deles, så der farves en kopi
+            self.original_image = self.original_image.copy()
+            self.flipped_image = self.flipped_image.copy()
+            self.original_image.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+            self.flipped_image.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+        self.image = self.original_image
+        self.rect = player.rect.copy()
+        self.previous = player.rect.topleft
+
+    def remember(self):
+        """Gemmer positionen før næste tick, så der kan interpoleres imellem."""
+        self.previous = self.player.rect.topleft
+
+    def update(self, alpha=1.0):
+        self.image = self.original_image if self.player.facing_right else self.flipped_image
+        self.rect.topleft = interpolate(self.previous, self.player.rect.topleft, alpha)
+
+
+def player_sprites(game):
+    """Et sprite pr. spiller. Fra spiller 3 genbruges billederne med en farvetone."""
+    sprites = []
+    for player in game.players:
+        image = PLAYER_IMAGES[player.index % len(PLAYER_IMAGES)]
+        tint = None if player.index < len(PLAYER_IMAGES) else PLAYER_TINTS[player.index % len(PLAYER_TINTS)]
+        sprites.append(PlayerSprite(player, image, tint))
+    return sprites
+
+
+def score_labels(font, count):
+    """Pointtavler. To spillere står i hvert sit hjørne, flere står i rækker øverst."""
+    if count == 2:
+        return [ScoreLabel(font, "P1 Score: ", (10, 10)), ScoreLabel(font, "P2 Score: ", (SCREEN_WIDTH - 140, 10))]
+    return [ScoreLabel(font, f"P{index + 1}: ", (10 + index % 8 * 120, 10 + index // 8 * 30))
+            for index in range(count)]
+
+
+def next_level(rotation, seed):
+    """Banen til næste runde som (level_map, startpunkter, navn), eller None for den indbyggede bane.
+
+    seed er kampens seed, som tilfældige baner laves ud fra og som gemmes i replayen.
+    """
+    if WORLD is not None:
+        world = load_world(WORLD)
+        return world, world.spawn_points, world.name
+    if GENERATED_LEVELS:
+        level_map, spawn_points, _ = generate_level(seed)
+        return level_map, spawn_points, f"tilfældig-{seed}"
+    level = rotation.next()
+    if level is None:
+        return None
+    return level, level.spawn_points, level.name
+
+
+def start_recording(game, level, seed):
+    # En replay gemmer hele banen i sin header, så store verdener optages ikke
+    if not RECORD_REPLAYS or WORLD is not None:
+        return None
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    path = os.path.join(REPLAY_DIR, time.strftime("kamp-%Y%m%d-%H%M%S.jmr"))
+    return ReplayRecorder(path, game, seed, level_name=level[2] if level is not None else "")
+
+
+def draw_overlay(overlay, screen, profiler):
+    """Tegner profiler-overlayet hvis det er slået til. Returnerer det tegnede område."""
+    if overlay is None or not overlay.visible:
+        return None
+    profiler.start("overlay")
+    return overlay.draw(screen)
 
 
 # MAIN
@@ -299,67 +453,197 @@ def main():
     # Først startskærm
     show_start_screen(screen, clock)
 
-    # Controls
-    controls_p1 = {"up": pygame.K_w, "left": pygame.K_a, "right": pygame.K_d, "drop": pygame.K_LSHIFT}
-    controls_p2 = {"up": pygame.K_UP, "left": pygame.K_LEFT, "right": pygame.K_RIGHT, "drop": pygame.K_RCTRL}
-
-    game_map = Map()
+    # Controls. Spillere uden taster styres af en bot.
+    controls = CONTROLS[:min(LOCAL_PLAYERS, ARENA_PLAYERS)]
+    bots = [ChasePolicy(random.Random(index)) for index in range(len(controls), ARENA_PLAYERS)]
+
+    # Banerne i levels/ spilles på skift, en ny hver runde. Uden baner bruges den indbyggede.
+    rotation = LevelRotation()
+    seed = random.randrange(1 << 31)
+    level = next_level(rotation, seed)
+
+    # Spillets tilstand. Resten af main tegner den bare.
+    if level is None:
+        game = GameState(player_count=ARENA_PLAYERS)
+    else:
+        game = GameState(level[0], level[1], player_count=ARENA_PLAYERS)
+    # En stor verden tegnes gennem et kamera, og kun de bidder kameraet ser
+    camera = Camera(game.map.bounds()) if WORLD is not None else None
+    map_view = MapView(game.map) if camera is None else WorldView(game.map)
+    # Når kameraet flytter sig, ændres hele skærmen hvert frame
+    dirty = DIRTY_RENDERING and camera is None
+    recorder = start_recording(game, level, seed)
 
     # Load images
-    bomb_img = pygame.image.load("bombeRealistic.png").convert_alpha()
-    player1 = Player(200, 100, "Boneca Ambalabu.png", controls_p1)
-    player2 = Player(600, 100, "Frigo Camelo.png", controls_p2)
+    bomb_img = load_scaled("bombeRealistic.png", (BOMB_SIZE * 2, BOMB_SIZE * 2))
+    players = player_sprites(game)
 
-    player1.opponent = player2
-    player2.opponent = player1
-    players = [player1, player2]
-
-    all_sprites = pygame.sprite.Group(player1, player2)
+    all_sprites = pygame.sprite.Group(players)
+    # Kameraet følger spillerne ved tastaturet (eller alle, hvis der kun er bots)
+    followed = players[:len(controls)] or players
     bombs_group = pygame.sprite.Group()
+    bomb_pool = BombPool(bomb_img, bombs_group)
     font = pygame.font.SysFont(None, 36)
 
+    scores = score_labels(font if ARENA_PLAYERS == 2 else pygame.font.SysFont(None, 28), ARENA_PLAYERS)
+    hud = pygame.sprite.Group(scores)
+
+    # Alt der bevæger sig tegnes i en LayeredDirty gruppe med banen som baggrund
+    dirty_sprites = pygame.sprite.LayeredDirty(players)
+    dirty_sprites.add(scores, layer=1)
+
+    profiler = FrameProfiler() if PROFILE else None
+    overlay = ProfilerOverlay(profiler, pygame.font.SysFont("monospace", 14)) if PROFILE else None
+    game.profiler = profiler
+
+    previous_time = pygame.time.get_ticks()
+    accumulator = 0.0
+
     while True:
+        if profiler is not None:
+            profiler.begin_frame()
+            profiler.start("events")
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if recorder is not None:
+                    recorder.close()
                 pygame.quit(); sys.exit()
-
+            elif event.type == pygame.KEYDOWN and profiler is not None:
+                if event.key == pygame.K_F3:
+                    overlay.toggle()
+                    if dirty:
+                        # Overlayet fjernes ved at tegne hele skærmen igen
+                        screen.blit(map_view.layer, (0, 0))
+                        dirty_sprites.repaint_rect(screen.get_rect())
+                elif event.key == pygame.K_F4:
+                    csv_path, trace_path = profiler.dump(PROFILE_DIR)
+                    print(f"Frametider gemt i {csv_path} og {trace_path}")
+
+        now = pygame.time.get_ticks()
+        accumulator += min(now - previous_time, MAX_FRAME_MS)
+        previous_time = now
+
+        if profiler is not None:
+            profiler.start("get_pressed")
         pressed_keys = pygame.key.get_pressed()
-
-        ground = game_map.ground
-        platforms = game_map.platforms
-
-        player1.update(pressed_keys, game_map, ground, player2, bombs_group, bomb_img, players)
-        player2.update(pressed_keys, game_map, ground, player1, bombs_group, bomb_img, players)
-
-        bombs_group.update()
-
-        screen.fill(BG_COLOR)
-        game_map.draw(screen)
-        all_sprites.draw(screen)
-        bombs_group.draw(screen)
-
-        score_text_p1 = font.render(f"P1 Score: {player1.score}", True, WHITE)
-        score_text_p2 = font.render(f"P2 Score: {player2.score}", True, WHITE)
-
-        screen.blit(score_text_p1, (10, 10))
-        screen.blit(score_text_p2, (SCREEN_WIDTH - 140, 10))
-
-        if player1.score >= 3 or player2.score >= 3:
-            winner = "Spiller 1" if player1.score >= 3 else "Spiller 2"
-            win_text = font.render(f"{winner} vinder!", True, WHITE)
+        inputs = [read_input(pressed_keys, player_controls) for player_controls in controls]
+
+        # Fast tick-rate: spillet kører lige hurtigt uanset hvor mange frames der tegnes
+        while accumulator >= TICK_MS and game.winner is None:
+            if profiler is not None:
+                profiler.start("tick")
+            for sprite in all_sprites:
+                sprite.remember()
+            bomb_pool.remember()
+            inputs = inputs[:len(controls)] + [bot(game, index) for index, bot in enumerate(bots, len(controls))]
+            game.step(inputs)
+            if recorder is not None:
+                recorder.record(inputs)
+            bomb_pool.sync(game.bombs)
+            accumulator -= TICK_MS
+
+        # Sprites tegnes mellem forrige og nuværende tick
+        if profiler is not None:
+            profiler.start("sprite_update")
+        alpha = min(1.0, accumulator / TICK_MS)
+        all_sprites.update(alpha)
+        bombs_group.update(alpha)
+        if camera is not None:
+            camera.follow([sprite.rect for sprite in followed])
+
+        if profiler is not None:
+            profiler.start("hud")
+        for label, player in zip(scores, game.players):
+            label.set_value(player.score)
+
+        if dirty:
+            dirty_sprites.add(bombs_group.sprites())
+            if overlay is not None and overlay.visible and overlay.rect() is not None:
+                # Området under overlayet tegnes igen hvert frame, så det ikke lægges oven på sig selv
+                dirty_sprites.repaint_rect(overlay.rect())
+            if map_view.changed():
+                # Terrænet er ændret: hele banen tegnes og skærmen flippes
+                if profiler is not None:
+                    profiler.start("map_draw")
+                map_view.draw(screen)
+                dirty_sprites.clear(screen, map_view.layer)
+                dirty_sprites.repaint_rect(screen.get_rect())
+                if profiler is not None:
+                    profiler.start("sprite_draw")
+                dirty_sprites.draw(screen)
+                draw_overlay(overlay, screen, profiler)
+                if profiler is not None:
+                    profiler.start("flip")
+                pygame.display.flip()
+            else:
+                if profiler is not None:
+                    profiler.start("sprite_draw")
+                rects = dirty_sprites.draw(screen)
+                overlay_rect = draw_overlay(overlay, screen, profiler)
+                if overlay_rect is not None:
+                    rects.append(overlay_rect)
+                if profiler is not None:
+                    profiler.start("flip")
+                pygame.display.update(rects)
+        elif camera is not None:
+            # Bidderne lige uden for skærmen læses ind før kameraet når dem
+            if profiler is not None:
+                profiler.start("stream")
+            game.map.prefetch(camera.rect.inflate(CHUNK_WIDTH, CHUNK_HEIGHT))
+            if profiler is not None:
+                profiler.start("map_draw")
+            map_view.draw(screen, camera)
+            if profiler is not None:
+                profiler.start("sprite_draw")
+            draw_shifted(all_sprites, screen, camera)
+            draw_shifted(bombs_group, screen, camera)
+            if profiler is not None:
+                profiler.start("hud")
+            hud.draw(screen)
+            draw_overlay(overlay, screen, profiler)
+        else:
+            if profiler is not None:
+                profiler.start("map_draw")
+            map_view.draw(screen)
+            if profiler is not None:
+                profiler.start("sprite_draw")
+            all_sprites.draw(screen)
+            bombs_group.draw(screen)
+            if profiler is not None:
+                profiler.start("hud")
+            hud.draw(screen)
+            draw_overlay(overlay, screen, profiler)
+
+        if game.winner is not None:
+            winner = f"Spiller {game.winner + 1}"
+            win_text = render_text(font, f"{winner} vinder!", WHITE)
             screen.blit(win_text, (SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT - 500))
             pygame.display.flip()
+            if recorder is not None:
+                recorder.close()
             pygame.time.wait(1500)
             show_start_screen(screen, clock)
-            player1.score = 0
-            player2.score = 0
-            player1.respawn()
-            player2.respawn()
-            game_map.load_map()
-            bombs_group.empty()
-
-        pygame.display.flip()
-        clock.tick(FPS)
+            seed = random.randrange(1 << 31)
+            level = next_level(rotation, seed)
+            if level is None:
+                game.reset()
+            else:
+                game.change_level(level[0], level[1])
+            recorder = start_recording(game, level, seed)
+            bomb_pool.sync(game.bombs)
+            previous_time = pygame.time.get_ticks()
+            accumulator = 0.0
+            if profiler is not None:
+                profiler.cancel_frame()
+
+        if not dirty:
+            if profiler is not None:
+                profiler.start("flip")
+            pygame.display.flip()
+        if profiler is not None:
+            # Ventetiden i clock.tick er ikke arbejde, så den er ikke en del af frametiden
+            profiler.end_frame()
+        clock.tick(RENDER_FPS)
 
 
 if __name__ == "__main__":
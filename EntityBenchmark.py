@@ -0,0 +1,65 @@
+"""Måler hukommelse og attribut-adgang for Player og Bomb med __slots__.
+
+Sammenligner med de samme klasser bygget med et almindeligt __dict__ pr. objekt.
+
+    python EntityBenchmark.py --count 10000
+"""
+import argparse
+import sys
+import timeit
+import tracemalloc
+
+from Simulation import Bomb, Player
+
+
+def dict_class(cls):
+    """Samme metoder som cls, men uden __slots__ (attributter i et __dict__)."""
+    namespace = {name: value for name, value in vars(cls).items()
+                 if name not in cls.__slots__ and name not in ("__slots__", "__dict__", "__weakref__")}
+    return type(f"Dict{cls.__name__}", (), namespace)
+
+
+def memory_per_object(factory, count):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # Listen selv tæller ikke med
+    size -= sys.getsizeof(objects)
+    return size / count
+
+
+def access_time(player, number):
+    """Læser og skriver de felter Player.update bruger hvert tick."""
+    def touch():
+        player.velocity_y += 0.9
+        if player.on_ground and player.drop_timer is None:
+            player.score += 0
+        player.facing_right = player.velocity_y > 0
+    return min(timeit.repeat(touch, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hukommelse og attribut-adgang med og uden __slots__.")
+    parser.add_argument("--count", type=int, default=10000, help="antal objekter i hukommelsesmålingen")
+    parser.add_argument("--number", type=int, default=200000, help="gentagelser i adgangsmålingen")
+    args = parser.parse_args()
+
+    DictPlayer = dict_class(Player)
+    DictBomb = dict_class(Bomb)
+
+    print(f"{'':10}{'slots':>12}{'dict':>12}")
+    for name, slotted, plain in (("Player", lambda: Player(200, 100), lambda: DictPlayer(200, 100)),
+                                 ("Bomb", Bomb, DictBomb)):
+        print(f"{name:10}{memory_per_object(slotted, args.count):10.0f} B"
+              f"{memory_per_object(plain, args.count):10.0f} B")
+
+    slotted = access_time(Player(200, 100), args.number)
+    plain = access_time(DictPlayer(200, 100), args.number)
+    print(f"{'adgang':10}{slotted * 1e9:9.1f} ns{plain * 1e9:9.1f} ns  (felter pr. tick)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+"""Reinforcement learning-miljøer over spillets regler (reset/step som i Gym).
+
+BomberEnv kører én kamp gennem GameState mod en bot. VectorBomberEnv kører N
+kampe i takt, med spillere, bomber og platforme som NumPy-arrays i stedet for
+et Python-objekt og et pygame.Rect pr. spiller. Den kolliderer mod de samme
+sammenlagte platform-rects som GameState og følger de samme regler (startpunkter,
+cooldown, kædereaktioner og arena), så de giver de samme kampe tick for tick.
+
+En handling er en byte pr. spiller med samme bits som replay-filerne
+(up=1, left=2, right=4, drop=8), altså et tal fra 0 til 15.
+
+Observationer er et dict af arrays:
+    players: (..., spillere, 6)  x, y, velocity_y, on_ground, drop_cooldown, score
+    bombs:   (..., bomber, 5)    aktiv, centrum x, centrum y, ticks til eksplosion, eksploderet
+    tiles:   (..., ROWS, COLUMNS) bool, True = platform
+Bomberne står i den rækkefølge de blev smidt, som i GameState.bombs.
+"""
+import random
+
+import numpy as np
+
+from Map import MERGE_MODE
+from Policies import RandomPolicy
+from Replay import INPUT_TABLE
+from Simulation import (BOMB_SIZE, BOMB_SPEED, BOMB_TIMER, CHAIN_REACTIONS, DROP_COOLDOWN, EXPLOSION_RADIUS,
+                        EXPLOSION_TICKS, FPS, GRAVITY, JUMP_STRENGTH, LEVEL_MAP, PLAYER_SIZE, PLAYER_SPEED,
+                        SPAWN_POINTS, WIN_SCORE, GameState, Map, allocate_spawns, carve_platforms)
+
+MAX_BOMBS = 16  # Bomber pr. kamp i observationen (flere hvis reglerne kræver det)
+MAX_TICKS = FPS * 60 * 2  # En episode stoppes efter 2 minutter
+
+UP, LEFT, RIGHT, DROP = 1, 2, 4, 8
+
+FAR = 1 << 40  # Større end alle koordinater
+# Tom plads i platform-arrayet: et rect uden størrelse langt uden for banen, som aldrig rammes
+NO_PLATFORM = (-FAR, -FAR, -FAR, -FAR)
+
+
+def round_half_away(values):
+    """Afrunder som pygame.Rect gør når en float lægges til en koordinat."""
+    return np.where(values >= 0, np.floor(values + 0.5), np.ceil(values - 0.5)).astype(np.int64)
+
+
+def platform_array(platforms, size):
+    """Platformene som (size, 4) array af left, top, right, bottom, fyldt op med NO_PLATFORM."""
+    array = np.full((size, 4), NO_PLATFORM, dtype=np.int64)
+    if platforms:
+        array[:len(platforms)] = [(p.left, p.top, p.right, p.bottom) for p in platforms]
+    return array
+
+
+class VectorBomberEnv:
+    """N uafhængige kampe der tages et tick ad gangen, alle spillere styres af handlinger.
+
+    step(actions) tager et (N, spillere) array af handlinger og returnerer
+    (observation, rewards, dones, info). Rewards er (N, spillere): +1 når
+    spilleren får et point og -1 når spilleren dør. Kampe der slutter
+    nulstilles automatisk, og info["winner"] fortæller hvem der vandt (-1 = ingen).
+
+    Reglerne tages som i GameState. Bevægelse og kollision regnes for alle
+    kampe på én gang. Eksplosioner er sjældne og tages en ad gangen med
+    Simulation.carve_platforms, ligesom Map.carve.
+    """
+
+    def __init__(self, num_envs, level_map=LEVEL_MAP, spawn_points=SPAWN_POINTS, max_ticks=MAX_TICKS,
+                 merge=MERGE_MODE, bomb_timer=BOMB_TIMER, explosion_radius=EXPLOSION_RADIUS,
+                 jump_strength=JUMP_STRENGTH, chain_reactions=CHAIN_REACTIONS, player_count=None):
+        self.num_envs = num_envs
+        self.max_ticks = max_ticks
+        self.merge = merge
+        self.bomb_fuse_ticks = bomb_timer * FPS // 1000
+        self.explosion_radius = explosion_radius
+        self.jump_strength = jump_strength
+        self.chain_reactions = chain_reactions
+
+        # Banen som Map bygger den. Kampene deler den, indtil en eksplosion ændrer den (copy-on-write).
+        self.level = Map(level_map, merge)
+        ground = self.level.ground
+        self.ground = (ground.left, ground.top, ground.right, ground.bottom)
+        self.width = self.level.width
+        if player_count is not None:
+            tiles, origin = self.level.spawn_area()
+            spawn_points = allocate_spawns(player_count, tiles, spawn_points, origin)
+        self.num_players = len(spawn_points)
+        spawn = np.array(spawn_points, dtype=np.int64)
+        self.spawn_x = spawn[:, 0] - PLAYER_SIZE // 2
+        self.spawn_y = spawn[:, 1] - PLAYER_SIZE // 2
+        # Modstanderen får pointet for et fald i en duel. I en arena er der ingen (-1).
+        if self.num_players <= 2:
+            self.opponent = (np.arange(self.num_players) + 1) % self.num_players
+        else:
+            self.opponent = np.full(self.num_players, -1)
+
+        shape = (num_envs, self.num_players)
+        self.x = np.zeros(shape, dtype=np.int64)
+        self.y = np.zeros(shape, dtype=np.int64)
+        self.velocity_y = np.zeros(shape)
+        self.on_ground = np.zeros(shape, dtype=bool)
+        self.score = np.zeros(shape, dtype=np.int64)
+        self.drop_cooldown = np.zeros(shape, dtype=np.int64)
+        self.facing_right = np.ones(shape, dtype=bool)
+
+        # Nok pladser til at ingen spiller nogensinde mangler en: en bombe lever
+        # højst lunten plus eksplosionen, og der går DROP_COOLDOWN ticks mellem to drop
+        per_player = (self.bomb_fuse_ticks + EXPLOSION_TICKS) // DROP_COOLDOWN + 1
+        self.max_bombs = max(MAX_BOMBS, per_player * self.num_players)
+        bomb_shape = (num_envs, self.max_bombs)
+        self.bomb_active = np.zeros(bomb_shape, dtype=bool)
+        self.bomb_x = np.zeros(bomb_shape, dtype=np.int64)  # Centrum
+        self.bomb_y = np.zeros(bomb_shape, dtype=np.int64)
+        self.bomb_owner = np.zeros(bomb_shape, dtype=np.int64)
+        self.bomb_order = np.zeros(bomb_shape, dtype=np.int64)  # Tælles op ved hvert drop
+        self.bomb_spawn_tick = np.zeros(bomb_shape, dtype=np.int64)
+        self.bomb_exploded = np.zeros(bomb_shape, dtype=bool)
+        self.bomb_explosion_tick = np.zeros(bomb_shape, dtype=np.int64)
+        self.drops = np.zeros(num_envs, dtype=np.int64)
+
+        # Hver kamps (tiles, platforme, grid) og platformene som arrays til kollisionen
+        self.terrain = [None] * num_envs
+        level_platforms = self.level.platforms
+        self.level_platforms = platform_array(level_platforms, len(level_platforms))
+        self.platforms = np.empty((num_envs,) + self.level_platforms.shape, dtype=np.int64)
+        self.tiles = np.zeros((num_envs,) + self.level.tiles.shape, dtype=bool)
+        self.tick = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self, mask=None):
+        """Nulstiller alle kampe, eller kun dem hvor mask er True."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.x[mask] = self.spawn_x
+        self.y[mask] = self.spawn_y
+        self.velocity_y[mask] = 0
+        self.on_ground[mask] = False
+        self.score[mask] = 0
+        self.drop_cooldown[mask] = 0
+        self.facing_right[mask] = True
+        self.bomb_active[mask] = False
+        self.bomb_exploded[mask] = False
+        self.drops[mask] = 0
+        level = self.level.snapshot()
+        for env in np.flatnonzero(mask):
+            self.terrain[env] = level
+        self.platforms[mask] = NO_PLATFORM
+        self.platforms[mask, :len(self.level_platforms)] = self.level_platforms
+        self.tiles[mask] = self.level.tiles
+        self.tick[mask] = 0
+        return self.observation()
+
+    def observation(self):
+        players = np.stack([self.x, self.y, self.velocity_y, self.on_ground, self.drop_cooldown, self.score],
+                           axis=-1).astype(np.float32)
+        fuse_left = np.where(self.bomb_exploded, 0, self.bomb_fuse_ticks - (self.tick[:, None] - self.bomb_spawn_tick))
+        bombs = np.stack([self.bomb_active, self.bomb_x, self.bomb_y, fuse_left, self.bomb_exploded],
+                         axis=-1).astype(np.float32)
+        bombs[~self.bomb_active] = 0
+        # Aktive bomber først, i den rækkefølge de blev smidt
+        order = np.argsort(np.where(self.bomb_active, self.bomb_order, FAR), axis=1, kind="stable")
+        bombs = np.take_along_axis(bombs, order[:, :, None], axis=1)
+        return {"players": players, "bombs": bombs, "tiles": self.tiles.copy()}
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, self.num_players)
+        points = np.zeros((self.num_envs, self.num_players), dtype=np.int64)
+        deaths = np.zeros_like(points)
+
+        for player in range(self.num_players):
+            self._step_player(player, actions[:, player], points, deaths)
+        self._step_bombs(points, deaths)
+        self.tick += 1
+
+        winner = np.where((self.score >= WIN_SCORE).any(axis=1), np.argmax(self.score >= WIN_SCORE, axis=1), -1)
+        dones = (winner >= 0) | (self.tick >= self.max_ticks)
+        info = {"winner": winner, "ticks": self.tick.copy()}
+        if dones.any():
+            self.reset(dones)
+        return self.observation(), points - deaths, dones, info
+
+    def _kill(self, env, player, killer, points, deaths):
+        """Spilleren dør og starter forfra. killer får et point (-1 = ingen), som GameState.kill."""
+        scored = killer >= 0
+        np.add.at(self.score, (env[scored], killer[scored]), 1)
+        np.add.at(points, (env[scored], killer[scored]), 1)
+        np.add.at(deaths[:, player], env, 1)
+        self.x[env, player] = self.spawn_x[player]
+        self.y[env, player] = self.spawn_y[player]
+        self.velocity_y[env, player] = 0
+
+    def _step_player(self, player, action, points, deaths):
+        envs = np.arange(self.num_envs)
+        left = (action & LEFT) != 0
+        right = (action & RIGHT) != 0
+        dx = np.where(right, PLAYER_SPEED, np.where(left, -PLAYER_SPEED, 0))
+        self.facing_right[:, player] = np.where(right, True, np.where(left, False, self.facing_right[:, player]))
+
+        # Hop og tyngdekraft
+        jump = ((action & UP) != 0) & self.on_ground[:, player]
+        velocity_y = np.where(jump, self.jump_strength, self.velocity_y[:, player]) + GRAVITY
+
+        p_left, p_top, p_right, p_bottom = np.moveaxis(self.platforms, 2, 0)
+        start_x = self.x[:, player][:, None]
+        start_y = self.y[:, player][:, None]
+
+        # Vandret kollision som Map.sweep_x, mod alle platforme på én gang
+        x = start_x + dx[:, None]
+        band = (p_top < start_y + PLAYER_SIZE) & (p_bottom > start_y)
+        ahead = band & (p_left < x + PLAYER_SIZE) & ((p_right > x) | (p_left >= start_x + PLAYER_SIZE))
+        hit_left = np.where(ahead, p_left, FAR).min(axis=1, keepdims=True)
+        behind = band & (p_right > x) & ((p_left < x + PLAYER_SIZE) | (p_right <= start_x))
+        hit_right = np.where(behind, p_right, -FAR).max(axis=1, keepdims=True)
+        moving_right = (dx > 0)[:, None]
+        moving_left = (dx < 0)[:, None]
+        x = np.where(moving_right & (hit_left < FAR), hit_left - PLAYER_SIZE, x)
+        x = np.where(moving_left & (hit_right > -FAR), hit_right, x)
+
+        # Lodret kollision som Map.sweep_y: et fald stopper på den øverste platform, et hop under den nederste
+        y = round_half_away(start_y + velocity_y[:, None])
+        columns = (p_left < x + PLAYER_SIZE) & (p_right > x)
+        below = columns & (p_top < y + PLAYER_SIZE) & ((p_bottom > y) | (p_top >= start_y + PLAYER_SIZE))
+        hit_top = np.where(below, p_top, FAR).min(axis=1, keepdims=True)
+        above = columns & (p_bottom > y) & ((p_top < y + PLAYER_SIZE) | (p_bottom <= start_y))
+        hit_bottom = np.where(above, p_bottom, -FAR).max(axis=1, keepdims=True)
+        falling = (velocity_y > 0)[:, None] & (hit_top < FAR)
+        rising = (velocity_y < 0)[:, None] & (hit_bottom > -FAR)
+        y = np.where(falling, hit_top - PLAYER_SIZE, np.where(rising, hit_bottom, y))
+        landed = (falling | rising)[:, 0]
+        x, y, start_y = x[:, 0], y[:, 0], start_y[:, 0]
+
+        self.x[:, player] = x
+        self.y[:, player] = y
+        self.velocity_y[:, player] = np.where(landed, 0, velocity_y)
+        self.on_ground[:, player] = falling[:, 0]
+
+        # Rører bunden, også med et fald der når forbi den på et enkelt tick
+        g_left, g_top, g_right, g_bottom = self.ground
+        fell = ((np.minimum(y, start_y) < g_bottom) & (np.maximum(y, start_y) + PLAYER_SIZE > g_top)
+                & (x < g_right) & (x + PLAYER_SIZE > g_left))
+        if fell.any():
+            env = envs[fell]
+            self._kill(env, player, np.full(len(env), self.opponent[player]), points, deaths)
+
+        # Drop bombe i første ledige plads. Der er altid en (se max_bombs).
+        cooldown = self.drop_cooldown[:, player]
+        drop = ((action & DROP) != 0) & (cooldown == 0)
+        if drop.any():
+            env = envs[drop]
+            slot = np.argmax(~self.bomb_active[env], axis=1)
+            self.bomb_active[env, slot] = True
+            self.bomb_exploded[env, slot] = False
+            self.bomb_x[env, slot] = self.x[env, player] + PLAYER_SIZE // 2
+            self.bomb_y[env, slot] = self.y[env, player] + PLAYER_SIZE
+            self.bomb_owner[env, slot] = player
+            self.bomb_order[env, slot] = self.drops[env]
+            self.bomb_spawn_tick[env, slot] = self.tick[env]
+            self.drops[env] += 1
+        # Cooldown tælles ned hvert tick, og spilleren kan droppe igen når den er 0
+        cooldown = np.where(drop, DROP_COOLDOWN, cooldown)
+        self.drop_cooldown[:, player] = np.where(cooldown > 0, cooldown - 1, 0)
+
+        # Borders/Vægge
+        self.x[:, player] = np.clip(self.x[:, player], 0, self.width - PLAYER_SIZE)
+
+    def _step_bombs(self, points, deaths):
+        # Eksplosioner der har vist sig i 1 sekund fjernes
+        expired = self.bomb_active & self.bomb_exploded & (
+            self.tick[:, None] - self.bomb_explosion_tick >= EXPLOSION_TICKS)
+        self.bomb_active &= ~expired
+
+        # Bomber falder og lander på den øverste platform de rører, ellers på bunden (som Bomb.fall)
+        falling = self.bomb_active & ~self.bomb_exploded
+        if not falling.any():
+            return
+        env, slot = np.nonzero(falling)
+        left = self.bomb_x[env, slot][:, None] - BOMB_SIZE
+        top = self.bomb_y[env, slot][:, None] - BOMB_SIZE + BOMB_SPEED
+        p_left, p_top, p_right, p_bottom = np.moveaxis(self.platforms[env], 2, 0)
+        touching = (p_left < left + BOMB_SIZE * 2) & (p_right > left) & (p_top < top + BOMB_SIZE * 2) & (p_bottom > top)
+        hit_top = np.where(touching, p_top, FAR).min(axis=1)
+        left, top = left[:, 0], top[:, 0]
+        g_left, g_top, g_right, g_bottom = self.ground
+        on_ground = ((left < g_right) & (left + BOMB_SIZE * 2 > g_left)
+                     & (top < g_bottom) & (top + BOMB_SIZE * 2 > g_top))
+        top = np.where(hit_top < FAR, hit_top, np.where(on_ground, g_top, top + BOMB_SIZE * 2)) - BOMB_SIZE * 2
+        self.bomb_y[env, slot] = top + BOMB_SIZE
+
+        # Lunten er brændt ud: eksplosioner er sjældne, så de tages en ad gangen i den
+        # rækkefølge bomberne blev smidt (som lunterne i GameState.timers)
+        due = self.tick[env] - self.bomb_spawn_tick[env, slot] >= self.bomb_fuse_ticks
+        env, slot = env[due], slot[due]
+        for index in np.lexsort((self.bomb_order[env, slot], env)):
+            self._explode(int(env[index]), int(slot[index]), points, deaths)
+
+    def _explode(self, env, slot, points, deaths):
+        """Sprænger bomben, og med chain_reactions de bomber eksplosionen rammer (som Bomb.explode)."""
+        radius = self.explosion_radius
+        pending = [slot]
+        while pending:
+            bomb = pending.pop()
+            if self.bomb_exploded[env, bomb]:
+                continue
+            self.bomb_exploded[env, bomb] = True
+            self.bomb_explosion_tick[env, bomb] = self.tick[env]
+            cx, cy = int(self.bomb_x[env, bomb]), int(self.bomb_y[env, bomb])
+            self._carve(env, (cx, cy), radius)
+
+            for player in range(self.num_players):
+                px, py = self.x[env, player], self.y[env, player]
+                if px < cx + radius and px + PLAYER_SIZE > cx - radius and py < cy + radius and py + PLAYER_SIZE > cy - radius:
+                    owner = int(self.bomb_owner[env, bomb])
+                    killer = self.opponent[player] if owner == player else owner
+                    self._kill(np.array([env]), player, np.array([killer]), points, deaths)
+
+            if self.chain_reactions:
+                # Bomber eksplosionen rører, sorteret som i Simulation.BombSweep
+                hit = np.flatnonzero(self.bomb_active[env] & ~self.bomb_exploded[env]
+                                     & (np.abs(self.bomb_x[env] - cx) < radius + BOMB_SIZE)
+                                     & (np.abs(self.bomb_y[env] - cy) < radius + BOMB_SIZE))
+                hit = hit[np.lexsort((self.bomb_order[env, hit], self.bomb_x[env, hit]))]
+                pending.extend(hit.tolist())
+
+    def _carve(self, env, center, radius):
+        carved = carve_platforms(*self.terrain[env], center, radius, self.merge)
+        if carved is None:
+            return
+        tiles, platforms, grid, changed = carved
+        self.terrain[env] = (tiles, platforms, grid)
+        self.tiles[env] = tiles
+        if not changed:
+            return
+        if len(platforms) > self.platforms.shape[1]:
+            # Krateret delte platforme op i flere end der er plads til
+            grow = len(platforms) - self.platforms.shape[1]
+            padding = np.broadcast_to(np.array(NO_PLATFORM, dtype=np.int64), (self.num_envs, grow, 4))
+            self.platforms = np.concatenate([self.platforms, padding], axis=1)
+        self.platforms[env] = platform_array(platforms, self.platforms.shape[1])
+
+
+def game_observation(game):
+    """Observation af en GameState med samme layout som én kamp i VectorBomberEnv."""
+    players = np.array([[player.rect.x, player.rect.y, player.velocity_y, player.on_ground,
+                         player.drop_cooldown, player.score] for player in game.players], dtype=np.float32)
+    bombs = np.zeros((MAX_BOMBS, 5), dtype=np.float32)
+    for slot, bomb in enumerate(game.bombs[:MAX_BOMBS]):
+        fuse_left = 0 if bomb.exploded else game.bomb_fuse_ticks - (game.tick - bomb.spawn_tick)
+        bombs[slot] = (1, bomb.rect.centerx, bomb.rect.centery, fuse_left, bomb.exploded)
+    return {"players": players, "bombs": bombs, "tiles": game.map.tiles.copy()}
+
+
+class BomberEnv:
+    """Én kamp gennem GameState. Agenten er spiller 1, modstanderen styres af opponent.
+
+    opponent er en funktion (game, index) -> input-dict, som policies i
+    Policies.py. Standard er RandomPolicy.
+    """
+
+    def __init__(self, opponent=None, level_map=LEVEL_MAP, max_ticks=MAX_TICKS, seed=None, **rules):
+        self.opponent_factory = opponent
+        self.level_map = level_map
+        self.max_ticks = max_ticks
+        self.rules = rules
+        self.rng = random.Random(seed)
+        self.game = None
+        self.opponent = None
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng.seed(seed)
+        self.game = GameState(self.level_map, **self.rules)
+        if self.opponent_factory is None:
+            self.opponent = RandomPolicy(random.Random(self.rng.random()))
+        else:
+            self.opponent = self.opponent_factory
+        return game_observation(self.game)
+
+    def step(self, action):
+        game = self.game
+        agent, opponent = game.players[0], game.players[1]
+        scores = agent.score, opponent.score
+
+        game.step([INPUT_TABLE[int(action)], self.opponent(game, 1)])
+
+        reward = (agent.score - scores[0]) - (opponent.score - scores[1])
+        done = game.winner is not None or game.tick >= self.max_ticks
+        info = {"winner": -1 if game.winner is None else game.winner, "ticks": game.tick}
+        return game_observation(game), reward, done, info
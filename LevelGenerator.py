@@ -0,0 +1,519 @@
+"""Tilfældige baner (20 x 80 som LEVEL_MAP) ud fra et seed.
+
+En kandidat godkendes kun hvis alle flader man kan stå på kan nås fra begge
+startpunkter. Spillerens bevægelser er tabeller der ikke afhænger af banen
+(flight): y og forskydningen til siden tick for tick, regnet med pygame.Rect
+som i Player.update. Der er fire slags: hop med fuld fart til siden, hop lige
+op og først til siden fra toppen, gå ud over kanten af en flade, og faldet fra
+et startpunkt.
+
+For hver kandidat lægges tabellerne ud fra afsæt langs hver flade, og felterne
+de passerer slås op som bits pr. kolonne. Et fald tæller kun med hvis det holder
+uanset hvor præcis spilleren står: kassen der tjekkes for kollisioner er lidt
+bredere end spilleren, og der regnes kun med at den lander på eller slår hovedet
+mod rækker under en kasse der er lidt smallere. Rammer den en væg, skubbes den ud
+af væggen som i sweep_x og fortsætter; slår den hovedet, falder den videre fra
+under loftet. Er det ikke sikkert hvad der sker, eller når den jorden, regnes
+faldet slet ikke med. Valideringen kan derfor afvise en bane der kan klares, men
+godkender aldrig en hvor en flade ikke kan nås. Til sidst findes det der kan nås
+med en bredde-først-søgning over fladerne.
+
+Kandidaterne valideres BATCH ad gangen, så numpy-kaldene deles mellem dem.
+
+    python LevelGenerator.py --seed 7 --show
+    python LevelGenerator.py --count 20 --save levels/
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from Simulation import (COLUMNS, GRAVITY, JUMP_STRENGTH, PLAYER_SIZE, PLAYER_SPEED, ROWS, SCREEN_HEIGHT,
+                        SCREEN_WIDTH, TILE_HEIGHT, TILE_WIDTH)
+
+MAX_AIR_TICKS = 240  # Længere fald end 4 sekunder regnes ikke med
+CLEARANCE_ROWS = int(np.ceil(PLAYER_SIZE / TILE_HEIGHT))  # Tomme rækker der skal være over en flade
+JUMP_STEP = 8  # Pixels mellem de afsæt der prøves langs en flade
+# Spilleren går PLAYER_SPEED pixels ad gangen, så den kan stille sig højst så langt fra et afsæt
+MARGIN = PLAYER_SPEED // 2
+
+# Felternes kanter i pixels; span_rect runder ned, og bredden rundes også ned, så en
+# platforms højre kant kan være en pixel til venstre for COLUMN_EDGES
+COLUMN_EDGES = np.floor(np.arange(COLUMNS + 1) * TILE_WIDTH).astype(np.int64)
+ROW_EDGES = np.floor(np.arange(ROWS + 1) * TILE_HEIGHT).astype(np.int64)
+GROUND_TOP = int(SCREEN_HEIGHT - TILE_HEIGHT)  # Map.ground
+CORE_COLUMNS = int(np.ceil(PLAYER_SIZE / TILE_WIDTH)) + 1  # Højst så mange kolonner under spilleren
+
+# Slags bevægelse i flight
+RUN, STRAIGHT_UP, WALK_OFF, DROP = range(4)
+JUMPS = [(RUN, -1), (RUN, 1), (STRAIGHT_UP, -1), (STRAIGHT_UP, 1)]
+MOVES = JUMPS + [(WALK_OFF, -1), (WALK_OFF, 1)]  # Fra en flade
+BOUNCES = (-1, 1)  # Retningerne for faldet videre efter et loft
+
+# Standardopsætning: spejlet bane med to hele gulve i bunden som i bombebanen
+SPAWN_POINTS = [(200, 100), (SCREEN_WIDTH - 200, 100)]
+FLOOR_ROWS = (16, 18)
+TOP_ROW = 1
+BOTTOM_ROW = 15  # Nederste række for tilfældige platforme
+PLATFORMS = (8, 16)  # Antal platforme pr. halvdel
+LENGTHS = (3, 10)
+BATCH = 16  # Kandidater der laves og valideres ad gangen
+WINDOW = 8  # Ticks landings regner ad gangen
+
+
+def rows_between(top, bottom):
+    """Første og sidste + 1 række der overlapper pixels top til bottom (bottom ikke med)."""
+    return ROW_EDGES[1:].searchsorted(top, "right"), ROW_EDGES[:-1].searchsorted(bottom)
+
+
+def columns_between(left, right):
+    """Første og sidste + 1 kolonne der overlapper pixels left til right (right ikke med)."""
+    return COLUMN_EDGES[1:].searchsorted(left, "right"), COLUMN_EDGES[:-1].searchsorted(right)
+
+
+def path(y, kind, direction, jump_strength):
+    """Spillerens (forskydning til siden, y) tick for tick uden kollisioner, som i Player.update."""
+    rect = pygame.Rect(0, y, PLAYER_SIZE, PLAYER_SIZE)
+    velocity_y = 0
+    offsets, ys = [0], [rect.y]
+    for tick in range(MAX_AIR_TICKS):
+        if kind in (RUN, WALK_OFF) or (kind == STRAIGHT_UP and tick > 0 and velocity_y >= 0):
+            rect.x += direction * PLAYER_SPEED
+        if tick == 0 and kind in (RUN, STRAIGHT_UP):
+            velocity_y = jump_strength
+        velocity_y += GRAVITY
+        rect.y += velocity_y
+        offsets.append(rect.x)
+        ys.append(rect.y)
+    return np.array(offsets), np.array(ys)
+
+
+@functools.lru_cache(maxsize=None)
+def flight(y, kind, direction, jump_strength=JUMP_STRENGTH, spread=0):
+    """En bevægelse fra y, som tabeller over rækkerne spilleren kan ramme tick for tick.
+
+    kind er RUN (hop, og direction holdes fra start), STRAIGHT_UP (hop, og direction
+    holdes først når spilleren ikke stiger mere), WALK_OFF (direction holdes, intet hop)
+    eller DROP (ingen taster, som fra et startpunkt). Med spread kan spilleren starte
+    alle steder fra y til y + spread. Stopper når spilleren kan være nået jorden.
+
+    Returnerer for hvert tick (offset, body, head, sure_head, feet, sure_feet, ground):
+    forskydningen til siden, rækkerne kroppen fylder før den flytter sig lodret, rækkerne
+    hovedet kan ramme på vej op og dem det rammer uanset hvor spilleren startede, det
+    samme for fødderne på vej ned, og om fødderne kan være nået ned i jorden. Rækkerne
+    er (første, sidste + 1).
+    """
+    offset, low = path(y, kind, direction, jump_strength)
+    _, high = path(y + spread, kind, direction, jump_strength)
+    ticks = int(np.argmax(high + PLAYER_SIZE > GROUND_TOP))
+    offset, low, high = offset[1:ticks + 1], low[:ticks + 1], high[:ticks + 1]
+    previous_low, previous_high, low, high = low[:-1], high[:-1], low[1:], high[1:]
+
+    body = rows_between(previous_low, previous_high + PLAYER_SIZE)
+    # Hovedet rammer en række hvis bund det passerer; bunden kan være en pixel højere
+    # end ROW_EDGES, fordi højden rundes ned ligesom bredden
+    bottoms, tops = ROW_EDGES[1:], ROW_EDGES[:-1]
+    head = (bottoms.searchsorted(low, "right"), bottoms.searchsorted(previous_high, "right"))
+    sure_head = (bottoms.searchsorted(high + 1, "right"), bottoms.searchsorted(previous_low, "right"))
+    feet = (tops.searchsorted(previous_low + PLAYER_SIZE), tops.searchsorted(high + PLAYER_SIZE))
+    sure_feet = (tops.searchsorted(previous_high + PLAYER_SIZE), tops.searchsorted(low + PLAYER_SIZE))
+    if kind == DROP:
+        # Står startpunktet inde i en platform, skubbes spilleren op på den øverste første tick
+        body[0][0] = body[1][0] = 0
+        feet[0][0], feet[1][0] = sure_feet[0][0], sure_feet[1][0] = rows_between(low[0], high[0] + PLAYER_SIZE)
+    return offset, body, head, sure_head, feet, sure_feet, high + PLAYER_SIZE > GROUND_TOP
+
+
+def stack(tables):
+    """Tabeller fra flight lagt oven på hinanden (tabel, tick), forlænget til samme længde.
+
+    Efter sit sidste tick rammer en bevægelse ingen rækker og er nået jorden.
+    """
+    length = max(len(table[0]) for table in tables)
+    stacked = []
+    for part, fill in zip(zip(*tables), [None, 0, 0, 0, 0, 0, True]):
+        if fill is None:
+            # Forskydningen bliver stående hvor den sluttede
+            stacked.append(np.array([np.pad(offset, (0, length - len(offset)), "edge") if len(offset)
+                                     else np.zeros(length, dtype=np.int64) for offset in part]))
+        elif isinstance(part[0], tuple):
+            stacked.append(tuple(np.array([np.pad(rows, (0, length - len(rows)), constant_values=fill)
+                                           for rows in side]) for side in zip(*part)))
+        else:
+            stacked.append(np.array([np.pad(values, (0, length - len(values)), constant_values=fill)
+                                     for values in part]))
+    return tuple(stacked)
+
+
+@functools.lru_cache(maxsize=None)
+def flight_tables(jump_strength=JUMP_STRENGTH):
+    """Alle bevægelser validate bruger, som stack.
+
+    Returnerer (numbers, directions, tables): numbers[række, i] er nummeret i tables for
+    MOVES[i] fra en flade på rækken og for BOUNCES[i - len(MOVES)] fra lige under rækken,
+    når spilleren har slået hovedet mod den. directions er hver bevægelses retning.
+    """
+    keys = [(int(ROW_EDGES[row]) - PLAYER_SIZE, kind, direction, 0)
+            for row in range(ROWS) for kind, direction in MOVES]
+    keys += [(int(ROW_EDGES[row + 1]) - 1, WALK_OFF, direction, 1) for row in range(ROWS) for direction in BOUNCES]
+    numbers = np.concatenate([np.arange(ROWS * len(MOVES)).reshape(ROWS, len(MOVES)),
+                              ROWS * len(MOVES) + np.arange(ROWS * len(BOUNCES)).reshape(ROWS, len(BOUNCES))], axis=1)
+    tables = stack([flight(y, kind, direction, jump_strength, spread) for y, kind, direction, spread in keys])
+    return numbers, np.array([direction for _, _, direction, _ in keys]), tables
+
+
+def surfaces(tiles):
+    """Flader man kan stå på i en stak baner (kandidat, række, kolonne).
+
+    Returnerer (kandidat, række, første kolonne, sidste kolonne + 1) for hver vandret strækning.
+    """
+    standable = tiles.copy()
+    for above in range(1, CLEARANCE_ROWS + 1):
+        standable[:, above:] &= ~tiles[:, :-above]
+    starts = standable.copy()
+    starts[:, :, 1:] &= ~standable[:, :, :-1]
+    ends = standable
+    ends[:, :, :-1] &= ~standable[:, :, 1:]
+    candidates, rows, col0 = np.nonzero(starts)
+    _, _, last = np.nonzero(ends)
+    return candidates, rows, col0, last + 1
+
+
+def walkable(tiles, candidates, rows, col0, col1):
+    """Hvor spilleren kan gå på hver flade: venstre kant fra low til high (begge med).
+
+    Returnerer også hvor kanten af fladen ville være uden vægge (edge_low, edge_high);
+    er den tættere på end væggen, kan spilleren gå ud over kanten der.
+    """
+    # Væggene: felter i de rækker kroppen fylder når spilleren står på rækken
+    body_first, body_end = rows_between(ROW_EDGES[:-1] - PLAYER_SIZE, ROW_EDGES[:-1])
+    column_sums = np.zeros((tiles.shape[0], ROWS + 1, COLUMNS), dtype=np.int32)
+    np.cumsum(tiles, axis=1, out=column_sums[:, 1:])
+    walls = column_sums[:, body_end] > column_sums[:, body_first]
+    columns = np.arange(COLUMNS)
+    last_wall = np.maximum.accumulate(np.where(walls, columns, -1), axis=2)
+    next_wall = np.minimum.accumulate(np.where(walls, columns, COLUMNS)[..., ::-1], axis=2)[..., ::-1]
+    left = np.where(col0 > 0, last_wall[candidates, rows, np.maximum(col0 - 1, 0)], -1)
+    right = np.where(col1 < COLUMNS, next_wall[candidates, rows, np.minimum(col1, COLUMNS - 1)], COLUMNS)
+
+    edge_low = COLUMN_EDGES[col0] - PLAYER_SIZE + 1
+    # 2, fordi fladens højre kant kan være en pixel kortere end COLUMN_EDGES
+    edge_high = COLUMN_EDGES[col1] - 2
+    low = np.maximum(COLUMN_EDGES[left + 1], edge_low)
+    high = np.minimum(COLUMN_EDGES[right] - PLAYER_SIZE, edge_high)
+    return low, high, edge_low, edge_high
+
+
+def row_bits(rows):
+    """Bits for rækkerne (første, sidste + 1), som i column_bits."""
+    first, end = rows
+    return (np.int64(1) << np.maximum(end, first)) - (np.int64(1) << first)
+
+
+def lowest_row(bits):
+    """Den øverste række i bits (-1 hvis ingen)."""
+    return np.frexp(bits & -bits)[1] - 1
+
+
+def highest_row(bits):
+    """Den nederste række i bits (-1 hvis ingen)."""
+    return np.frexp(bits)[1] - 1
+
+
+def columns_bits(column_bits, candidates, columns, rows=None, backwards=False):
+    """Felterne i kolonnerne columns (første, sidste + 1) lagt sammen som bits.
+
+    Med rows findes også den første kolonne med et felt i de rækker, fra venstre eller
+    fra højre med backwards (som kan være et array). Returnerer (bits, fundet, kolonne).
+    """
+    first, end = columns
+    bits = np.zeros(np.broadcast(candidates, first).shape, dtype=np.int64)
+    found = np.zeros(bits.shape, dtype=bool)
+    position = np.zeros(bits.shape, dtype=np.int64)
+    wanted = None if rows is None else row_bits(rows)
+    for step in range(int((end - first).max(initial=0))):
+        column = np.where(backwards, end - 1 - step, first + step)
+        inside = (column >= first) & (column < end)
+        column = np.minimum(np.maximum(column, 0), COLUMNS - 1)
+        here = np.where(inside, column_bits[candidates, column], 0)
+        bits |= here
+        if wanted is not None:
+            new = ~found & (here & wanted != 0)
+            position = np.where(new, column, position)
+            found |= new
+    return bits, found, position
+
+
+def landings(tables, kinds, candidates, left, right, column_bits, surface_at, start=None):
+    """Hvor bevægelserne ender: bevægelse nummer kinds i tables (fra stack), når spilleren
+    starter med venstre kant et sted fra left til right (pr. bevægelse, begge med).
+
+    Kassen fra left til right + PLAYER_SIZE (hull) må ikke ramme noget som kassen fra
+    right til left + PLAYER_SIZE (core) ikke også rammer; så ender alle pladserne ens,
+    ellers regnes bevægelsen ikke med. Med start er spilleren lige skubbet ud af en væg i
+    tick start (pr. bevægelse, -1 for ingen), og left og right er hvor den ville have
+    stået i tick 0. Der regnes WINDOW ticks ad gangen, kun for dem der ikke er stoppet.
+
+    Returnerer (landed, bumps, walls): (bevægelse, flade) for det den lander på,
+    (bevægelse, left, right, række) for dem der slår hovedet mod rækken og falder videre
+    derfra, og (bevægelse, left, right, tick) for dem der rammer en væg og skubbes ud af den.
+    """
+    offsets, body, head, sure_head, feet, sure_feet, ground = tables
+    length = offsets.shape[1]
+    if start is None:
+        start = np.full(len(candidates), -1)
+    flying = np.arange(len(candidates))
+    stopped = []
+    for first in range(0, length, WINDOW):
+        ticks = np.arange(first, min(first + WINDOW, length))
+        table = kinds[flying][:, None]
+        offset = offsets[table, ticks]
+        moving = offset - np.where(ticks > 0, offsets[table, np.maximum(ticks - 1, 0)], 0)
+        # Kanten af banen stopper alle pladser ens (Player.update), så den flytter bare kassen
+        low = np.minimum(np.maximum(left[flying, None] + offset, 0), SCREEN_WIDTH - PLAYER_SIZE)
+        high = np.minimum(np.maximum(right[flying, None] + offset, 0), SCREEN_WIDTH - PLAYER_SIZE)
+        hull = columns_between(low, high + PLAYER_SIZE)
+
+        # sweep_x: spilleren skubbes ud af den nærmeste væg i den retning den går
+        hull_bits, walled, wall = columns_bits(column_bits, candidates[flying, None], hull,
+                                               (body[0][table, ticks], body[1][table, ticks]), backwards=moving < 0)
+        before = ticks < start[flying, None]
+        walled &= ticks != start[flying, None]
+        # sweep_y: det nederste loft på vej op, den øverste flade på vej ned
+        ceiling = highest_row(hull_bits & row_bits((head[0][table, ticks], head[1][table, ticks])))
+        floor = lowest_row(hull_bits & row_bits((feet[0][table, ticks], feet[1][table, ticks])))
+
+        stop = (walled | (ceiling >= 0) | (floor >= 0) | ground[table, ticks]) & ~before
+        done = np.flatnonzero(stop.any(axis=1))
+        at = done, stop[done].argmax(axis=1)
+        table = kinds[flying[done]]
+        tick = ticks[at[1]]
+        stopped.append((flying[done], tick, walled[at], wall[at], moving[at] > 0, moving[at] == 0, ceiling[at],
+                        floor[at], low[at], high[at], offset[at],
+                        sure_head[0][table, tick], sure_head[1][table, tick],
+                        sure_feet[0][table, tick], sure_feet[1][table, tick]))
+        flying = np.delete(flying, done)
+        if not len(flying):
+            break
+    (moves, tick, walled, wall, to_right, still, ceiling, floor, low, high, offset,
+     head_first, head_end, feet_first, feet_end) = map(np.concatenate, zip(*stopped))
+
+    # + 1, så en platform hvis højre kant er rundet ned en pixel stadig er under kassen
+    core = columns_between(high + 1, low + PLAYER_SIZE)
+    core_bits, _, _ = columns_bits(column_bits, candidates[moves], core)
+    bumped = ~walled & (ceiling >= 0)
+    sure_bump = bumped & (ceiling >= head_first) & (ceiling < head_end) & (core_bits >> ceiling & 1 > 0)
+    hit = ~walled & ~bumped & (floor >= 0)
+    sure_hit = hit & (floor >= feet_first) & (floor < feet_end) & (core_bits >> floor & 1 > 0)
+
+    found_moves, found = [], []
+    for column in range(CORE_COLUMNS):
+        columns = core[0][sure_hit] + column
+        surface = surface_at[candidates[moves[sure_hit]], floor[sure_hit], np.minimum(columns, COLUMNS - 1)]
+        under = (columns < core[1][sure_hit]) & (surface >= 0)
+        found_moves.append(moves[sure_hit][under])
+        found.append(surface[under])
+    landed = np.concatenate(found_moves), np.concatenate(found)
+
+    bumps = moves[sure_bump], low[sure_bump], high[sure_bump], ceiling[sure_bump]
+
+    # Som at stå ved kanten af banen: mod højre ender alle der når væggen præcis ved dens
+    # venstre kant, mod venstre ved dens højre kant, som kan være en pixel kortere. Står
+    # spilleren stille til siden, skubber sweep_x ikke, og så regnes bevægelsen ikke med
+    pushed = walled & ~still
+    edge, to_right, low, high = wall[pushed], to_right[pushed], low[pushed], high[pushed]
+    pushed_low = np.where(to_right, np.minimum(low, COLUMN_EDGES[edge] - PLAYER_SIZE),
+                          np.maximum(low, COLUMN_EDGES[edge + 1] - 1))
+    pushed_high = np.where(to_right, COLUMN_EDGES[edge] - PLAYER_SIZE, np.maximum(high, COLUMN_EDGES[edge + 1]))
+    walls = moves[pushed], pushed_low - offset[pushed], pushed_high - offset[pushed], tick[pushed]
+    return landed, bumps, walls
+
+
+def reachable(adjacent, start):
+    """Fladerne der kan nås fra fladerne i start (bools), bredde-først over adjacent."""
+    reached = start.copy()
+    frontier = start
+    while frontier.any():
+        frontier = adjacent[frontier].any(axis=0) & ~reached
+        reached |= frontier
+    return reached
+
+
+def validate(tiles, spawn_points=SPAWN_POINTS, jump_strength=JUMP_STRENGTH):
+    """True hvis alle flader kan nås fra alle startpunkter.
+
+    tiles kan være én bane eller en stak af kandidater (kandidat, række, kolonne), så
+    numpy-kaldene deles mellem dem. For en stak returneres et bool-array.
+    """
+    tiles = np.asarray(tiles, dtype=bool)
+    if tiles.ndim == 2:
+        return bool(validate(tiles[None], spawn_points, jump_strength)[0])
+    count = tiles.shape[0]
+    candidates, rows, col0, col1 = surfaces(tiles)
+    size = len(candidates)
+
+    # Fladernes nummer i hvert felt (-1 hvor man ikke kan stå), og felterne i hver kolonne som bits
+    lengths = col1 - col0
+    cells = np.repeat(np.arange(size), lengths)
+    surface_at = np.full(tiles.shape, -1, dtype=np.int64)
+    surface_at[candidates[cells], rows[cells],
+               col0[cells] + np.arange(len(cells)) - np.repeat(np.cumsum(lengths) - lengths, lengths)] = cells
+    column_bits = np.bitwise_or.reduce(tiles.astype(np.int64) << np.arange(ROWS)[:, None], axis=1)
+
+    # Flader på samme række hænger sammen hvis spilleren kan gå fra den ene til den anden
+    low, high, edge_low, edge_high = walkable(tiles, candidates, rows, col0, col1)
+    adjacent = ((candidates[:, None] == candidates) & (rows[:, None] == rows)
+                & (np.minimum(high[:, None], high) - np.maximum(low[:, None], low) >= PLAYER_SPEED))
+
+    # Hop fra hvert JUMP_STEP langs fladerne, og ud over kanterne hvor der ikke er en væg
+    steps = np.maximum((high - low - 2 * MARGIN) // JUMP_STEP + 1, 0)
+    takeoff_surface = np.repeat(np.arange(size), steps)
+    takeoff = (np.repeat(low + MARGIN, steps)
+               + (np.arange(len(takeoff_surface)) - np.repeat(np.cumsum(steps) - steps, steps)) * JUMP_STEP)
+    walks_left = np.flatnonzero((edge_low >= low) & (low <= high))
+    walks_right = np.flatnonzero((edge_high <= high) & (low <= high))
+    # Alle bevægelser lægges ud på én gang, runde for runde: først fra afsættene, så videre
+    # fra hvor de slog hovedet eller blev skubbet ud af en væg
+    numbers, directions, tables = flight_tables(jump_strength)
+    # Spilleren er lige gået ud over kanten; mod højre kan kanten være en pixel kortere,
+    # men den pixel er i fladens egen kolonne, som spilleren er på vej væk fra
+    kinds = np.concatenate([numbers[rows[takeoff_surface], move] for move in range(len(JUMPS))]
+                           + [numbers[rows[walks_left], MOVES.index((WALK_OFF, -1))],
+                              numbers[rows[walks_right], MOVES.index((WALK_OFF, 1))]])
+    sources = np.concatenate([takeoff_surface] * len(JUMPS) + [walks_left, walks_right])
+    left = np.concatenate([takeoff - MARGIN] * len(JUMPS) + [edge_low[walks_left], edge_high[walks_right] - 2])
+    right = np.concatenate([takeoff + MARGIN] * len(JUMPS)
+                           + [edge_low[walks_left] + PLAYER_SPEED - 1, edge_high[walks_right] + 1])
+    start = np.full(len(sources), -1)
+    while len(sources):
+        (move, target), bumps, walls = landings(tables, kinds, candidates[sources], left, right, column_bits,
+                                                surface_at, start)
+        adjacent[sources[move], target] = True
+        # Efter et loft falder spilleren videre med direction holdt nede, fra under loftet
+        bounced, bounce_left, bounce_right, ceiling = bumps
+        # Efter en væg fortsætter bevægelsen fra hvor spilleren blev skubbet hen
+        pushed, pushed_left, pushed_right, tick = walls
+        bounce = len(MOVES) + np.searchsorted(BOUNCES, directions[kinds[bounced]])
+        kinds = np.concatenate([numbers[ceiling, bounce], kinds[pushed]])
+        sources = np.concatenate([sources[bounced], sources[pushed]])
+        left = np.concatenate([bounce_left, pushed_left])
+        right = np.concatenate([bounce_right, pushed_right])
+        start = np.concatenate([np.full(len(bounced), -1), tick])
+
+    # Faldet fra hvert startpunkt, og hvad der kan nås derfra
+    valid = np.ones(count, dtype=bool)
+    everyone = np.arange(count)
+    for x, y in spawn_points:
+        drop = stack([flight(y - PLAYER_SIZE // 2, DROP, 0, jump_strength)])
+        corner = np.full(count, x - PLAYER_SIZE // 2)
+        (move, target), _, _ = landings(drop, np.zeros(count, dtype=np.int64), everyone, corner, corner, column_bits,
+                                        surface_at)
+        start = np.zeros(size, dtype=bool)
+        start[target] = True
+        valid &= np.isin(everyone, move)
+        valid[candidates[~reachable(adjacent, start)]] = False
+    return valid
+
+
+def random_tiles(rng, spawn_points=SPAWN_POINTS, count=None):
+    """En kandidat: tilfældige platforme i venstre halvdel, spejlet til højre.
+
+    Med count laves en stak af count kandidater (kandidat, række, kolonne) på én gang.
+    """
+    if count is None:
+        return random_tiles(rng, spawn_points, 1)[0]
+    half = COLUMNS // 2
+    most = PLATFORMS[1]
+    platforms = rng.integers(PLATFORMS[0], most + 1, count)
+    rows = rng.integers(TOP_ROW, BOTTOM_ROW + 1, (count, most))
+    lengths = rng.integers(LENGTHS[0], LENGTHS[1] + 1, (count, most))
+    starts = rng.integers(0, half - LENGTHS[0], (count, most))
+    # Hver platform som en række-maske, lagt sammen i én matrix-multiplikation i stedet for en løkke
+    columns = np.arange(half)
+    masks = ((columns >= starts[:, :, None]) & (columns < (starts + lengths)[:, :, None])
+             & (np.arange(most) < platforms[:, None])[:, :, None]).astype(np.uint8)
+    in_row = (np.arange(ROWS)[:, None] == rows[:, None, :]).astype(np.uint8)
+    tiles = (in_row @ masks) > 0
+    tiles[:, list(FLOOR_ROWS)] = True
+    tiles = np.concatenate([tiles, tiles[:, :, ::-1]], axis=2)
+
+    # Plads til spillerne ved startpunkterne
+    tiles[:, spawn_clearance(tuple(map(tuple, spawn_points)))] = False
+    return tiles
+
+
+@functools.lru_cache(maxsize=None)
+def spawn_clearance(spawn_points):
+    """Maske over de felter spillerne dækker ved startpunkterne."""
+    clear = np.zeros((ROWS, COLUMNS), dtype=bool)
+    for x, y in spawn_points:
+        col0 = int((x - PLAYER_SIZE // 2) // TILE_WIDTH)
+        col1 = int((x + PLAYER_SIZE // 2 - 1) // TILE_WIDTH) + 1
+        row0 = int((y - PLAYER_SIZE // 2) // TILE_HEIGHT)
+        row1 = int((y + PLAYER_SIZE // 2 - 1) // TILE_HEIGHT) + 1
+        clear[max(0, row0):row1, max(0, col0):col1] = True
+    clear.setflags(write=False)
+    return clear
+
+
+def tile_rows(tiles):
+    """Tiles som rækker af "X."-strenge som i LEVEL_MAP."""
+    text = np.where(tiles, ord("X"), ord(".")).astype(np.uint8)
+    return [row.tobytes().decode("ascii") for row in text]
+
+
+def generate_level(seed, spawn_points=SPAWN_POINTS, jump_strength=JUMP_STRENGTH, max_attempts=10000):
+    """Første gyldige bane for seed. Returnerer (rækker som i LEVEL_MAP, startpunkter, antal forsøg).
+
+    Kandidaterne laves og valideres BATCH ad gangen; antal forsøg er nummeret på den
+    første gyldige, også selvom resten af dens batch blev valideret.
+    """
+    rng = np.random.default_rng(seed)
+    for attempts in range(0, max_attempts, BATCH):
+        tiles = random_tiles(rng, spawn_points, BATCH)
+        valid = np.flatnonzero(validate(tiles, spawn_points, jump_strength))
+        if len(valid):
+            return tile_rows(tiles[valid[0]]), list(spawn_points), attempts + int(valid[0]) + 1
+    raise RuntimeError(f"ingen gyldig bane efter {max_attempts} forsøg (seed {seed})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lav tilfældige baner og mål hvor hurtigt de valideres.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=200, help="antal baner der laves")
+    parser.add_argument("--jump-strength", type=float, default=JUMP_STRENGTH)
+    parser.add_argument("--show", action="store_true", help="vis den første bane")
+    parser.add_argument("--save", default=None, help="gem banerne som JSON i denne mappe (fx levels/)")
+    args = parser.parse_args()
+
+    flight_tables(args.jump_strength)
+    start = time.perf_counter()
+    levels = [generate_level(args.seed + number, jump_strength=args.jump_strength) for number in range(args.count)]
+    elapsed = time.perf_counter() - start
+    attempts = sum(attempt for _, _, attempt in levels)
+    # Hele batches bliver valideret, også efter den første gyldige
+    checked = sum(-(-attempt // BATCH) * BATCH for _, _, attempt in levels)
+    print(f"{args.count} baner, {checked} kandidater på {elapsed:.2f} s "
+          f"({checked / elapsed:.0f} kandidater/s, {args.count / elapsed:.0f} baner/s, "
+          f"{args.count / attempts:.0%} gyldige)")
+
+    if args.show:
+        for row in levels[0][0]:
+            print(row)
+    if args.save:
+        os.makedirs(args.save, exist_ok=True)
+        for number, (rows, spawn_points, _) in enumerate(levels):
+            seed = args.seed + number
+            path = os.path.join(args.save, f"generated-{seed}.json")
+            with open(path, "w") as f:
+                json.dump({"name": f"Tilfældig {seed}", "map": rows, "spawns": spawn_points}, f, indent=4)
+        print(f"Gemte {len(levels)} baner i {args.save}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
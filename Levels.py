@@ -0,0 +1,253 @@
+"""Baner fra filer i levels/, kompileret til en binær cache.
+
+En bane er enten en tekstfil med en række pr. linje (X = platform, . = tomt,
+1-9 = startpunkt for spiller 1-9, linjer der starter med # ignoreres) eller en
+JSON-fil: {"name": ..., "map": [rækker], "spawns": [[x, y], ...]}.
+
+Første gang en bane indlæses gemmes tiles, de sammenlagte platforme (som
+felt-spænd) og startpunkterne i .level_cache/. Filnavnet indeholder kildens
+hash, så cachen bliver ugyldig når banen ændres, og gamle caches for samme bane
+slettes når den kompileres igen. En tom eller ødelagt cache kompileres forfra.
+Cachen mmap'es ved indlæsning, og Map.load_map bruger den direkte, så en ny
+runde ikke parser banen igen.
+
+    python Levels.py            # kompilerer alle baner og viser dem
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+
+import numpy as np
+
+from Assets import file_hash
+from Map import MERGE_MODE, level_tiles, tile_spans
+from Simulation import COLUMNS, ROWS, SPAWN_POINTS, TILE_HEIGHT, TILE_WIDTH
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+LEVEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".level_cache")
+LEVEL_EXTENSIONS = (".txt", ".json")
+
+MAGIC = b"JMLV"
+VERSION = 1
+# magic, version, rækker, kolonner, antal platforme, antal startpunkter, længde af navnet
+HEADER = struct.Struct("<4sBHHHBB")
+# Cache-filernes navn: bane, de første 16 tegn af kildens hash, merge, .lvl for baner og .wld for verdener
+CACHE_NAME = re.compile(r"(.+)-([0-9a-f]{16})-(.+)\.(lvl|wld)")
+
+_levels = {}
+
+
+class Level:
+    """En kompileret bane. tiles og spans er read-only views i cache-filen.
+
+    Opfører sig som en liste af rækker ("X."-strenge), så den kan bruges alle
+    steder hvor LEVEL_MAP bruges.
+    """
+
+    def __init__(self, name, tiles, spans, spawn_points, merge=MERGE_MODE, buffer=None):
+        self.name = name
+        self.tiles = tiles
+        self.spans = spans
+        self.spawn_points = spawn_points
+        self.merge = merge
+        self.buffer = buffer  # mmap'en som tiles og spans peger ind i
+        self.terrain = None  # Platforme og grid, bygget af Map.load_map første gang
+
+    def __len__(self):
+        return self.tiles.shape[0]
+
+    def __getitem__(self, row):
+        return "".join("X" if tile else "." for tile in self.tiles[row])
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+
+def parse_level(path):
+    """Læser en bane-fil. Returnerer (navn, rækker, startpunkter)."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    if path.endswith(".json"):
+        data = json.loads(text)
+        rows = list(data["map"])
+        spawn_points = [tuple(point) for point in data.get("spawns", SPAWN_POINTS)]
+        return data.get("name", name), rows, spawn_points
+
+    rows = [line.strip() for line in text.splitlines() if line.strip() and not line.startswith("#")]
+    markers = {}
+    for row_index, row in enumerate(rows):
+        for col_index, tile in enumerate(row):
+            if tile.isdigit() and tile != "0":
+                markers[int(tile)] = (int((col_index + 0.5) * TILE_WIDTH), int((row_index + 0.5) * TILE_HEIGHT))
+    spawn_points = [markers[number] for number in sorted(markers)] or list(SPAWN_POINTS)
+    return name, ["".join("X" if tile == "X" else "." for tile in row) for row in rows], spawn_points
+
+
+def encode_level(path, merge=MERGE_MODE):
+    """Banen i path som bytes i cache-formatet."""
+    name, rows, spawn_points = parse_level(path)
+    if len(rows) != ROWS or any(len(row) != COLUMNS for row in rows):
+        raise ValueError(f"{path}: banen skal være {ROWS} rækker med {COLUMNS} felter")
+
+    tiles = level_tiles(rows)
+    spans = np.array(tile_spans(tiles, merge), dtype="<u2").reshape(-1, 4)
+    encoded_name = name.encode("utf-8")[:255]
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, ROWS, COLUMNS, len(spans), len(spawn_points), len(encoded_name)),
+        encoded_name,
+        tiles.astype(np.uint8).tobytes(),
+        spans.tobytes(),
+        np.array(spawn_points, dtype="<i2").tobytes(),
+    ])
+
+
+def write_cache(target, data):
+    # Skrives til en midlertidig fil først, så en anden proces aldrig ser en halv cache
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = f"{target}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, target)
+    prune_cache(target)
+
+
+def load_cached(target, encode, read, merge):
+    """Fælles for baner og verdener: læser cachen i target med read(buffer, merge) fra en mmap.
+
+    Mangler cachen, laves den med encode() og gamle caches for samme kilde
+    slettes. En tom, ødelagt eller forældet cache laves forfra. Kan cachen ikke
+    skrives eller slettes, læses de nye bytes direkte fra hukommelsen.
+    """
+    for _ in range(2):
+        if not os.path.exists(target):
+            data = encode()
+            try:
+                write_cache(target, data)
+            except OSError:
+                # Uden skriveadgang ligger det hele bare i hukommelsen
+                break
+        with open(target, "rb") as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # En tom fil kan ikke mmap'es
+                buffer = None
+        result = None if buffer is None else read(buffer, merge)
+        if result is not None:
+            return result
+        # Cache fra en ældre version af formatet, eller en tom eller ødelagt fil
+        if buffer is not None:
+            buffer.close()
+        try:
+            os.remove(target)
+        except OSError:
+            # Cachen kan ikke slettes (fx skrivebeskyttet)
+            break
+
+    result = read(encode(), merge)
+    if result is None:
+        raise ValueError(f"{target}: kan ikke læse den cache der lige er lavet")
+    return result
+
+
+def prune_cache(target):
+    """Sletter caches for samme bane (eller verden) og merge med en anden hash (fra en ældre udgave af banen)."""
+    directory, current = os.path.split(target)
+    match = CACHE_NAME.fullmatch(current)
+    if match is None:
+        return
+    for name in os.listdir(directory):
+        other = CACHE_NAME.fullmatch(name)
+        if other is not None and name != current and other.group(1, 3, 4) == match.group(1, 3, 4):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def read_level(buffer, merge):
+    """Level med views i buffer, eller None hvis cachen er fra en anden version eller ødelagt."""
+    try:
+        magic, version, rows, columns, platforms, spawns, name_length = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            return None
+        offset = HEADER.size
+        name = bytes(buffer[offset:offset + name_length]).decode("utf-8")
+        offset += name_length
+        tiles = np.frombuffer(buffer, np.bool_, rows * columns, offset).reshape(rows, columns)
+        offset += tiles.nbytes
+        spans = np.frombuffer(buffer, "<u2", platforms * 4, offset).reshape(platforms, 4)
+        offset += spans.nbytes
+        spawn_points = np.frombuffer(buffer, "<i2", spawns * 2, offset).reshape(spawns, 2)
+    except (struct.error, ValueError, UnicodeDecodeError):
+        return None
+    return Level(name, tiles, spans, [tuple(point) for point in spawn_points.tolist()], merge, buffer)
+
+
+def cache_path(path, merge=MERGE_MODE):
+    name = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    return os.path.join(LEVEL_CACHE_DIR, f"{name}-{file_hash(path)[:16]}-{merge}.lvl")
+
+
+def load_level(path, merge=MERGE_MODE):
+    """Indlæser en bane fra cachen, og kompilerer den først hvis kilden er ny eller ændret."""
+    cached = cache_path(path, merge)
+    level = _levels.get(cached)
+    if level is not None:
+        return level
+
+    level = load_cached(cached, lambda: encode_level(path, merge), read_level, merge)
+    _levels[cached] = level
+    return level
+
+
+def level_files(directory=LEVEL_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith(LEVEL_EXTENSIONS))
+
+
+class LevelRotation:
+    """Giver banerne i en mappe på skift. Nye filer kommer med uden genstart."""
+
+    def __init__(self, directory=LEVEL_DIR, merge=MERGE_MODE):
+        self.directory = directory
+        self.merge = merge
+        self.position = 0
+
+    def __len__(self):
+        return len(level_files(self.directory))
+
+    def next(self):
+        """Næste bane, eller None hvis mappen ikke har nogen baner der kan indlæses.
+
+        En ødelagt bane-fil springes over med en advarsel, så spillet kører videre.
+        """
+        files = level_files(self.directory)
+        for _ in range(len(files)):
+            path = files[self.position % len(files)]
+            self.position += 1
+            try:
+                return load_level(path, self.merge)
+            except (ValueError, KeyError) as error:
+                print(f"Springer {os.path.basename(path)} over: {error}", file=sys.stderr)
+        return None
+
+
+def main():
+    for path in level_files():
+        level = load_level(path)
+        print(f"{os.path.basename(path):20} {level.name:12} {len(level.spans):4} platforme  "
+              f"start {level.spawn_points}")
+        for row in level:
+            print("  " + row)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
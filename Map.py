@@ -1,5 +1,5 @@
+import numpy as np
 import pygame
-import sys
 
 # Skærmstørrelse
 SCREEN_WIDTH = 1000
@@ -10,63 +10,263 @@ PLATFORM_COLOR = (100, 100, 255)  # blå platforme
 GROUND_COLOR = (200, 50, 50)      # rød bund
 BG_COLOR = (30, 30, 30)           # baggrund
 
-# Map layout (2D array)
-# X = platform, . = tomt rum
-LEVEL_MAP = [
-    "................................................................................",
-    "XX................................XXXXXXXXXXXX................................XX",
-    "......................XXXXX..........................XXXXX......................",
-    "......XXXX............................................................XXXX......",
-    "...........................XXXXX...............XXXXX............................",
-    "XXX..........................................................................XXX",
-    ".................XXXX.....................................XXXX..................",
-    "..................................XXXXXXXXXXXX..................................",
-    "XXXXX......................................................................XXXXX",
-    "..........XXXXXX................................................XXXXXX..........",
-    ".........................XXXXXX..................XXXXXX.........................",
-    "....................................XXXXXXXX....................................",
-    ".................XXXX.....................................XXXX..................",
-    "XXXXX..................................XX..................................XXXXX",
-    "................................................................................",
-    ".....XXXXXXX.........XX........XXXXX........XXXXX.......XX..........XXXXXXX.....",
-    "................................................................................",
-    "...............XXX...........XX....................XX.........XXX...............",
-    "..................................XXXXXXXXXXXX..................................",
-    "................................................................................"
-]
-
-# Dynamisk beregning af rækker/kolonner ud fra LEVEL_MAP
-ROWS = len(LEVEL_MAP)
-COLUMNS = len(LEVEL_MAP[0])
-TILE_WIDTH = SCREEN_WIDTH / COLUMNS
-TILE_HEIGHT = SCREEN_HEIGHT / ROWS
+# Sammenlægning af felter: None = et rect pr. felt, "rows" = vandrette rækker,
+# "blocks" = rækker med samme spænd lægges sammen til rektangulære blokke
+MERGE_MODE = "blocks"
+
+
+def tile_spans(level_map, merge=MERGE_MODE):
+    """Finder platformene i et map som (col0, row0, col1, row1) med eksklusive slutfelter.
+
+    level_map kan være strenge med "X" for platform eller rækker af bools (fx et numpy-grid).
+    """
+    spans = []
+    open_blocks = {}
+    for row_index, row in enumerate(level_map):
+        if isinstance(row, str):
+            row = [tile == "X" for tile in row]
+        runs = []
+        col_index = 0
+        while col_index < len(row):
+            if not row[col_index]:
+                col_index += 1
+                continue
+            start = col_index
+            col_index += 1
+            if merge is not None:
+                while col_index < len(row) and row[col_index]:
+                    col_index += 1
+            runs.append((start, col_index))
+
+        if merge != "blocks":
+            spans.extend((c0, row_index, c1, row_index + 1) for c0, c1 in runs)
+            continue
+
+        # En række med samme spænd som rækken ovenover forlænger blokken
+        next_blocks = {}
+        for run in runs:
+            block = open_blocks.pop(run, None)
+            if block is None:
+                block = [run[0], row_index, run[1], row_index + 1]
+                spans.append(block)
+            else:
+                block[3] = row_index + 1
+            next_blocks[run] = block
+        open_blocks = next_blocks
+
+    spans = [tuple(span) for span in spans]
+    # Samme rækkefølge som et felt ad gangen (række for række)
+    spans.sort(key=lambda span: (span[1], span[0]))
+    return spans
+
+
+def span_rect(span, tile_width, tile_height):
+    col0, row0, col1, row1 = span
+    return pygame.Rect(col0 * tile_width, row0 * tile_height,
+                       (col1 - col0) * tile_width, (row1 - row0) * tile_height)
+
+
+def merge_tiles(level_map, tile_width, tile_height, merge=MERGE_MODE):
+    """Laver platform-rects ud fra et map, sammenlagt efter merge."""
+    return [span_rect(span, tile_width, tile_height) for span in tile_spans(level_map, merge)]
+
+
+def rect_span(rect, tile_width, tile_height):
+    """Finder felterne et platform-rect dækker (rects er afrundet ned til hele pixels)."""
+    return (round(rect.left / tile_width), round(rect.top / tile_height),
+            round(rect.right / tile_width), round(rect.bottom / tile_height))
+
+
+def level_tiles(level_map):
+    """Banen som et numpy bool-grid (rækker x kolonner), True = platform."""
+    return np.array([[tile == "X" for tile in row] for row in level_map], dtype=bool)
+
+
+def carve_circle(tiles, center, radius, tile_width, tile_height):
+    """Fjerner alle felter i tiles som en cirkel rører, og returnerer de ramte felter.
+
+    Kun felterne inden for cirklens bounding box regnes igennem. Resultatet er
+    (col0, row0, col1, row1) for de felter der blev fjernet, eller None.
+    """
+    rows, columns = tiles.shape
+    cx, cy = center
+    col0 = max(0, int((cx - radius) // tile_width))
+    row0 = max(0, int((cy - radius) // tile_height))
+    col1 = min(columns, int((cx + radius) // tile_width) + 1)
+    row1 = min(rows, int((cy + radius) // tile_height) + 1)
+    if col0 >= col1 or row0 >= row1:
+        return None
+
+    # Afstand fra cirklens centrum til nærmeste punkt i hvert felt
+    lefts = np.arange(col0, col1) * tile_width
+    tops = np.arange(row0, row1) * tile_height
+    dx = np.clip(cx, lefts, lefts + tile_width) - cx
+    dy = np.clip(cy, tops, tops + tile_height) - cy
+    inside = dy[:, None] ** 2 + dx[None, :] ** 2 < radius * radius
+
+    window = tiles[row0:row1, col0:col1]
+    hit = window & inside
+    if not hit.any():
+        return None
+    window[hit] = False
+
+    hit_rows = np.flatnonzero(hit.any(axis=1))
+    hit_cols = np.flatnonzero(hit.any(axis=0))
+    return (col0 + int(hit_cols[0]), row0 + int(hit_rows[0]),
+            col0 + int(hit_cols[-1]) + 1, row0 + int(hit_rows[-1]) + 1)
+
+
+def sweep_x(rect, previous, dx, platforms):
+    """Stopper en vandret bevægelse fra previous til rect ved den første platform på vejen.
+
+    Platforme rect overlapper tæller med som ved en almindelig overlap-test, og
+    platforme rect er sprunget helt forbi (tunneling) tæller også med. Rækkefølgen
+    af platforms er ligegyldig. Returnerer den ramte platform eller None.
+    """
+    hit = None
+    top, bottom, left, right = rect.top, rect.bottom, rect.left, rect.right
+    if dx > 0:
+        for platform in platforms:
+            if (platform.left < right and platform.top < bottom and platform.bottom > top
+                    and (platform.right > left or platform.left >= previous.right)
+                    and (hit is None or platform.left < hit.left)):
+                hit = platform
+        if hit is not None:
+            rect.right = hit.left
+    elif dx < 0:
+        for platform in platforms:
+            if (platform.right > left and platform.top < bottom and platform.bottom > top
+                    and (platform.left < right or platform.right <= previous.left)
+                    and (hit is None or platform.right > hit.right)):
+                hit = platform
+        if hit is not None:
+            rect.left = hit.right
+    return hit
+
+
+def sweep_y(rect, previous, dy, platforms):
+    """Som sweep_x, men lodret: et fald stopper på den øverste platform, et hop under den nederste."""
+    hit = None
+    top, bottom, left, right = rect.top, rect.bottom, rect.left, rect.right
+    if dy > 0:
+        for platform in platforms:
+            if (platform.top < bottom and platform.left < right and platform.right > left
+                    and (platform.bottom > top or platform.top >= previous.bottom)
+                    and (hit is None or platform.top < hit.top)):
+                hit = platform
+        if hit is not None:
+            rect.bottom = hit.top
+    elif dy < 0:
+        for platform in platforms:
+            if (platform.bottom > top and platform.left < right and platform.right > left
+                    and (platform.top < bottom or platform.bottom <= previous.top)
+                    and (hit is None or platform.bottom > hit.bottom)):
+                hit = platform
+        if hit is not None:
+            rect.top = hit.bottom
+    return hit
+
+
+class PlatformGrid:
+    """Spatialt indeks: platformene ligger i spande på størrelse med et felt.
+
+    copy() deler spandene med originalen (copy-on-write): en spand kopieres
+    først når den ene af dem ændrer den, så en eksplosion kun kopierer de
+    spande krateret rører.
+    """
+
+    def __init__(self, cell_width, cell_height, platforms=()):
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.cells = {}
+        self.owned = None  # Spandene der ikke deles med en anden grid (None = alle)
+        for platform in platforms:
+            self.add(platform)
+
+    def cells_for(self, rect):
+        col0 = int(rect.left // self.cell_width)
+        row0 = int(rect.top // self.cell_height)
+        col1 = max(col0, int((rect.right - 1) // self.cell_width))
+        row1 = max(row0, int((rect.bottom - 1) // self.cell_height))
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                yield col, row
+
+    def copy(self):
+        """Ny grid med de samme platforme. Spandene deles, til en af de to grids ændrer dem."""
+        grid = PlatformGrid(self.cell_width, self.cell_height)
+        grid.cells = dict(self.cells)
+        grid.owned = set()
+        self.owned = set()
+        return grid
+
+    def bucket(self, cell):
+        """Spanden for cell, kopieret først hvis den stadig deles med en anden grid."""
+        bucket = self.cells.get(cell)
+        if bucket is not None and self.owned is not None and cell not in self.owned:
+            bucket = self.cells[cell] = list(bucket)
+            self.owned.add(cell)
+        return bucket
+
+    def add(self, platform):
+        for cell in self.cells_for(platform):
+            bucket = self.bucket(cell)
+            if bucket is None:
+                self.cells[cell] = [platform]
+                if self.owned is not None:
+                    self.owned.add(cell)
+            else:
+                bucket.append(platform)
+
+    def remove(self, platform):
+        for cell in self.cells_for(platform):
+            bucket = self.bucket(cell)
+            if not bucket:
+                continue
+            for index, other in enumerate(bucket):
+                if other is platform:
+                    del bucket[index]
+                    break
+            if not bucket:
+                del self.cells[cell]
+
+    def query(self, rect):
+        """Platforme i de felter rect dækker, i samme rækkefølge som platformslisten."""
+        found = {}
+        cells = self.cells
+        for cell in self.cells_for(rect):
+            for platform in cells.get(cell, ()):
+                found[id(platform)] = platform
+        if len(found) < 2:
+            return list(found.values())
+        return sorted(found.values(), key=lambda platform: (platform.top, platform.left))
 
 
 class Map:
-    def __init__(self, screen_width, screen_height):
+    """Platforme og bund for en bane (fx en Levels.Level eller rækker af "X."-strenge)."""
+
+    def __init__(self, screen_width, screen_height, level_map, merge=MERGE_MODE):
         self.screen_width = screen_width
         self.screen_height = screen_height
+        self.level_map = level_map
         self.platforms = []
         self.ground = None
-        self.rows = len(LEVEL_MAP)
-        self.columns = len(LEVEL_MAP[0])
+        self.rows = len(level_map)
+        self.columns = len(level_map[0])
         self.tile_width = self.screen_width / self.columns
         self.tile_height = self.screen_height / self.rows
+        self.merge = merge
         self.load_map()
 
     def load_map(self):
-        """Laver platformene ud fra LEVEL_MAP + en rød bund."""
+        """Laver platformene ud fra banen + en rød bund."""
         self.platforms.clear()
 
         # Byg de blå platforme
-        for row_index, row in enumerate(LEVEL_MAP):
-            for col_index, tile in enumerate(row):
-                if tile == "X":
-                    rect = pygame.Rect(col_index * TILE_WIDTH, row_index * TILE_HEIGHT, TILE_WIDTH, TILE_HEIGHT)
-                    self.platforms.append(rect)
+        self.platforms.extend(merge_tiles(self.level_map, self.tile_width, self.tile_height, self.merge))
 
         # Lav rød bund-platform (hele bunden af skærmen)
-        self.ground = pygame.Rect(0, SCREEN_HEIGHT - TILE_HEIGHT, SCREEN_WIDTH, TILE_HEIGHT)
+        self.ground = pygame.Rect(0, self.screen_height - self.tile_height, self.screen_width, self.tile_height)
 
     def draw(self, screen):
         """Tegner platforme og bund på skærmen."""
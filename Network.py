@@ -0,0 +1,567 @@
+"""Netværksspil over UDP med en autoritativ server.
+
+Serveren kører GameState og er den eneste der bestemmer hvad der sker.
+Klienter sender deres input-byte (samme bits som i Replay.py) når den ændrer
+sig, og får et snapshot af spillet hvert SNAPSHOT_INTERVAL tick. Snapshots er
+delta-komprimeret mod det seneste snapshot klienten har kvitteret for: kun
+ændrede spillerfelter, ændrede eller fjernede bomber og de felter i banen der
+er sprunget væk siden. Står alt stille, sendes kun et snapshot hvert
+IDLE_SNAPSHOT_INTERVAL tick, og en klient der ikke har sendt noget i
+CLIENT_TIMEOUT ticks fjernes, så pladsen bliver ledig igen.
+
+Med to bots i loopback er det ca. 0.65-0.75 KB/s ned pr. klient inklusive
+IP/UDP-headers (UDP_OVERHEAD), hvoraf headerne er 280 B/s. Op er 10 bytes pr.
+input-ændring, plus en kvittering hvert ACK_INTERVAL tick.
+
+    python Network.py server --port 5005
+    python Network.py client --host 192.168.1.10 --port 5005
+    python Network.py loopback --seconds 10 --speed 4
+"""
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+from Assets import load_scaled, load_sprite
+from Policies import POLICIES
+from Replay import INPUT_TABLE, pack_inputs
+from Simulation import BOMB_SIZE, FPS, PLAYER_SIZE, SCREEN_HEIGHT, SCREEN_WIDTH, GameState, read_input
+from TextCache import render_text
+
+PORT = 5005
+SNAPSHOT_INTERVAL = 6  # Ticks mellem snapshots (10 pr. sekund)
+IDLE_SNAPSHOT_INTERVAL = FPS // 2  # Ticks mellem snapshots når intet har ændret sig
+CLIENT_TIMEOUT = FPS * 5  # Ticks uden pakker før serveren fjerner en klient
+ACK_INTERVAL = 15  # Ticks mellem kvitteringer når inputtet ikke ændrer sig
+HISTORY = 64  # Snapshots der huskes som mulige baselines
+RESET_TICKS = FPS * 3  # Pause efter en sejr før næste runde
+VELOCITY_SCALE = 10  # velocity_y sendes som heltal i tiendedele
+UDP_OVERHEAD = 28  # IPv4- og UDP-header pr. pakke
+
+NO_BASELINE = 0xFFFF  # I et snapshot: sendt uden baseline
+NO_ACK = 0xFFFFFFFF  # Fra en klient: har ikke fået et snapshot endnu
+NO_WINNER = 255
+
+# Pakketyper (første byte)
+JOIN, WELCOME, INPUT, SNAPSHOT = 1, 2, 3, 4
+
+WELCOME_PACKET = struct.Struct("<BBB")  # type, spillerens index, antal spillere
+INPUT_PACKET = struct.Struct("<BIIB")  # type, sekvensnummer, kvitteret tick, input-byte
+SNAPSHOT_HEADER = struct.Struct("<BIHB")  # type, tick, ticks siden baseline, vinder
+FIELD = struct.Struct("<h")
+BOMB_COUNTS = struct.Struct("<BB")  # ændrede, fjernede
+BOMB_RECORD = struct.Struct("<Hhhb")  # id, centrum x, centrum y, eksploderet
+BOMB_ID = struct.Struct("<H")
+TILES_HEADER = struct.Struct("<BH")  # mode, antal felter
+TILE_INDEX = struct.Struct("<H")
+
+# Hvordan banen er sendt i et snapshot
+TILES_SAME, TILES_TOGGLED, TILES_FULL = 0, 1, 2
+
+# x, y, velocity_y, flag (on_ground=1, facing_right=2), score, drop_cooldown
+PLAYER_FIELDS = 6
+COOLDOWN_FIELD = 5
+
+PLAYER_IMAGES = ["Boneca Ambalabu.png", "Frigo Camelo.png"]
+CONTROLS = {"up": pygame.K_w, "left": pygame.K_a, "right": pygame.K_d, "drop": pygame.K_LSHIFT}
+WHITE = (255, 255, 255)
+PLATFORM_COLOR = (100, 100, 255)
+GROUND_COLOR = (200, 50, 50)
+BG_COLOR = (30, 30, 30)
+ORANGE = (255, 165, 0)
+
+
+# SNAPSHOTS
+# En state er (tick, vinder, spillere, bomber, felter): spillere er en tuple af
+# PLAYER_FIELDS heltal pr. spiller, bomber et dict id -> (x, y, eksploderet) og
+# felter banen som fladt bool-array.
+def player_fields(player):
+    flags = int(player.on_ground) | int(player.facing_right) << 1
+    return (player.rect.x, player.rect.y, round(player.velocity_y * VELOCITY_SCALE),
+            flags, player.score, player.drop_cooldown)
+
+
+def predicted_players(baseline, tick):
+    """Spillerne i baselinen som de forventes at se ud i tick: cooldown tæller ned af sig selv."""
+    elapsed = tick - baseline[0]
+    players = []
+    for fields in baseline[2]:
+        fields = list(fields)
+        fields[COOLDOWN_FIELD] = max(0, fields[COOLDOWN_FIELD] - elapsed)
+        players.append(tuple(fields))
+    return players
+
+
+def unchanged(state, sent):
+    """True hvis state ikke har andet nyt end tick i forhold til et tidligere sendt snapshot."""
+    return (sent is not None and state[1] == sent[1] and state[3] == sent[3]
+            and state[2] == tuple(predicted_players(sent, state[0])) and np.array_equal(state[4], sent[4]))
+
+
+def encode_snapshot(state, baseline=None):
+    """state som bytes. Med en baseline sendes kun det der er ændret siden den."""
+    tick, winner, players, bombs, tiles = state
+    parts = [SNAPSHOT_HEADER.pack(SNAPSHOT, tick, NO_BASELINE if baseline is None else tick - baseline[0],
+                                  NO_WINNER if winner is None else winner)]
+
+    # Spillere: en bitmaske over felterne efterfulgt af de felter der ikke er som forventet
+    if baseline is not None:
+        old_players = predicted_players(baseline, tick)
+    else:
+        old_players = [(None,) * PLAYER_FIELDS] * len(players)
+    for fields, old_fields in zip(players, old_players):
+        mask = 0
+        values = []
+        for bit, (value, old_value) in enumerate(zip(fields, old_fields)):
+            if value != old_value:
+                mask |= 1 << bit
+                values.append(FIELD.pack(value))
+        parts.append(bytes((mask,)))
+        parts.extend(values)
+
+    old_bombs = baseline[3] if baseline is not None else {}
+    changed = [(bomb_id, record) for bomb_id, record in bombs.items() if old_bombs.get(bomb_id) != record]
+    removed = [bomb_id for bomb_id in old_bombs if bomb_id not in bombs]
+    parts.append(BOMB_COUNTS.pack(len(changed), len(removed)))
+    parts.extend(BOMB_RECORD.pack(bomb_id, *record) for bomb_id, record in changed)
+    parts.extend(BOMB_ID.pack(bomb_id) for bomb_id in removed)
+
+    # Banen: de felter der er skiftet, eller hele banen hvis det er mindre
+    full = np.packbits(tiles).tobytes()
+    toggled = np.flatnonzero(tiles != baseline[4]) if baseline is not None else None
+    if toggled is None or len(toggled) * TILE_INDEX.size > len(full):
+        parts.append(TILES_HEADER.pack(TILES_FULL, len(tiles)))
+        parts.append(full)
+    elif len(toggled):
+        parts.append(TILES_HEADER.pack(TILES_TOGGLED, len(toggled)))
+        parts.append(toggled.astype("<u2").tobytes())
+    else:
+        parts.append(TILES_HEADER.pack(TILES_SAME, 0))
+    return b"".join(parts)
+
+
+def decode_snapshot(data, baselines, num_players, num_tiles):
+    """Det modsatte af encode_snapshot. Returnerer None hvis baselinen er glemt."""
+    _, tick, since_baseline, winner = SNAPSHOT_HEADER.unpack_from(data)
+    offset = SNAPSHOT_HEADER.size
+    if since_baseline == NO_BASELINE:
+        baseline = (None, None, [(0,) * PLAYER_FIELDS] * num_players, {}, np.zeros(num_tiles, dtype=bool))
+        old_players = baseline[2]
+    else:
+        baseline = baselines.get(tick - since_baseline)
+        if baseline is None:
+            return None
+        old_players = predicted_players(baseline, tick)
+
+    players = []
+    for old_fields in old_players:
+        mask = data[offset]
+        offset += 1
+        fields = list(old_fields)
+        for bit in range(PLAYER_FIELDS):
+            if mask & (1 << bit):
+                fields[bit] = FIELD.unpack_from(data, offset)[0]
+                offset += FIELD.size
+        players.append(tuple(fields))
+
+    bombs = dict(baseline[3])
+    changed, removed = BOMB_COUNTS.unpack_from(data, offset)
+    offset += BOMB_COUNTS.size
+    for _ in range(changed):
+        bomb_id, x, y, exploded = BOMB_RECORD.unpack_from(data, offset)
+        offset += BOMB_RECORD.size
+        bombs[bomb_id] = (x, y, exploded)
+    for _ in range(removed):
+        bombs.pop(BOMB_ID.unpack_from(data, offset)[0], None)
+        offset += BOMB_ID.size
+
+    mode, count = TILES_HEADER.unpack_from(data, offset)
+    offset += TILES_HEADER.size
+    if mode == TILES_FULL:
+        packed = np.frombuffer(data, np.uint8, (count + 7) // 8, offset)
+        tiles = np.unpackbits(packed)[:count].astype(bool)
+    else:
+        tiles = baseline[4]
+        if mode == TILES_TOGGLED:
+            tiles = tiles.copy()
+            tiles[np.frombuffer(data, "<u2", count, offset)] ^= True
+
+    return tick, None if winner == NO_WINNER else winner, tuple(players), bombs, tiles
+
+
+# SERVER
+class RemoteClient:
+    def __init__(self, index):
+        self.index = index
+        self.sequence = -1
+        self.ack = None  # Seneste snapshot klienten har fået
+        self.sent = None  # Seneste snapshot sendt til klienten
+        self.last_heard = 0  # Serverens tick da klienten sidst sendte noget
+        self.bytes_sent = 0
+        self.packets_sent = 0
+
+
+class GameServer(asyncio.DatagramProtocol):
+    """Kører kampen og sender snapshots til de klienter der har meldt sig."""
+
+    def __init__(self, game=None, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.game = game or GameState()
+        self.snapshot_interval = snapshot_interval
+        self.transport = None
+        self.clients = {}  # adresse -> RemoteClient
+        self.inputs = [INPUT_TABLE[0]] * len(self.game.players)
+        self.history = {}  # tick -> state
+        self.bomb_ids = {}  # (id(bomb), spawn_tick) -> bombens id på nettet
+        self.next_bomb_id = 0
+        self.reset_tick = None
+        self.tick_times = deque(maxlen=FPS * 10)
+        self.ticks = 0  # Ticks serveren har kørt (game.tick kan spoles af en reset)
+        self.bytes_received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.bytes_received += len(data)
+        if not data:
+            return
+        client = self.clients.get(addr)
+        if data[0] == JOIN:
+            if client is None:
+                taken = {other.index for other in self.clients.values()}
+                free = [index for index in range(len(self.game.players)) if index not in taken]
+                if not free:
+                    return
+                client = RemoteClient(free[0])
+                self.clients[addr] = client
+            client.last_heard = self.ticks
+            self.send(addr, client, WELCOME_PACKET.pack(WELCOME, client.index, len(self.game.players)))
+        elif data[0] == INPUT and client is not None and len(data) == INPUT_PACKET.size:
+            _, sequence, ack, value = INPUT_PACKET.unpack(data)
+            client.last_heard = self.ticks
+            # UDP kan bytte om på pakker, så gamle input ignoreres
+            if sequence > client.sequence:
+                client.sequence = sequence
+                self.inputs[client.index] = INPUT_TABLE[value & 0xF]
+            if ack in self.history and (client.ack is None or ack > client.ack):
+                client.ack = ack
+
+    def send(self, addr, client, packet):
+        client.bytes_sent += len(packet)
+        client.packets_sent += 1
+        self.transport.sendto(packet, addr)
+
+    def capture(self):
+        game = self.game
+        players = tuple(player_fields(player) for player in game.players)
+        bombs = {}
+        live = {}
+        for bomb in game.bombs:
+            # Bomber genbruges, så en ny spawn_tick betyder en ny bombe
+            key = (id(bomb), bomb.spawn_tick)
+            bomb_id = self.bomb_ids.get(key)
+            if bomb_id is None:
+                bomb_id = self.next_bomb_id
+                self.next_bomb_id = (self.next_bomb_id + 1) & 0xFFFF
+            live[key] = bomb_id
+            bombs[bomb_id] = (bomb.rect.centerx, bomb.rect.centery, int(bomb.exploded))
+        self.bomb_ids = live
+        return game.tick, game.winner, players, bombs, game.map.tiles.ravel().copy()
+
+    def tick(self):
+        start = time.perf_counter()
+        game = self.game
+        game.step(self.inputs)
+        self.ticks += 1
+        if game.winner is not None:
+            if self.reset_tick is None:
+                self.reset_tick = game.tick + RESET_TICKS
+            elif game.tick >= self.reset_tick:
+                game.reset()
+                self.reset_tick = None
+
+        if game.tick % self.snapshot_interval == 0:
+            self.drop_silent_clients()
+            state = self.capture()
+            self.history[game.tick] = state
+            self.history.pop(game.tick - HISTORY * self.snapshot_interval, None)
+            for addr, client in self.clients.items():
+                # Intet nyt siden sidste snapshot: kun et en gang imellem, hvis det er gået tabt
+                if unchanged(state, client.sent) and game.tick - client.sent[0] < IDLE_SNAPSHOT_INTERVAL:
+                    continue
+                client.sent = state
+                self.send(addr, client, encode_snapshot(state, self.history.get(client.ack)))
+        self.tick_times.append(time.perf_counter() - start)
+
+    def drop_silent_clients(self):
+        """Fjerner klienter der ikke har sendt noget i CLIENT_TIMEOUT ticks. Deres spiller står stille."""
+        for addr, client in list(self.clients.items()):
+            if self.ticks - client.last_heard > CLIENT_TIMEOUT:
+                del self.clients[addr]
+                self.inputs[client.index] = INPUT_TABLE[0]
+
+
+# CLIENT
+class GameClient(asyncio.DatagramProtocol):
+    """Sender input til serveren og holder en kopi af spillet til visning."""
+
+    def __init__(self):
+        self.game = GameState()  # Spejl af serverens spil, simuleres ikke lokalt
+        self.transport = None
+        self.index = None
+        self.states = {}  # tick -> modtaget state, baselines for de næste deltas
+        self.latest = None
+        self.previous_positions = [player.rect.topleft for player in self.game.players]
+        self.received_at = time.perf_counter()
+        self.input_value = 0
+        self.sequence = 0
+        self.frames = 0
+        self.last_sent = 0
+        self.bytes_sent = 0
+        self.packets_sent = 0
+        self.bytes_received = 0
+        self.snapshots = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.send(bytes((JOIN,)))
+
+    def datagram_received(self, data, addr):
+        self.bytes_received += len(data)
+        if not data:
+            return
+        if data[0] == WELCOME:
+            _, self.index, _ = WELCOME_PACKET.unpack(data)
+        elif data[0] == SNAPSHOT:
+            state = decode_snapshot(data, self.states, len(self.game.players), self.game.map.tiles.size)
+            if state is None or (self.latest is not None and state[0] <= self.latest[0]):
+                return
+            self.snapshots += 1
+            self.states[state[0]] = state
+            oldest = state[0] - HISTORY * SNAPSHOT_INTERVAL
+            for tick in [tick for tick in self.states if tick < oldest]:
+                del self.states[tick]
+            self.latest = state
+            self.apply(state)
+
+    def send(self, packet):
+        self.bytes_sent += len(packet)
+        self.packets_sent += 1
+        self.transport.sendto(packet)
+
+    def apply(self, state):
+        tick, winner, players, bombs, tiles = state
+        game = self.game
+        game.tick = tick
+        game.winner = winner
+        self.previous_positions = [player.rect.topleft for player in game.players]
+        self.received_at = time.perf_counter()
+        for player, (x, y, velocity_y, flags, score, drop_cooldown) in zip(game.players, players):
+            player.rect.topleft = (x, y)
+            player.velocity_y = velocity_y / VELOCITY_SCALE
+            player.on_ground = bool(flags & 1)
+            player.facing_right = bool(flags & 2)
+            player.score = score
+            player.drop_cooldown = drop_cooldown
+
+        for bomb in list(game.bombs):
+            game.release_bomb(bomb)
+        for x, y, exploded in bombs.values():
+            bomb = game.drop_bomb(x, y)
+            if exploded:
+                bomb.exploded = True
+                bomb.rect.size = (game.explosion_radius * 2, game.explosion_radius * 2)
+                bomb.rect.center = (x, y)
+
+        if not np.array_equal(tiles, game.map.tiles.ravel()):
+            game.map.load_tiles(tiles.reshape(game.map.tiles.shape).copy())
+
+    def update(self, inputs):
+        """Kaldes hvert frame med spillerens input. Sender kun når noget er ændret."""
+        self.frames += 1
+        if self.index is None:
+            if self.frames - self.last_sent >= ACK_INTERVAL:
+                self.last_sent = self.frames
+                self.send(bytes((JOIN,)))
+            return
+        value = pack_inputs(inputs)
+        if value != self.input_value or self.frames - self.last_sent >= ACK_INTERVAL:
+            self.input_value = value
+            self.sequence += 1
+            self.last_sent = self.frames
+            ack = NO_ACK if self.latest is None else self.latest[0]
+            self.send(INPUT_PACKET.pack(INPUT, self.sequence, ack, value))
+
+
+# LØKKER
+async def run_ticks(callback, speed=1.0, ticks=None):
+    """Kalder callback FPS * speed gange i sekundet, ticks gange (eller for evigt)."""
+    loop = asyncio.get_running_loop()
+    interval = 1 / (FPS * speed)
+    next_time = loop.time()
+    count = 0
+    while ticks is None or count < ticks:
+        callback()
+        count += 1
+        next_time += interval
+        delay = next_time - loop.time()
+        if delay < -0.25:
+            # For langt bagud (fx maskinen har sovet): spring over i stedet for at indhente
+            next_time = loop.time()
+        await asyncio.sleep(max(0.0, delay))
+
+
+async def serve(host="0.0.0.0", port=PORT, speed=1.0):
+    loop = asyncio.get_running_loop()
+    server = GameServer()
+    transport, _ = await loop.create_datagram_endpoint(lambda: server, local_addr=(host, port))
+    print(f"Server lytter på {host}:{port}")
+    try:
+        await run_ticks(server.tick, speed)
+    finally:
+        transport.close()
+
+
+async def loopback(seconds=10.0, policy_names=("random", "chase"), speed=1.0, seed=0):
+    """Server og klienter i samme proces over 127.0.0.1. Klienterne styres af bots."""
+    loop = asyncio.get_running_loop()
+    server = GameServer()
+    server_transport, _ = await loop.create_datagram_endpoint(lambda: server, local_addr=("127.0.0.1", 0))
+    port = server_transport.get_extra_info("sockname")[1]
+
+    rng = random.Random(seed)
+    clients = []
+    transports = [server_transport]
+    for name in policy_names:
+        client = GameClient()
+        transport, _ = await loop.create_datagram_endpoint(lambda client=client: client,
+                                                           remote_addr=("127.0.0.1", port))
+        transports.append(transport)
+        clients.append((client, POLICIES[name](random.Random(rng.random()))))
+
+    def tick():
+        for client, policy in clients:
+            client.update(policy(client.game, client.index) if client.index is not None else {})
+        server.tick()
+
+    try:
+        await run_ticks(tick, speed, int(seconds * FPS))
+        # Lad de sidste pakker nå frem
+        await asyncio.sleep(0.05)
+    finally:
+        for transport in transports:
+            transport.close()
+    return server, [client for client, _ in clients]
+
+
+def print_report(server, clients):
+    seconds = server.game.tick / FPS
+    times = sorted(server.tick_times)
+    if times:
+        mean = sum(times) / len(times)
+        p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+        print(f"Server-tick: gennemsnit {mean * 1000:.3f} ms  p99 {p99 * 1000:.3f} ms  max {times[-1] * 1000:.3f} ms")
+    scores = "  ".join(f"P{index + 1}={player.score}" for index, player in enumerate(server.game.players))
+    print(f"Server efter {seconds:.1f} s: {scores}")
+    for client in clients:
+        remote = next((other for other in server.clients.values() if other.index == client.index), None)
+        down = remote.bytes_sent if remote else 0
+        down_packets = remote.packets_sent if remote else 0
+        print(f"Klient P{(client.index or 0) + 1}: {client.snapshots} snapshots, "
+              f"ned {down / seconds:.0f} B/s ({(down + down_packets * UDP_OVERHEAD) / seconds:.0f} B/s med headers), "
+              f"op {client.bytes_sent / seconds:.0f} B/s "
+              f"({(client.bytes_sent + client.packets_sent * UDP_OVERHEAD) / seconds:.0f} B/s med headers)")
+
+
+async def play(host, port):
+    """Pygame-klient: tegner den seneste tilstand fra serveren og sender tastaturet."""
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Jump Man (online)")
+    font = pygame.font.Font(None, 36)
+
+    loop = asyncio.get_running_loop()
+    client = GameClient()
+    transport, _ = await loop.create_datagram_endpoint(lambda: client, remote_addr=(host, port))
+    images = [load_sprite(path, (PLAYER_SIZE, PLAYER_SIZE)) for path in PLAYER_IMAGES]
+    bomb_image = load_scaled("bombeRealistic.png", (BOMB_SIZE * 2, BOMB_SIZE * 2))
+    snapshot_time = SNAPSHOT_INTERVAL / FPS
+
+    try:
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+            client.update(read_input(pygame.key.get_pressed(), CONTROLS))
+
+            game = client.game
+            screen.fill(BG_COLOR)
+            pygame.draw.rect(screen, GROUND_COLOR, game.map.ground)
+            for platform in game.map.platforms:
+                pygame.draw.rect(screen, PLATFORM_COLOR, platform)
+            for bomb in game.bombs:
+                if bomb.exploded:
+                    pygame.draw.circle(screen, ORANGE, bomb.rect.center, game.explosion_radius)
+                else:
+                    screen.blit(bomb_image, bomb.rect)
+
+            # Snapshots kommer sjældnere end frames, så spillerne glides imellem dem
+            alpha = min(1.0, (time.perf_counter() - client.received_at) / snapshot_time)
+            for player, previous, (right, left) in zip(game.players, client.previous_positions, images):
+                x = previous[0] + (player.rect.x - previous[0]) * alpha
+                y = previous[1] + (player.rect.y - previous[1]) * alpha
+                screen.blit(right if player.facing_right else left, (x, y))
+
+            for index, player in enumerate(game.players):
+                label = "Dig" if index == client.index else f"Spiller {index + 1}"
+                screen.blit(render_text(font, f"{label}: {player.score}", WHITE), (20 + index * 780, 20))
+            if client.index is None:
+                screen.blit(render_text(font, f"Forbinder til {host}:{port}...", WHITE), (350, 300))
+            elif game.winner is not None:
+                winner = "Du" if game.winner == client.index else f"Spiller {game.winner + 1}"
+                screen.blit(render_text(font, f"{winner} vinder!", WHITE), (SCREEN_WIDTH // 2 - 100, 150))
+
+            pygame.display.flip()
+            await asyncio.sleep(1 / FPS)
+    finally:
+        transport.close()
+        pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spil Jump Man over netværket.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    server_parser = commands.add_parser("server", help="kør en autoritativ server")
+    server_parser.add_argument("--host", default="0.0.0.0")
+    server_parser.add_argument("--port", type=int, default=PORT)
+    client_parser = commands.add_parser("client", help="spil mod en server")
+    client_parser.add_argument("--host", default="127.0.0.1")
+    client_parser.add_argument("--port", type=int, default=PORT)
+    loopback_parser = commands.add_parser("loopback", help="server og bot-klienter i én proces")
+    loopback_parser.add_argument("--seconds", type=float, default=10.0)
+    loopback_parser.add_argument("--speed", type=float, default=1.0, help="gange hurtigere end realtid")
+    loopback_parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    loopback_parser.add_argument("--policy2", choices=sorted(POLICIES), default="chase")
+    loopback_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "server":
+            asyncio.run(serve(args.host, args.port))
+        elif args.command == "client":
+            asyncio.run(play(args.host, args.port))
+        else:
+            server, clients = asyncio.run(loopback(args.seconds, (args.policy, args.policy2), args.speed, args.seed))
+            print_report(server, clients)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,12 @@
+import os
 import pygame
 import sys
 
+from Assets import load_sprite
+from Levels import LEVEL_DIR, load_level
+from Map import MERGE_MODE, span_rect
+from TextCache import render_text
+
 # konstanter
 SCREEN_WIDTH = 1000
 SCREEN_HEIGHT = 650
@@ -8,6 +14,8 @@ FPS = 60
 GRAVITY = 0.9
 PLAYER_SIZE = 50
 PLAYER_SPEED = 4
+# Tegn kun de områder der er ændret (pygame.display.update(rects)) i stedet for hele skærmen
+DIRTY_RENDERING = False
 
 # farver
 WHITE = (255, 255, 255)
@@ -15,60 +23,65 @@ PLATFORM_COLOR = (100, 100, 255)
 GROUND_COLOR = (200, 50, 50)
 BG_COLOR = (30, 30, 30)
 
-LEVEL_MAP = [
-    "................................................................................",
-    "................................................................................",
-    "........................XXX................................XXXXX................",
-    ".........XXXX........XXXXXX................XXXXX......................XXX.......",
-    "........XXXXX...................................................................",
-    "......XXX.....................................................................XX",
-    ".................XXXXX....................................XXXX..................",
-    "..................................XXXXXXXXXXXX..................................",
-    "XXXXX.......................................................................XXXX",
-    "..................................................XXXXXXX........XXXXXX.........",
-    "...........XXXXXX........XXXXXX.................................................",
-    "....................................XXXXXXXX....................................",
-    "...................................XXXXXXXXX..............XXXX............XXXXXX",
-    "XXXXX............XXXX............XXXXX..........................................",
-    "................................................................................",
-    "............................................XXXXX...................XXXXXXX.....",
-    ".....XXXXXXX..............XXXX..................................................",
-    "......................................................XXXXXXXX..................",
-    ".................XXXX.............XXXXXXXXXXXX..................................",
-    "................................................................................"
-]
-
-ROWS = len(LEVEL_MAP)
-COLUMNS = len(LEVEL_MAP[0])
-TILE_WIDTH = SCREEN_WIDTH / COLUMNS
-TILE_HEIGHT = SCREEN_HEIGHT / ROWS
+# Banen ligger i levels/ og kompileres af Levels.py
+LEVEL_FILE = os.path.join(LEVEL_DIR, "02-classic.json")
 
 class Map:
-    def __init__(self):
+    def __init__(self, merge=MERGE_MODE):
         self.platforms = []
         self.ground = None
+        self.merge = merge
+        self.level = None
         self.load_map()
 
     def load_map(self):
         self.platforms.clear()
-        for row_index, row in enumerate(LEVEL_MAP):
-            for col_index, tile in enumerate(row):
-                if tile == "X":
-                    rect = pygame.Rect(col_index * TILE_WIDTH, row_index * TILE_HEIGHT, TILE_WIDTH, TILE_HEIGHT)
-                    self.platforms.append(rect)
-        self.ground = pygame.Rect(0, SCREEN_HEIGHT - TILE_HEIGHT, SCREEN_WIDTH, TILE_HEIGHT)
+        # Felterne er lagt sammen til spænd da banen blev kompileret (se Levels.py)
+        self.level = load_level(LEVEL_FILE, self.merge)
+        # Feltstørrelsen kommer fra banen, så skærmen altid viser hele banen
+        rows, columns = self.level.tiles.shape
+        tile_width = SCREEN_WIDTH / columns
+        tile_height = SCREEN_HEIGHT / rows
+        self.platforms.extend(span_rect(span, tile_width, tile_height) for span in self.level.spans.tolist())
+        self.ground = pygame.Rect(0, SCREEN_HEIGHT - tile_height, SCREEN_WIDTH, tile_height)
 
     def draw(self, screen):
         pygame.draw.rect(screen, GROUND_COLOR, self.ground)
         for platform in self.platforms:
             pygame.draw.rect(screen, PLATFORM_COLOR, platform)
 
-class Player(pygame.sprite.Sprite):
+    def render_layer(self):
+        """Baggrund, bund og platforme i et lag, som dirty-rect mode bruger som baggrund."""
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        layer.fill(BG_COLOR)
+        self.draw(layer)
+        return layer
+
+class ScoreLabel(pygame.sprite.DirtySprite):
+    def __init__(self, font, prefix, pos):
+        super().__init__()
+        self.font = font
+        self.prefix = prefix
+        self.pos = pos
+        self.value = None
+        self.set_value(0)
+
+    def set_value(self, value):
+        # Teksten tegnes kun igen når pointene ændres
+        if value == self.value:
+            return
+        self.value = value
+        self.image = render_text(self.font, f"{self.prefix}{value}", WHITE)
+        self.rect = self.image.get_rect(topleft=self.pos)
+        self.dirty = 1
+
+class Player(pygame.sprite.DirtySprite):
     def __init__(self, x, y, image_path, controls):
         super().__init__()
-        self.original_image = pygame.image.load(image_path).convert_alpha()
-        self.original_image = pygame.transform.scale(self.original_image, (PLAYER_SIZE, PLAYER_SIZE))
-        self.image = self.original_image.copy()
+        self.dirty = 2
+        # Færdigskalerede og spejlede billeder fra asset-cachen
+        self.original_image, self.flipped_image = load_sprite(image_path, (PLAYER_SIZE, PLAYER_SIZE))
+        self.image = self.original_image
         self.rect = self.image.get_rect(center=(x, y))
 
         self.controls = controls
@@ -88,12 +101,12 @@ class Player(pygame.sprite.Sprite):
         if pressed_keys[self.controls["left"]]:
             dx = -self.speed
             if self.facing_right:
-                self.image = pygame.transform.flip(self.original_image, True, False)
+                self.image = self.flipped_image
                 self.facing_right = False
         if pressed_keys[self.controls["right"]]:
             dx = self.speed
             if not self.facing_right:
-                self.image = self.original_image.copy()
+                self.image = self.original_image
                 self.facing_right = True
 
         self.rect.x += dx
@@ -147,14 +160,29 @@ def main():
 
     game_map = Map()
 
-    player1 = Player(200, 100, "Boneca Ambalabu.png", controls_p1)
-    player2 = Player(600, 100, "Frigo Camelo.png", controls_p2)
-    player2.image = pygame.transform.flip(player2.original_image, True, False)
+    spawn_p1, spawn_p2 = game_map.level.spawn_points[:2]
+    player1 = Player(*spawn_p1, "Boneca Ambalabu.png", controls_p1)
+    player2 = Player(*spawn_p2, "Frigo Camelo.png", controls_p2)
+    player2.image = player2.flipped_image
     player2.facing_right = False
 
     all_sprites = pygame.sprite.Group(player1, player2)
     font = pygame.font.SysFont(None, 36)
 
+    score_p1 = ScoreLabel(font, "P1 Score: ", (10, 10))
+    score_p2 = ScoreLabel(font, "P2 Score: ", (SCREEN_WIDTH - 200, 10))
+    hud = pygame.sprite.Group(score_p1, score_p2)
+
+    # Spillerne og pointene tegnes i en LayeredDirty gruppe med banen som baggrund.
+    # Banen ændres aldrig her, så den tegnes kun én gang.
+    dirty_sprites = pygame.sprite.LayeredDirty(player1, player2)
+    dirty_sprites.add(score_p1, score_p2, layer=1)
+    if DIRTY_RENDERING:
+        background = game_map.render_layer()
+        screen.blit(background, (0, 0))
+        dirty_sprites.clear(screen, background)
+        pygame.display.flip()
+
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -169,17 +197,17 @@ def main():
         player1.update(pressed_keys, platforms, ground, player2)
         player2.update(pressed_keys, platforms, ground, player1)
 
-        screen.fill(BG_COLOR)
-        game_map.draw(screen)
-        all_sprites.draw(screen)
-
-        score_text_p1 = font.render(f"P1 Score: {player1.score}", True, WHITE)
-        score_text_p2 = font.render(f"P2 Score: {player2.score}", True, WHITE)
-
-        screen.blit(score_text_p1, (10, 10))
-        screen.blit(score_text_p2, (SCREEN_WIDTH - 200, 10))
-
-        pygame.display.flip()
+        score_p1.set_value(player1.score)
+        score_p2.set_value(player2.score)
+
+        if DIRTY_RENDERING:
+            pygame.display.update(dirty_sprites.draw(screen))
+        else:
+            screen.fill(BG_COLOR)
+            game_map.draw(screen)
+            all_sprites.draw(screen)
+            hud.draw(screen)
+            pygame.display.flip()
         clock.tick(FPS)
 
 if __name__ == "__main__":
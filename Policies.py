@@ -0,0 +1,43 @@
+"""Bots der styrer en spiller i GameState: policy(game, index) -> input-dict.
+
+Bruges af BatchRunner, Env, Network, Rollback og front-enden (bots i arenaen).
+"""
+from Simulation import INPUT_NAMES
+
+
+class RandomPolicy:
+    """Trykker tilfældige knapper og holder dem i nogle ticks, ligesom en rastløs spiller."""
+
+    def __init__(self, rng, hold=10, press_chance=0.4):
+        self.rng = rng
+        self.hold = hold
+        self.press_chance = press_chance
+        self.inputs = dict.fromkeys(INPUT_NAMES, False)
+
+    def __call__(self, game, index):
+        if game.tick % self.hold == 0:
+            self.inputs = {name: self.rng.random() < self.press_chance for name in INPUT_NAMES}
+        return self.inputs
+
+
+class ChasePolicy:
+    """Løber efter modstanderen (i en arena den nærmeste spiller), hopper når den er højere
+    oppe og bomber når den er lige under."""
+
+    def __init__(self, rng, jump_chance=0.05):
+        self.rng = rng
+        self.jump_chance = jump_chance
+
+    def __call__(self, game, index):
+        me = game.players[index].rect
+        target = game.rival(index).rect
+        dx = target.centerx - me.centerx
+        return {
+            "left": dx < -10,
+            "right": dx > 10,
+            "up": target.bottom < me.top or self.rng.random() < self.jump_chance,
+            "drop": abs(dx) < 40 and target.top > me.bottom,
+        }
+
+
+POLICIES = {"random": RandomPolicy, "chase": ChasePolicy}
@@ -0,0 +1,203 @@
+"""Tidsmåling af hver fase i et frame, og et overlay der viser den på skærmen.
+
+    profiler = FrameProfiler()
+    profiler.begin_frame()
+    profiler.start("events")      # starter en fase og afslutter den forrige
+    ...
+    profiler.start("flip")
+    ...
+    profiler.end_frame()
+
+Faser med samme navn i samme frame lægges sammen (fx flere ticks). De sidste
+frames kan gemmes som CSV eller som Chrome trace JSON (åbnes i chrome://tracing
+eller ui.perfetto.dev).
+"""
+import csv
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+WINDOW = 600  # Frames i de rullende percentiler (10 sekunder ved 60 FPS)
+TRACE_FRAMES = 600  # Frames der gemmes med fuld tidslinje til dump
+GRAPH_FRAMES = 240
+BUDGET_MS = 1000 / 60
+
+OVERLAY_BG = (0, 0, 0, 180)
+OVERLAY_TEXT = (230, 230, 230)
+GRAPH_COLOR = (90, 220, 90)
+GRAPH_SLOW_COLOR = (240, 80, 60)
+BUDGET_COLOR = (200, 200, 60)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class FrameProfiler:
+    def __init__(self, window=WINDOW, trace_frames=TRACE_FRAMES):
+        self.phases = []  # Fasernes navne i den rækkefølge de første gang blev set
+        self.window = window
+        self.durations = {}  # fase -> deque af ms pr. frame
+        self.frames = deque(maxlen=window)  # ms for hele frames
+        self.trace = deque(maxlen=trace_frames)  # (frame, [(fase, start_ns, slut_ns)])
+        self.frame_number = 0
+        self.frame_start = None
+        self.current = None
+        self.current_start = 0
+        self.spans = []
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter_ns()
+        self.spans = []
+        self.current = None
+
+    def start(self, phase):
+        """Starter phase. En fase der allerede kører afsluttes først."""
+        now = time.perf_counter_ns()
+        if self.current is not None:
+            self.spans.append((self.current, self.current_start, now))
+        self.current = phase
+        self.current_start = now
+
+    def stop(self):
+        if self.current is not None:
+            self.spans.append((self.current, self.current_start, time.perf_counter_ns()))
+            self.current = None
+
+    def cancel_frame(self):
+        """Glemmer det igangværende frame (fx et frame med en pause mellem to runder)."""
+        self.frame_start = None
+        self.current = None
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        self.stop()
+        end = time.perf_counter_ns()
+        totals = {}
+        for phase, start, stop in self.spans:
+            totals[phase] = totals.get(phase, 0) + stop - start
+        for phase, total in totals.items():
+            durations = self.durations.get(phase)
+            if durations is None:
+                self.phases.append(phase)
+                # Faser der ikke kørte i de første frames fyldes op med 0
+                durations = deque([0.0] * len(self.frames), maxlen=self.window)
+                self.durations[phase] = durations
+            durations.append(total / 1e6)
+        for phase in self.phases:
+            if phase not in totals:
+                self.durations[phase].append(0.0)
+        self.frames.append((end - self.frame_start) / 1e6)
+        self.trace.append((self.frame_number, self.frame_start, end, self.spans))
+        self.frame_number += 1
+        self.frame_start = None
+
+    def stats(self):
+        """[(navn, p50, p95, p99, max)] i ms for hver fase og til sidst hele frames."""
+        rows = []
+        for name, values in [(phase, self.durations[phase]) for phase in self.phases] + [("frame", self.frames)]:
+            if not values:
+                continue
+            ordered = sorted(values)
+            rows.append((name, percentile(ordered, 0.5), percentile(ordered, 0.95),
+                         percentile(ordered, 0.99), ordered[-1]))
+        return rows
+
+    def dump_csv(self, path):
+        """En linje pr. fase pr. frame: frame, fase, start og varighed i ms fra første frame."""
+        origin = self.trace[0][1] if self.trace else 0
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "phase", "start_ms", "duration_ms"])
+            for frame, start, end, spans in self.trace:
+                writer.writerow([frame, "frame", f"{(start - origin) / 1e6:.3f}", f"{(end - start) / 1e6:.3f}"])
+                for phase, span_start, span_end in spans:
+                    writer.writerow([frame, phase, f"{(span_start - origin) / 1e6:.3f}",
+                                     f"{(span_end - span_start) / 1e6:.3f}"])
+
+    def dump_chrome_trace(self, path):
+        """Chrome trace event format: frames på en linje, faser på linjen under."""
+        origin = self.trace[0][1] if self.trace else 0
+        events = []
+        for frame, start, end, spans in self.trace:
+            events.append({"name": f"frame {frame}", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": (start - origin) / 1000, "dur": (end - start) / 1000})
+            for phase, span_start, span_end in spans:
+                events.append({"name": phase, "ph": "X", "pid": 1, "tid": 2,
+                               "ts": (span_start - origin) / 1000, "dur": (span_end - span_start) / 1000})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def dump(self, directory):
+        """Gemmer både CSV og Chrome trace i directory. Returnerer stierne."""
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, time.strftime("frames-%Y%m%d-%H%M%S"))
+        self.dump_csv(stem + ".csv")
+        self.dump_chrome_trace(stem + ".json")
+        return stem + ".csv", stem + ".json"
+
+
+class ProfilerOverlay:
+    """Tabel med percentiler pr. fase og en graf over de sidste frames."""
+
+    def __init__(self, profiler, font, pos=(10, 50), refresh_frames=15):
+        self.profiler = profiler
+        self.font = font
+        self.pos = pos
+        self.refresh_frames = refresh_frames
+        self.visible = False
+        self.panel = None
+        self.age = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.panel = None
+
+    def render_panel(self):
+        rows = self.profiler.stats()
+        line_height = self.font.get_linesize()
+        graph_height = 80
+        width = 420
+        height = (len(rows) + 1) * line_height + graph_height + 20
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill(OVERLAY_BG)
+
+        # Teksten ændrer sig hele tiden, så den tegnes direkte og ikke gennem TextCache
+        header = f"{'fase':14}{'p50':>7}{'p95':>7}{'p99':>7}{'max':>7}  ms"
+        panel.blit(self.font.render(header, True, OVERLAY_TEXT), (8, 4))
+        for index, (name, p50, p95, p99, worst) in enumerate(rows):
+            line = f"{name[:14]:14}{p50:7.2f}{p95:7.2f}{p99:7.2f}{worst:7.2f}"
+            panel.blit(self.font.render(line, True, OVERLAY_TEXT), (8, 4 + (index + 1) * line_height))
+
+        # Frametider: en streg pr. frame, røde over budgettet, og en linje ved budgettet
+        top = height - graph_height - 8
+        frames = list(self.profiler.frames)[-GRAPH_FRAMES:]
+        scale = graph_height / (BUDGET_MS * 2)
+        step = (width - 16) / GRAPH_FRAMES
+        for index, frame_time in enumerate(frames):
+            bar = min(graph_height, frame_time * scale)
+            color = GRAPH_SLOW_COLOR if frame_time > BUDGET_MS else GRAPH_COLOR
+            x = 8 + index * step
+            pygame.draw.line(panel, color, (x, top + graph_height), (x, top + graph_height - bar))
+        budget_y = top + graph_height - BUDGET_MS * scale
+        pygame.draw.line(panel, BUDGET_COLOR, (8, budget_y), (width - 8, budget_y))
+        return panel
+
+    def draw(self, screen):
+        """Tegner overlayet hvis det er slået til. Returnerer det tegnede område (eller None)."""
+        if not self.visible:
+            return None
+        self.age += 1
+        if self.panel is None or self.age >= self.refresh_frames:
+            self.panel = self.render_panel()
+            self.age = 0
+        return screen.blit(self.panel, self.pos)
+
+    def rect(self):
+        if self.panel is None:
+            return None
+        return self.panel.get_rect(topleft=self.pos)
@@ -0,0 +1,210 @@
+"""Optagelse og afspilning af kampe.
+
+En replay gemmer kun input: en byte pr. spiller pr. tick (bit for up, left,
+right og drop) plus seed, bane og kampens regler (lunte, radius, hoppekraft,
+kædereaktioner og merge). Kampen genskabes ved at køre GameState igen, så en fil
+er få kB i stedet for en video. Ved afspilning gemmes en keyframe
+(GameState.snapshot) med faste mellemrum, så man hurtigt kan spole frem og tilbage.
+Keyframes gemmes ikke i filen: første gang man spoler frem i en indlæst replay
+simuleres alle ticks fra starten, derefter springes der fra nærmeste keyframe.
+Filer fra en ældre version uden reglerne afvises.
+
+    python Replay.py replays/kamp.jmr
+"""
+import argparse
+import struct
+import sys
+import time
+
+import numpy as np
+
+from Simulation import INPUT_NAMES, GameState
+
+MAGIC = b"JMRP"
+VERSION = 2
+# magic, version, seed, rækker, kolonner, antal spillere, længde af banens navn
+HEADER = struct.Struct("<4sBIHHBB")
+# Kampens regler (se GameState): lunte i ticks, eksplosionens radius, hoppekraft, kædereaktioner, merge
+RULES = struct.Struct("<IHd?B")
+MERGE_MODES = (None, "rows", "blocks")
+SPAWN = struct.Struct("<hh")
+
+# Bit pr. knap i input-byten: up=1, left=2, right=4, drop=8
+INPUT_BITS = {name: 1 << index for index, name in enumerate(INPUT_NAMES)}
+# Alle 16 mulige input-dicts, så afspilning ikke laver nye dicts hvert tick
+INPUT_TABLE = [{name: bool(value & bit) for name, bit in INPUT_BITS.items()} for value in range(1 << len(INPUT_NAMES))]
+
+KEYFRAME_INTERVAL = 600  # Ticks mellem keyframes (10 sekunder)
+
+
+def pack_inputs(inputs):
+    """Et input-dict -> en byte."""
+    value = 0
+    for name, bit in INPUT_BITS.items():
+        if inputs.get(name):
+            value |= bit
+    return value
+
+
+def unpack_inputs(value):
+    return INPUT_TABLE[value]
+
+
+class ReplayRecorder:
+    """Skriver input tick for tick til en replay-fil."""
+
+    def __init__(self, path, game, seed=0, level_name=""):
+        self.players = len(game.players)
+        self.file = open(path, "wb")
+        self.ticks = 0
+
+        tiles = game.map.tiles
+        name = level_name.encode("utf-8")[:255]
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, tiles.shape[0], tiles.shape[1], self.players, len(name)))
+        self.file.write(RULES.pack(game.bomb_fuse_ticks, game.explosion_radius, game.jump_strength,
+                                   game.chain_reactions, MERGE_MODES.index(game.map.merge)))
+        self.file.write(name)
+        for player in game.players:
+            self.file.write(SPAWN.pack(player.start_x, player.start_y))
+        self.file.write(np.packbits(tiles).tobytes())
+
+    def record(self, inputs):
+        """Gemmer inputtet for et tick (samme liste som gives til GameState.step)."""
+        self.file.write(bytes(pack_inputs(player_inputs) for player_inputs in inputs))
+        self.ticks += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Replay:
+    """En indlæst replay der kan afspilles, spoles og køres til ende."""
+
+    def __init__(self, seed, level_name, level_map, spawn_points, inputs, keyframe_interval=KEYFRAME_INTERVAL,
+                 rules=None):
+        self.seed = seed
+        self.level_name = level_name
+        self.level_map = level_map
+        self.spawn_points = spawn_points
+        self.players = len(spawn_points)
+        self.inputs = inputs
+        self.keyframe_interval = keyframe_interval
+        # Reglerne kampen blev spillet med: (lunte i ticks, radius, hoppekraft, kædereaktioner, merge)
+        self.rules = rules
+
+        self.game = self.create_game()
+        self.position = 0
+        self.keyframes = {0: self.game.snapshot()}
+
+    def create_game(self):
+        if self.rules is None:
+            return GameState(self.level_map, self.spawn_points)
+        fuse_ticks, explosion_radius, jump_strength, chain_reactions, merge = self.rules
+        game = GameState(self.level_map, self.spawn_points, merge=merge, explosion_radius=explosion_radius,
+                         jump_strength=jump_strength, chain_reactions=chain_reactions)
+        # Lunten gemmes i ticks, så den ikke afrundes igen fra millisekunder
+        game.bomb_fuse_ticks = fuse_ticks
+        return game
+
+    @classmethod
+    def load(cls, path, keyframe_interval=KEYFRAME_INTERVAL):
+        with open(path, "rb") as f:
+            data = f.read()
+
+        magic, version, seed, rows, columns, players, name_length = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} er ikke en replay-fil")
+        if version != VERSION:
+            raise ValueError(f"{path} har replay-version {version}, kun {VERSION} understøttes")
+        offset = HEADER.size
+        fuse_ticks, explosion_radius, jump_strength, chain_reactions, merge = RULES.unpack_from(data, offset)
+        rules = (fuse_ticks, explosion_radius, jump_strength, chain_reactions, MERGE_MODES[merge])
+        offset += RULES.size
+
+        level_name = data[offset:offset + name_length].decode("utf-8")
+        offset += name_length
+
+        spawn_points = []
+        for _ in range(players):
+            spawn_points.append(SPAWN.unpack_from(data, offset))
+            offset += SPAWN.size
+
+        tile_bytes = (rows * columns + 7) // 8
+        tiles = np.unpackbits(np.frombuffer(data, np.uint8, tile_bytes, offset))[:rows * columns]
+        level_map = ["".join("X" if tile else "." for tile in row) for row in tiles.reshape(rows, columns)]
+        offset += tile_bytes
+
+        # En afbrudt optagelse kan slutte midt i et tick
+        ticks = (len(data) - offset) // players
+        inputs = data[offset:offset + ticks * players]
+        return cls(seed, level_name, level_map, spawn_points, inputs, keyframe_interval, rules)
+
+    def __len__(self):
+        return len(self.inputs) // self.players
+
+    def tick_inputs(self, tick):
+        start = tick * self.players
+        return [INPUT_TABLE[value] for value in self.inputs[start:start + self.players]]
+
+    def step(self):
+        """Afspiller et tick. Returnerer False når replayen er slut."""
+        if self.position >= len(self):
+            return False
+        self.game.step(self.tick_inputs(self.position))
+        self.position += 1
+        if self.position % self.keyframe_interval == 0 and self.position not in self.keyframes:
+            self.keyframes[self.position] = self.game.snapshot()
+        return True
+
+    def seek(self, tick):
+        """Springer til tick. Starter fra nærmeste keyframe før tick og simulerer resten.
+
+        Der er kun keyframes op til det længste tick der er afspillet, så første
+        spring frem er lineært i antal ticks.
+        """
+        tick = max(0, min(tick, len(self)))
+        keyframe = max(frame for frame in self.keyframes if frame <= tick)
+        # Tilbage i tiden, eller en keyframe der er tættere på end hvor vi er
+        if tick < self.position or keyframe > self.position:
+            self.game.restore(self.keyframes[keyframe])
+            self.position = keyframe
+        while self.position < tick:
+            self.step()
+
+    def run(self):
+        """Afspiller resten af replayen så hurtigt som muligt."""
+        while self.step():
+            pass
+        return self.game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Afspil en replay headless og vis resultatet.")
+    parser.add_argument("path")
+    parser.add_argument("--seek", type=int, default=None, help="stop ved dette tick")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    start = time.perf_counter()
+    if args.seek is None:
+        replay.run()
+    else:
+        replay.seek(args.seek)
+    elapsed = time.perf_counter() - start
+
+    game = replay.game
+    print(f"Bane: {replay.level_name or '?'}  seed: {replay.seed}  ticks: {replay.position}/{len(replay)}")
+    print("Point: " + "  ".join(f"P{index + 1}={player.score}" for index, player in enumerate(game.players)))
+    if elapsed > 0:
+        print(f"Simuleret {replay.position} ticks på {elapsed:.3f} s ({replay.position / elapsed:.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""Rollback-netcode (som GGPO) oven på GameState.
+
+Hvert tick gemmes et snapshot, og input der endnu ikke er kommet fra de andre
+spillere gættes (samme input som sidst). Når det rigtige input kommer og gættet
+var forkert, spoles spillet tilbage til det tick og simuleres frem igen - alt
+inden for ét frame.
+
+    python Rollback.py --delay 8 --seconds 60
+
+kører to peers med bots mod hinanden, hvor input når frem --delay ticks for
+sent, og viser hvor lang tid rollbacks tager i forhold til et frame.
+"""
+import argparse
+import random
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from Policies import POLICIES
+from Replay import INPUT_TABLE, pack_inputs
+from Simulation import FPS, GameState
+
+MAX_ROLLBACK = 8  # Hvor mange ticks der højst kan spoles tilbage
+FRAME_BUDGET = 1 / FPS
+
+
+class RollbackSession:
+    """Én spillers udgave af kampen. Input for alle spillere gives med add_input."""
+
+    def __init__(self, game, max_rollback=MAX_ROLLBACK):
+        self.game = game
+        self.max_rollback = max_rollback
+        players = len(game.players)
+        self.confirmed = [{} for _ in range(players)]  # Pr. spiller: tick -> input-byte
+        self.latest = [0] * players  # Seneste kendte input, bruges som gæt
+        self.used = {}  # tick -> de input-bytes ticket blev simuleret med
+        self.snapshots = {}  # tick -> tilstanden før ticket
+        self.rollback_from = None
+        self.rollbacks = 0
+        self.resimulated = 0
+
+    def add_input(self, index, tick, inputs):
+        """Input for spiller index i tick (et input-dict som til GameState.step)."""
+        if tick < self.game.tick - self.max_rollback:
+            raise ValueError(f"input for tick {tick} er for gammelt til rollback (nu: tick {self.game.tick})")
+        value = pack_inputs(inputs)
+        self.confirmed[index][tick] = value
+        self.latest[index] = value
+        used = self.used.get(tick)
+        # Gættet var forkert: alt fra det tick skal simuleres igen
+        if used is not None and used[index] != value:
+            if self.rollback_from is None or tick < self.rollback_from:
+                self.rollback_from = tick
+
+    def tick_inputs(self, tick):
+        return tuple(confirmed.get(tick, latest) for confirmed, latest in zip(self.confirmed, self.latest))
+
+    def simulate(self, tick):
+        self.snapshots[tick] = self.game.snapshot()
+        values = self.tick_inputs(tick)
+        self.used[tick] = values
+        self.game.step([INPUT_TABLE[value] for value in values])
+
+        # Længere tilbage end max_rollback spoles der aldrig
+        old = tick - self.max_rollback
+        self.snapshots.pop(old, None)
+        self.used.pop(old, None)
+        for confirmed in self.confirmed:
+            confirmed.pop(old, None)
+
+    def correct(self):
+        """Spoler tilbage og simulerer igen hvis et gæt har vist sig forkert."""
+        if self.rollback_from is None:
+            return 0
+        target = self.game.tick
+        start = self.rollback_from
+        self.rollback_from = None
+        self.game.restore(self.snapshots[start])
+        for tick in range(start, target):
+            self.simulate(tick)
+        self.rollbacks += 1
+        self.resimulated += target - start
+        return target - start
+
+    def advance(self):
+        """Ét frame: retter evt. forkerte gæt og simulerer det næste tick."""
+        self.correct()
+        self.simulate(self.game.tick)
+
+
+# BENCHMARK
+def rollback_cost(game, frames=MAX_ROLLBACK, repeat=200):
+    """Tid for restore + frames ticks simuleret igen med snapshots, som i RollbackSession.correct."""
+    session = RollbackSession(game, frames)
+    for _ in range(frames):
+        session.simulate(game.tick)
+    start = game.tick - frames
+
+    def rollback():
+        game.restore(session.snapshots[start])
+        for tick in range(start, start + frames):
+            session.simulate(tick)
+
+    return sorted(timeit.repeat(rollback, number=1, repeat=repeat))
+
+
+def run_peers(seconds, delay, policy_names=("chase", "chase"), seed=0):
+    """To peers der hver simulerer kampen og får modstanderens input delay ticks for sent."""
+    rng = random.Random(seed)
+    sessions = [RollbackSession(GameState()) for _ in policy_names]
+    policies = [POLICIES[name](random.Random(rng.random())) for name in policy_names]
+    in_flight = []  # (ankomst-tick, modtager, afsender, tick, input)
+    frame_times = []
+
+    for tick in range(int(seconds * FPS)):
+        for index, (session, policy) in enumerate(zip(sessions, policies)):
+            inputs = policy(session.game, index)
+            session.add_input(index, tick, inputs)
+            for other in range(len(sessions)):
+                if other != index:
+                    in_flight.append((tick + delay, other, index, tick, inputs))
+
+        arrived = [packet for packet in in_flight if packet[0] <= tick]
+        in_flight = [packet for packet in in_flight if packet[0] > tick]
+        for _, receiver, sender, sent_tick, inputs in arrived:
+            sessions[receiver].add_input(sender, sent_tick, inputs)
+
+        for session in sessions:
+            start = time.perf_counter()
+            session.advance()
+            frame_times.append(time.perf_counter() - start)
+
+    # Det sidste input leveres, så begge peers ender med samme kamp
+    for _, receiver, sender, sent_tick, inputs in in_flight:
+        sessions[receiver].add_input(sender, sent_tick, inputs)
+    for session in sessions:
+        session.correct()
+    return sessions, sorted(frame_times)
+
+
+def same_state(a, b):
+    tick_a, winner_a, players_a, bombs_a, (tiles_a, platforms_a, _), events_a = a
+    tick_b, winner_b, players_b, bombs_b, (tiles_b, platforms_b, _), events_b = b
+    return ((tick_a, winner_a, players_a, bombs_a, events_a) == (tick_b, winner_b, players_b, bombs_b, events_b)
+            and np.array_equal(tiles_a, tiles_b) and [tuple(p) for p in platforms_a] == [tuple(p) for p in platforms_b])
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mål rollback-netcode med to bot-peers.")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--delay", type=int, default=MAX_ROLLBACK, help="ticks før input når frem")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="chase")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    game = GameState()
+    snapshot = game.snapshot()
+    snapshot_us = min(timeit.repeat(game.snapshot, number=1000, repeat=5)) / 1000 * 1e6
+    restore_us = min(timeit.repeat(lambda: game.restore(snapshot), number=1000, repeat=5)) / 1000 * 1e6
+    print(f"Snapshot {snapshot_us:.1f} us  restore {restore_us:.1f} us")
+
+    costs = rollback_cost(game, MAX_ROLLBACK)
+    print(f"Rollback på {MAX_ROLLBACK} ticks: median {costs[len(costs) // 2] * 1000:.3f} ms  "
+          f"max {costs[-1] * 1000:.3f} ms  (budget {FRAME_BUDGET * 1000:.2f} ms pr. frame)")
+
+    sessions, frame_times = run_peers(args.seconds, args.delay, (args.policy, args.policy), args.seed)
+    rollbacks = sum(session.rollbacks for session in sessions)
+    resimulated = sum(session.resimulated for session in sessions)
+    print(f"Peers med {args.delay} ticks forsinkelse: {rollbacks} rollbacks, {resimulated} ticks simuleret igen")
+    print(f"Frame (rollback + nyt tick): p50 {percentile(frame_times, 0.5) * 1000:.3f} ms  "
+          f"p99 {percentile(frame_times, 0.99) * 1000:.3f} ms  max {frame_times[-1] * 1000:.3f} ms")
+    over = sum(1 for frame_time in frame_times if frame_time > FRAME_BUDGET)
+    print(f"Frames over budget: {over} af {len(frame_times)}")
+    in_sync = same_state(sessions[0].game.snapshot(), sessions[1].game.snapshot())
+    print("Peers i sync: " + ("ja" if in_sync else "NEJ"))
+    return 0 if in_sync else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
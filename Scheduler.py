@@ -0,0 +1,87 @@
+"""Timere der udløber på et bestemt tick, samlet i en min-heap.
+
+    timers = TickScheduler()
+    timer = timers.schedule(timers.tick + 180, bomb.explode, game)
+    timers.reschedule(timer, timers.tick + 60)
+    timers.cancel(timer)
+    timers.run(tick)        # kalder alle timere der er udløbet senest på tick
+
+Et tick koster kun noget for de timere der faktisk udløber. Aflyste og flyttede
+timere bliver liggende i heapen, indtil de når toppen eller heapen ryddes op.
+"""
+import heapq
+
+
+class Timer:
+    __slots__ = ("due", "callback", "args", "sequence", "active")
+
+    def __init__(self, due, callback, args):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.sequence = 0
+        self.active = False
+
+
+class TickScheduler:
+    """Min-heap af (tick, rækkefølge, timer). Timere med samme tick kører i den rækkefølge de blev sat."""
+
+    def __init__(self, tick=0):
+        self.tick = tick
+        self.heap = []
+        self.sequence = 0
+        self.stale = 0  # Aflyste eller flyttede poster der stadig ligger i heapen
+
+    def __len__(self):
+        return len(self.heap) - self.stale
+
+    def schedule(self, due, callback, *args):
+        timer = Timer(due, callback, args)
+        self.push(timer)
+        return timer
+
+    def push(self, timer):
+        self.sequence += 1
+        timer.sequence = self.sequence
+        timer.active = True
+        heapq.heappush(self.heap, (timer.due, self.sequence, timer))
+
+    def cancel(self, timer):
+        """Aflyser timer. Det gør intet hvis den allerede er udløbet eller aflyst."""
+        if timer is None or not timer.active:
+            return
+        timer.active = False
+        self.stale += 1
+        if self.stale > 64 and self.stale > len(self.heap) // 2:
+            self.compact()
+
+    def reschedule(self, timer, due):
+        """Flytter timer til due. En udløbet eller aflyst timer sættes i gang igen."""
+        if timer.active:
+            self.stale += 1
+        timer.due = due
+        self.push(timer)
+
+    def compact(self):
+        # På stedet: run() holder fast i listen mens callbacks aflyser timere
+        self.heap[:] = [entry for entry in self.heap if entry[2].active and entry[2].sequence == entry[1]]
+        heapq.heapify(self.heap)
+        self.stale = 0
+
+    def clear(self):
+        for _, _, timer in self.heap:
+            timer.active = False
+        self.heap.clear()
+        self.stale = 0
+
+    def run(self, tick):
+        """Kalder alle timere med due <= tick, også dem der sættes undervejs."""
+        self.tick = tick
+        heap = self.heap
+        while heap and heap[0][0] <= tick:
+            _, sequence, timer = heapq.heappop(heap)
+            if not timer.active or timer.sequence != sequence:
+                self.stale -= 1
+                continue
+            timer.active = False
+            timer.callback(*timer.args)
@@ -0,0 +1,666 @@
+"""Spillets regler uden skærm, ur eller billeder.
+
+GameState.step(inputs) flytter spillet et fast tick frem. Pygame bruges kun til
+Rect, så modulet kan køres headless (fx tusindvis af kampe hurtigere end realtid).
+"""
+from bisect import bisect_left
+
+import pygame
+
+from Map import (MERGE_MODE, PlatformGrid, carve_circle, level_tiles, rect_span, span_rect, sweep_x, sweep_y,
+                 tile_spans)
+from Scheduler import TickScheduler
+
+# Konstanter
+SCREEN_WIDTH = 1000
+SCREEN_HEIGHT = 650
+FPS = 60  # Ticks pr. sekund
+GRAVITY = 0.9
+PLAYER_SIZE = 50
+PLAYER_SPEED = 4
+JUMP_STRENGTH = -15
+BOMB_SIZE = 10
+BOMB_SPEED = 3  # Pixels per tick
+EXPLOSION_RADIUS = 30
+BOMB_TIMER = 3000  # Millisekunder før eksplosion
+BOMB_FUSE_TICKS = BOMB_TIMER * FPS // 1000
+EXPLOSION_TICKS = FPS  # Eksplosionen vises i 1 sekund
+DROP_COOLDOWN = 50  # Ticks mellem to bomber
+CHAIN_REACTIONS = False  # Bomber der rammes af en eksplosion springer med det samme
+WIN_SCORE = 3
+
+# Spillernes startpunkter (centrum)
+SPAWN_POINTS = [(200, 100), (600, 100)]
+MAX_PLAYERS = 16  # Flere end to spillere er en arena (se allocate_spawns)
+SPAWN_CLEARANCE_ROWS = 2  # Tomme rækker over en flade før en spiller kan starte på den
+
+# Knapper en spiller kan trykke på i et tick
+INPUT_NAMES = ("up", "left", "right", "drop")
+
+# LEVEL MAP
+LEVEL_MAP = [
+    "................................................................................",
+    "................XXXX........................................XXXX................",
+    "..........................XXXXXXXX............XXXXXXXX..........................",
+    ".........XXXX......................................................XXXX.........",
+    "XXX..........................................................................XXX",
+    ".................XXXXXXXX..............................XXXXXXXX.................",
+    "................................................................................",
+    "...XXXXXX.........................XXXXXXXXXXXX.........................XXXXXX...",
+    "................................................................................",
+    ".............XXXXXXXX......................................XXXXXXXX.............",
+    "..........XXXX................XXXX............XXXX................XXXX..........",
+    "................................XXXX........XXXX................................",
+    ".....................XXXXXXXX......................XXXXXXXX.....................",
+    "XXXXXXXX................................................................XXXXXXXX",
+    "....................................XXXXXXX.....................................",
+    "................................................................................",
+    "XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX",
+    "................................................................................",
+    "XXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXXX",
+    "................................................................................"
+]
+
+ROWS = len(LEVEL_MAP)
+COLUMNS = len(LEVEL_MAP[0])
+TILE_WIDTH = SCREEN_WIDTH / COLUMNS
+TILE_HEIGHT = SCREEN_HEIGHT / ROWS
+
+
+def read_input(pressed_keys, controls):
+    """Oversætter pygame-taster til et input-dict ({"up": bool, ...}) for en spiller."""
+    return {name: name in controls and bool(pressed_keys[controls[name]]) for name in INPUT_NAMES}
+
+
+def spawn_candidates(tiles, origin=(0, 0)):
+    """Et muligt startpunkt pr. andet kolonne-vindue: lige over den øverste flade med plads over sig.
+
+    origin er pixel-positionen for tiles[0, 0] (en bid af en stor verden, se World.py).
+    """
+    rows, columns = tiles.shape
+    x, y = origin
+    width = int(-(-PLAYER_SIZE // TILE_WIDTH))  # Kolonner spilleren dækker
+    candidates = []
+    for col in range(0, columns - width + 1, 2):
+        window = tiles[:, col:col + width].any(axis=1)
+        for row in range(SPAWN_CLEARANCE_ROWS, rows):
+            if window[row] and not window[row - SPAWN_CLEARANCE_ROWS:row].any():
+                candidates.append((x + int((col + width / 2) * TILE_WIDTH),
+                                   y + int(row * TILE_HEIGHT) - PLAYER_SIZE // 2 - 5))
+                break
+    return candidates
+
+
+def allocate_spawns(count, tiles, spawn_points=(), origin=(0, 0)):
+    """Startpunkter til count spillere. Banens egne bruges først, og hver ekstra spiller
+    starter på den flade der ligger længst fra dem der allerede er valgt."""
+    if not 1 <= count <= MAX_PLAYERS:
+        raise ValueError(f"der kan være 1 til {MAX_PLAYERS} spillere, ikke {count}")
+    points = [tuple(point) for point in spawn_points[:count]]
+    if len(points) == count:
+        return points
+
+    candidates = spawn_candidates(tiles, origin)
+    if not candidates:
+        candidates = [(origin[0] + int((index + 0.5) * SCREEN_WIDTH / count), origin[1] + 100)
+                      for index in range(count)]
+    while len(points) < count:
+        best = max(candidates, key=lambda candidate: min(
+            ((candidate[0] - x) ** 2 + (candidate[1] - y) ** 2 for x, y in points), default=0))
+        points.append(best)
+    return points
+
+
+def carve_platforms(tiles, platforms, grid, center, radius, merge=MERGE_MODE, origin=(0, 0)):
+    """Fjerner de felter en cirkulær eksplosion rører. Kun platforme i krateret ændres.
+
+    tiles, platforms og grid ændres aldrig på stedet, så snapshots kan dele dem
+    (copy-on-write). origin er feltet (kolonne, række) som tiles[0, 0] ligger på,
+    så en bid af en stor verden (World.py) kan bruge den samme kode. Returnerer
+    (tiles, platforms, grid, ændrede rects) eller None hvis intet felt blev ramt.
+    """
+    origin_col, origin_row = origin
+    x, y = center
+    tiles = tiles.copy()
+    hit = carve_circle(tiles, (x - origin_col * TILE_WIDTH, y - origin_row * TILE_HEIGHT), radius,
+                       TILE_WIDTH, TILE_HEIGHT)
+    if hit is None:
+        return None
+    col0, row0, col1, row1 = hit[0] + origin_col, hit[1] + origin_row, hit[2] + origin_col, hit[3] + origin_row
+    grid = grid.copy()
+
+    replaced = []
+    changed = []
+    for platform in grid.query(span_rect((col0, row0, col1, row1), TILE_WIDTH, TILE_HEIGHT)):
+        p_col0, p_row0, p_col1, p_row1 = rect_span(platform, TILE_WIDTH, TILE_HEIGHT)
+        if p_col1 <= col0 or p_col0 >= col1 or p_row1 <= row0 or p_row0 >= row1:
+            continue
+        # Resten af platformen afledes af de felter der stadig står i griddet
+        rest = tiles[p_row0 - origin_row:p_row1 - origin_row, p_col0 - origin_col:p_col1 - origin_col]
+        if rest.all():
+            continue
+        grid.remove(platform)
+        pieces = [span_rect((c0 + p_col0, r0 + p_row0, c1 + p_col0, r1 + p_row0), TILE_WIDTH, TILE_HEIGHT)
+                  for c0, r0, c1, r1 in tile_spans(rest, merge)]
+        for piece in pieces:
+            grid.add(piece)
+        replaced.append((platform, pieces))
+        changed.append(platform)
+        changed.extend(pieces)
+    if not replaced:
+        return tiles, platforms, grid, changed
+
+    # Ny platformsliste med resterne på den ramte platforms plads. Kun de ramte pladser skiftes ud.
+    new_platforms = list(platforms)
+    for platform, pieces in replaced:
+        index = new_platforms.index(platform)
+        new_platforms[index:index + 1] = pieces
+    return tiles, new_platforms, grid, changed
+
+
+# MAP
+class Map:
+    def __init__(self, level_map=LEVEL_MAP, merge=MERGE_MODE):
+        self.level_map = level_map
+        # Banen som bool-grid. Platforme og kollision afledes af det.
+        self.tiles = None
+        self.platforms = []
+        self.ground = None
+        self.width = SCREEN_WIDTH
+        self.height = SCREEN_HEIGHT
+        self.merge = merge
+        self.grid = None
+        # Tælles op ved hver load_map, så en renderer ved at hele banen er ny
+        self.generation = 0
+        # Områder der er ændret af eksplosioner. Samles kun når nogen tegner banen.
+        self.track_changes = False
+        self.dirty_regions = []
+        self.load_map()
+
+    def load_map(self):
+        level = self.level_map
+        if getattr(level, "spans", None) is not None and level.merge == self.merge:
+            # Kompileret bane fra Levels.py. Platforme og grid ændres aldrig på
+            # stedet (se carve), så de bygges kun første gang og deles bagefter.
+            if level.terrain is None:
+                self.load_tiles(level.tiles, level.spans.tolist())
+                level.terrain = (tuple(self.platforms), self.grid)
+            else:
+                platforms, grid = level.terrain
+                self.set_terrain(level.tiles, platforms, grid)
+        else:
+            self.load_tiles(level_tiles(level))
+
+    def load_tiles(self, tiles, spans=None):
+        """Bygger platforme og kollision op fra et tile-grid (fx modtaget over netværket)."""
+        if spans is None:
+            # Felter lægges sammen til større rects (se Map.tile_spans)
+            spans = tile_spans(tiles, self.merge)
+        platforms = [span_rect(span, TILE_WIDTH, TILE_HEIGHT) for span in spans]
+        self.set_terrain(tiles, platforms, PlatformGrid(TILE_WIDTH, TILE_HEIGHT, platforms))
+
+    def set_terrain(self, tiles, platforms, grid):
+        self.tiles = tiles
+        self.platforms = list(platforms)
+        self.grid = grid
+        self.ground = pygame.Rect(0, SCREEN_HEIGHT - TILE_HEIGHT, SCREEN_WIDTH, TILE_HEIGHT)
+        self.generation += 1
+        self.dirty_regions.clear()
+
+    def nearby(self, rect):
+        """Platforme der ligger i samme felter som rect."""
+        return self.grid.query(rect)
+
+    def carve(self, center, radius):
+        """Fjerner de felter en cirkulær eksplosion rører. Kun platforme i krateret ændres."""
+        carved = carve_platforms(self.tiles, self.platforms, self.grid, center, radius, self.merge)
+        if carved is None:
+            return
+        self.tiles, self.platforms, self.grid, changed = carved
+        if changed and self.track_changes:
+            # Hele de ramte felter forsvinder, også det der stikker uden for area,
+            # og resterne kan være en pixel bredere pga. afrunding
+            self.dirty_regions.append(changed[0].unionall(changed[1:]).clip(self.bounds()))
+
+    def bounds(self):
+        return pygame.Rect(0, 0, self.width, self.height)
+
+    def spawn_area(self):
+        """Tiles som ekstra spillere kan starte på, og pixel-positionen for tiles[0, 0]."""
+        return self.tiles, (0, 0)
+
+    def snapshot(self):
+        """Banens tilstand uden kopier: tiles, platforme og grid udskiftes i stedet for at ændres."""
+        return self.tiles, tuple(self.platforms), self.grid
+
+    def restore(self, state):
+        tiles, platforms, grid = state
+        if tiles is self.tiles:
+            # Ingen eksplosioner siden snapshottet
+            return
+        self.tiles = tiles
+        self.platforms = list(platforms)
+        self.grid = grid
+        # Banen kan være helt anderledes, så den tegnes forfra
+        self.generation += 1
+        self.dirty_regions.clear()
+
+
+# BOMB
+class Bomb:
+    # Faste felter i stedet for et __dict__ pr. bombe (se EntityBenchmark.py)
+    __slots__ = ("rect", "spawn_tick", "exploded", "explosion_tick", "falling", "timer", "owner")
+
+    def __init__(self):
+        self.rect = pygame.Rect(0, 0, BOMB_SIZE * 2, BOMB_SIZE * 2)
+        self.spawn_tick = 0
+        self.exploded = False
+        self.explosion_tick = 0
+        self.falling = False  # Står i GameState.falling
+        self.timer = None  # Lunten, eller hvornår eksplosionen fjernes (Scheduler.Timer)
+        self.owner = None  # Spilleren der smed bomben og får point for den
+
+    def reset(self, x, y, tick, owner=None):
+        """Gør en genbrugt bombe klar til at blive smidt igen."""
+        self.rect.size = (BOMB_SIZE * 2, BOMB_SIZE * 2)
+        self.rect.center = (x, y)
+        self.spawn_tick = tick
+        self.exploded = False
+        self.explosion_tick = 0
+        self.owner = owner
+
+    def fall(self, game_map):
+        """Bomben falder og stopper ovenpå en platform eller ground. False hvis den lå stille."""
+        y = self.rect.y
+        self.rect.y += BOMB_SPEED
+        for platform in game_map.nearby(self.rect):
+            if self.rect.colliderect(platform):
+                self.rect.bottom = platform.top
+                break
+        else:
+            if self.rect.colliderect(game_map.ground):
+                self.rect.bottom = game_map.ground.top
+        return self.rect.y != y
+
+    def explode(self, game):
+        """Sprænger bomben. Med game.chain_reactions springer de bomber eksplosionen rammer også."""
+        pending = [self]
+        while pending:
+            bomb = pending.pop()
+            if bomb.exploded:
+                continue
+            bomb.detonate(game)
+            if game.chain_reactions:
+                pending.extend(game.bomb_sweep().query(bomb.rect))
+
+    def detonate(self, game):
+        self.exploded = True
+        self.explosion_tick = game.tick
+        # Lunten slukkes (ved en kædereaktion er den ikke brændt ud), og eksplosionen fjernes efter 1 sekund
+        game.timers.cancel(self.timer)
+        self.timer = game.timers.schedule(game.tick + EXPLOSION_TICKS, game.release_bomb, self)
+
+        center = self.rect.center
+        radius = game.explosion_radius
+        self.rect.size = (radius * 2, radius * 2)
+        self.rect.center = center
+
+        # Felter der rammes af eksplosionen fjernes fra banen
+        game.map.carve(self.rect.center, radius)
+
+        for player in game.players:
+            if self.rect.colliderect(player.rect):
+                game.kill(player, "bomb", self.owner)
+
+
+class BombSweep:
+    """Broadphase til eksplosioner: bomberne sorteret efter venstre kant (sort-and-sweep på x).
+
+    Bomber ændrer kun y når de falder, så rækkefølgen holder hele tick'et. En
+    eksplosion tester kun bomberne hvis x-interval overlapper dens eget.
+    """
+
+    __slots__ = ("bombs", "lefts")
+
+    def __init__(self, bombs):
+        self.bombs = sorted((bomb for bomb in bombs if not bomb.exploded), key=lambda bomb: bomb.rect.left)
+        self.lefts = [bomb.rect.left for bomb in self.bombs]
+
+    def query(self, rect):
+        """Bomber der ikke er sprunget og som rører rect."""
+        start = bisect_left(self.lefts, rect.left - BOMB_SIZE * 2 + 1)
+        end = bisect_left(self.lefts, rect.right, start)
+        return [bomb for bomb in self.bombs[start:end] if not bomb.exploded and bomb.rect.colliderect(rect)]
+
+
+# PLAYER
+class Player:
+    __slots__ = ("index", "rect", "speed", "facing_right", "velocity_y", "jump_strength", "on_ground",
+                 "score", "start_x", "start_y", "drop_timer", "opponent", "timers")
+
+    def __init__(self, x, y, index=0, jump_strength=JUMP_STRENGTH):
+        self.index = index
+        self.rect = pygame.Rect(0, 0, PLAYER_SIZE, PLAYER_SIZE)
+        self.rect.center = (x, y)
+
+        self.speed = PLAYER_SPEED
+        self.facing_right = True
+
+        self.velocity_y = 0
+        self.jump_strength = jump_strength
+        self.on_ground = False
+
+        self.score = 0
+        self.start_x = x
+        self.start_y = y
+
+        # Timer der slutter cooldown efter et drop, eller None når spilleren må droppe igen
+        self.drop_timer = None
+
+        # Får point når spilleren falder eller rammer sig selv. Kun i en duel, i en arena er den None.
+        self.opponent = None
+        self.timers = None  # GameState.timers
+
+    def update(self, inputs, game):
+        game_map = game.map
+        dx = 0
+        if inputs.get("left"):
+            dx = -self.speed
+            self.facing_right = False
+        if inputs.get("right"):
+            dx = self.speed
+            self.facing_right = True
+
+        if inputs.get("up") and self.on_ground:
+            self.velocity_y = self.jump_strength
+            self.on_ground = False
+        self.velocity_y += GRAVITY
+
+        # Platformene langs hele tick'ets bevægelse slås op én gang. Kollisionen er
+        # swept (sweep_x/sweep_y), så et stort fald ikke springer over en platform.
+        start = self.rect.copy()
+        self.rect.x += dx
+        self.rect.y += self.velocity_y
+        end_y = self.rect.y
+        region = self.rect.union(start)
+        platforms = game_map.nearby(region)
+
+        self.rect.y = start.y
+        sweep_x(self.rect, start, dx, platforms)
+
+        previous = self.rect.copy()
+        self.rect.y = end_y
+        if not region.contains(self.rect):
+            # Skubbet bagud ud af området (spilleren stod inde i en platform)
+            platforms = game_map.nearby(self.rect.union(previous))
+
+        self.on_ground = False
+        if sweep_y(self.rect, previous, self.velocity_y, platforms) is not None:
+            self.on_ground = self.velocity_y > 0
+            self.velocity_y = 0
+
+        # Også et fald der når forbi bunden på et enkelt tick tæller
+        if self.rect.union(previous).colliderect(game_map.ground):
+            game.kill(self, "fall")
+
+        # Drop bombe
+        if inputs.get("drop") and self.drop_timer is None:
+            game.drop_bomb(self.rect.centerx, self.rect.bottom, self)
+            # Vent 50 ticks for at kunne droppe en bombe mere (forhindrer bombe spam)
+            self.drop_cooldown = DROP_COOLDOWN
+
+        # Borders/Vægge
+        self.rect.x = max(0, min(self.rect.x, game_map.width - PLAYER_SIZE))
+
+    def respawn(self):
+        self.rect.center = (self.start_x, self.start_y)
+        self.velocity_y = 0
+
+    @property
+    def drop_cooldown(self):
+        """Ticks til spilleren må droppe igen, som i snapshots og på nettet."""
+        if self.drop_timer is None:
+            return 0
+        return self.drop_timer.due - self.timers.tick + 1
+
+    @drop_cooldown.setter
+    def drop_cooldown(self, ticks):
+        # Timeren udløber i bombe-fasen tick'et før, så spilleren kan droppe igen
+        # i spiller-fasen når de ticks er gået
+        if ticks <= 0:
+            self.timers.cancel(self.drop_timer)
+            self.drop_timer = None
+        elif self.drop_timer is None:
+            self.drop_timer = self.timers.schedule(self.timers.tick + ticks - 1, self.end_cooldown)
+        else:
+            self.timers.reschedule(self.drop_timer, self.timers.tick + ticks - 1)
+
+    def end_cooldown(self):
+        self.drop_timer = None
+
+
+# GAME
+class GameState:
+    def __init__(self, level_map=LEVEL_MAP, spawn_points=SPAWN_POINTS, merge=MERGE_MODE,
+                 bomb_timer=BOMB_TIMER, explosion_radius=EXPLOSION_RADIUS, jump_strength=JUMP_STRENGTH,
+                 chain_reactions=CHAIN_REACTIONS, player_count=None):
+        # Regler der kan justeres pr. kamp (fx til balance-test med BatchRunner.py)
+        self.bomb_fuse_ticks = bomb_timer * FPS // 1000
+        self.explosion_radius = explosion_radius
+        self.chain_reactions = chain_reactions
+
+        # En stor verden (World.py) laver sin egen map, som kun har bidderne tæt på i hukommelsen
+        create_map = getattr(level_map, "create_map", None)
+        self.map = Map(level_map, merge) if create_map is None else create_map(merge)
+        # Lunter, eksplosioner og cooldowns. Scheduleren holder også styr på tick.
+        self.timers = TickScheduler()
+        # Spillerne. Med player_count får spillere ud over banens startpunkter et ledigt sted.
+        self.jump_strength = jump_strength
+        if player_count is not None:
+            spawn_points = self.allocate_spawns(player_count, spawn_points)
+        self.players = []
+        for x, y in spawn_points:
+            self.add_player(x, y)
+        self.bombs = []
+        self.free_bombs = []
+        # Bomber der ikke ligger stille. Alle vækkes når banen ændres.
+        self.falling = []
+        self.falling_terrain = None  # Banens tiles da self.falling sidst blev fyldt op
+        self.sweep = None  # BombSweep for det nuværende tick, bygges først når en bombe springer
+        self.winner = None
+        # (tick, "fall" eller "bomb", spillerens index) hver gang en spiller dør
+        self.events = []
+        self.profiler = None  # Profiler.FrameProfiler der tager tid på spillere og bomber
+        self.rivals = None  # (tick, spillerne sorteret efter x, plads i sorteringen) til rival()
+
+    def add_player(self, x=None, y=None):
+        """Tilføjer en spiller (fx en bot i en arena). Uden position får den et ledigt startpunkt."""
+        if len(self.players) >= MAX_PLAYERS:
+            raise ValueError(f"der kan højst være {MAX_PLAYERS} spillere")
+        if x is None or y is None:
+            points = [(player.start_x, player.start_y) for player in self.players]
+            x, y = self.allocate_spawns(len(points) + 1, points)[-1]
+        player = Player(x, y, len(self.players), self.jump_strength)
+        player.timers = self.timers
+        self.players.append(player)
+        # To spillere har hinanden som modstander. I en arena er der ingen faste par.
+        for index, other in enumerate(self.players):
+            other.opponent = self.players[(index + 1) % len(self.players)] if len(self.players) <= 2 else None
+        return player
+
+    def allocate_spawns(self, count, spawn_points):
+        tiles, origin = self.map.spawn_area()
+        return allocate_spawns(count, tiles, spawn_points, origin)
+
+    def kill(self, player, cause, killer=None):
+        """Spilleren dør ("fall" eller "bomb") og starter forfra. killer er bombens ejer.
+
+        Et drab giver ejeren et point. Et fald eller ens egen bombe giver
+        modstanderen pointet i en duel og ingen point i en arena.
+        """
+        if killer is None or killer is player:
+            killer = player.opponent
+        if killer is not None:
+            killer.score += 1
+        self.events.append((self.tick, cause, player.index))
+        player.respawn()
+
+    def rival(self, index):
+        """Den spiller en bot skal gå efter: modstanderen i en duel, ellers den nærmeste i x.
+
+        Spillerne sorteres efter x én gang pr. tick, så alle bots tilsammen koster O(N log N).
+        """
+        player = self.players[index]
+        if player.opponent is not None:
+            return player.opponent
+        if self.rivals is None or self.rivals[0] != self.tick:
+            order = sorted(self.players, key=lambda other: other.rect.centerx)
+            self.rivals = (self.tick, order, {other.index: position for position, other in enumerate(order)})
+        _, order, positions = self.rivals
+        position = positions[index]
+        neighbours = order[max(0, position - 1):position] + order[position + 1:position + 2]
+        if not neighbours:
+            return player
+        return min(neighbours, key=lambda other: abs(other.rect.centerx - player.rect.centerx))
+
+    @property
+    def tick(self):
+        return self.timers.tick
+
+    @tick.setter
+    def tick(self, tick):
+        self.timers.tick = tick
+
+    def drop_bomb(self, x, y, owner=None):
+        # Bomber genbruges, så et drop ikke koster allokeringer
+        bomb = self.free_bombs.pop() if self.free_bombs else Bomb()
+        bomb.reset(x, y, self.tick, owner)
+        self.bombs.append(bomb)
+        self.sweep = None
+        self.schedule_bomb(bomb)
+        if not bomb.falling:
+            bomb.falling = True
+            self.falling.append(bomb)
+        return bomb
+
+    def schedule_bomb(self, bomb):
+        """Sætter bombens timer ud fra dens felter: lunten, eller hvornår eksplosionen fjernes."""
+        self.timers.cancel(bomb.timer)
+        if bomb.exploded:
+            bomb.timer = self.timers.schedule(bomb.explosion_tick + EXPLOSION_TICKS, self.release_bomb, bomb)
+        else:
+            bomb.timer = self.timers.schedule(bomb.spawn_tick + self.bomb_fuse_ticks, bomb.explode, self)
+
+    def release_bomb(self, bomb):
+        self.bombs.remove(bomb)
+        self.free_bombs.append(bomb)
+        self.timers.cancel(bomb.timer)
+        bomb.timer = None
+        if bomb.falling:
+            bomb.falling = False
+            self.falling.remove(bomb)
+
+    def step(self, inputs):
+        """Flytter spillet et tick frem. inputs er et input-dict pr. spiller."""
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start("players")
+        for player, player_inputs in zip(self.players, inputs):
+            player.update(player_inputs, self)
+
+        if profiler is not None:
+            profiler.start("bombs")
+        self.update_bombs()
+
+        self.tick += 1
+
+        if self.winner is None:
+            for index, player in enumerate(self.players):
+                if player.score >= WIN_SCORE:
+                    self.winner = index
+                    break
+
+    def update_bombs(self):
+        """Bomber der falder flyttes, og de timere der er udløbet kører (lunter, eksplosioner, cooldowns).
+
+        Bomber der ligger stille koster intet, før banen ændres. Tiles udskiftes ved
+        hver ændring (se Map.carve), så det er nok at sammenligne dem.
+        """
+        self.sweep = None
+        game_map = self.map
+        if game_map.tiles is not self.falling_terrain:
+            self.falling_terrain = game_map.tiles
+            for bomb in self.bombs:
+                if not bomb.exploded and not bomb.falling:
+                    bomb.falling = True
+                    self.falling.append(bomb)
+
+        falling = []
+        for bomb in self.falling:
+            if not bomb.exploded and bomb.fall(game_map):
+                falling.append(bomb)
+            else:
+                bomb.falling = False
+        self.falling = falling
+
+        self.timers.run(self.tick)
+
+    def bomb_sweep(self):
+        if self.sweep is None:
+            self.sweep = BombSweep(self.bombs)
+        return self.sweep
+
+    def snapshot(self):
+        """Al tilstand der ændrer sig under en kamp, som tupler der kan gemmes og gendannes."""
+        players = tuple((tuple(player.rect), player.velocity_y, player.on_ground, player.score,
+                         player.drop_cooldown, player.facing_right) for player in self.players)
+        bombs = tuple((tuple(bomb.rect), bomb.spawn_tick, bomb.exploded, bomb.explosion_tick,
+                       None if bomb.owner is None else bomb.owner.index) for bomb in self.bombs)
+        return self.tick, self.winner, players, bombs, self.map.snapshot(), tuple(self.events)
+
+    def restore(self, state):
+        self.tick, self.winner, players, bombs, map_state, events = state
+        self.rivals = None
+        self.events[:] = events
+        for player, (rect, velocity_y, on_ground, score, drop_cooldown, facing_right) in zip(self.players, players):
+            player.rect.update(rect)
+            player.velocity_y = velocity_y
+            player.on_ground = on_ground
+            player.score = score
+            player.drop_cooldown = drop_cooldown
+            player.facing_right = facing_right
+
+        for bomb in list(self.bombs):
+            self.release_bomb(bomb)
+        for rect, spawn_tick, exploded, explosion_tick, owner in bombs:
+            bomb = self.drop_bomb(0, 0, None if owner is None else self.players[owner])
+            bomb.rect.update(rect)
+            bomb.spawn_tick = spawn_tick
+            bomb.exploded = exploded
+            bomb.explosion_tick = explosion_tick
+            self.schedule_bomb(bomb)
+
+        self.map.restore(map_state)
+
+    def change_level(self, level_map, spawn_points=None):
+        """Skifter til en anden bane (fx fra Levels.LevelRotation) og starter en ny runde."""
+        self.map.level_map = level_map
+        if spawn_points is not None:
+            if len(spawn_points) < len(self.players):
+                self.map.load_map()
+                spawn_points = self.allocate_spawns(len(self.players), spawn_points)
+            for player, (x, y) in zip(self.players, spawn_points):
+                player.start_x = x
+                player.start_y = y
+        self.reset()
+
+    def reset(self):
+        """Ny runde: nulstiller point, spillere, bane og bomber."""
+        for player in self.players:
+            player.score = 0
+            player.respawn()
+        self.map.load_map()
+        for bomb in list(self.bombs):
+            self.release_bomb(bomb)
+        self.winner = None
+        self.events.clear()
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+
+class TextCache:
+    """Husker renderede tekst-surfaces, så samme tekst ikke rasteriseres hver frame.
+
+    Nøglen er (font, tekst, farve, antialias). Når cachen er fuld smides den
+    tekst ud der er brugt længst tid siden (LRU).
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+# Fælles cache til menuer og HUD
+text_cache = TextCache()
+
+
+def render_text(font, text, color, antialias=True):
+    return text_cache.render(font, text, color, antialias)
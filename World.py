@@ -0,0 +1,360 @@
+"""Store verdener der er mange skærme brede og høje, delt op i bidder.
+
+En verden skrives som en bane i levels/ (X = platform, . = tomt, 1-9 =
+startpunkter), bare med så mange rækker og kolonner den skal have. Første gang
+den indlæses kompileres den til .level_cache/: en bid (chunk) er CHUNK_ROWS x
+CHUNK_COLUMNS felter, altså en skærm, og gemmes som pakkede bits plus de
+sammenlagte platforme. Filen mmap'es, så en bid først læses fra disken når den
+bruges.
+
+WorldMap har samme interface som Simulation.Map, men har kun de bidder i
+hukommelsen der er brugt for nylig (højst RESIDENT_CHUNKS). Kollision, fald og
+eksplosioner spørger kun de bidder der ligger under det rect de ser på, og
+front-enden tegner kun dem kameraet ser. Hukommelse og tid pr. frame afhænger
+derfor af skærmen og ikke af hvor stor verdenen er.
+
+    python World.py worlds/01-huler.txt                          # kompilerer og viser størrelsen
+    python World.py --generate worlds/02-ny.txt --screens 10x3   # ny verden ud fra LevelGenerator
+"""
+import argparse
+import os
+import struct
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from Assets import file_hash
+from LevelGenerator import SPAWN_POINTS, generate_level
+from Levels import LEVEL_CACHE_DIR, load_cached, parse_level
+from Map import MERGE_MODE, PlatformGrid, level_tiles, span_rect, tile_spans
+from Simulation import COLUMNS, ROWS, SCREEN_HEIGHT, SCREEN_WIDTH, TILE_HEIGHT, TILE_WIDTH, carve_platforms
+
+# En bid er en skærm, så kameraet ser højst 2 x 2 bidder ad gangen
+CHUNK_ROWS = ROWS
+CHUNK_COLUMNS = COLUMNS
+CHUNK_WIDTH = SCREEN_WIDTH
+CHUNK_HEIGHT = SCREEN_HEIGHT
+RESIDENT_CHUNKS = 16  # Bidder der holdes i hukommelsen (det kameraet ser, plus spillere og bomber udenfor)
+
+MAGIC = b"JMWD"
+VERSION = 1
+# magic, version, rækker, kolonner, rækker og kolonner pr. bid, antal startpunkter, længde af navnet
+HEADER = struct.Struct("<4sBHHHHBB")
+
+_worlds = {}
+
+
+class World:
+    """En kompileret verden. Alle arrays er read-only views i cache-filen.
+
+    bits har en række pakkede tiles pr. bid, starts[i]:starts[i + 1] er bid i's
+    platforme i spans, med felter regnet fra bidens øverste venstre hjørne.
+    """
+
+    def __init__(self, name, rows, columns, spawn_points, bits, starts, spans, merge=MERGE_MODE, buffer=None):
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+        self.chunks_x = columns // CHUNK_COLUMNS
+        self.chunks_y = rows // CHUNK_ROWS
+        self.width = self.chunks_x * CHUNK_WIDTH
+        self.height = self.chunks_y * CHUNK_HEIGHT
+        self.spawn_points = spawn_points
+        self.bits = bits
+        self.starts = starts
+        self.spans = spans
+        self.merge = merge
+        self.buffer = buffer  # mmap'en som arrays peger ind i
+
+    def read_chunk(self, key, merge=MERGE_MODE):
+        """Bidens tiles (et nyt array) og dens platforme som felt-spænd, eller None hvis merge er en anden."""
+        cx, cy = key
+        index = cy * self.chunks_x + cx
+        tiles = np.unpackbits(self.bits[index], count=CHUNK_ROWS * CHUNK_COLUMNS).view(np.bool_)
+        tiles = tiles.reshape(CHUNK_ROWS, CHUNK_COLUMNS)
+        if merge != self.merge:
+            return tiles, None
+        return tiles, self.spans[self.starts[index]:self.starts[index + 1]].tolist()
+
+    def create_map(self, merge=MERGE_MODE):
+        """Kaldes af GameState i stedet for Simulation.Map."""
+        return WorldMap(self, merge)
+
+
+class Chunk:
+    __slots__ = ("key", "rect", "origin", "tiles", "platforms", "grid")
+
+    def __init__(self, key, tiles, platforms, grid=None):
+        cx, cy = key
+        self.key = key
+        self.rect = pygame.Rect(cx * CHUNK_WIDTH, cy * CHUNK_HEIGHT, CHUNK_WIDTH, CHUNK_HEIGHT)
+        self.origin = (cx * CHUNK_COLUMNS, cy * CHUNK_ROWS)  # Første felt (kolonne, række) i verdenen
+        self.tiles = tiles
+        self.platforms = platforms
+        self.grid = grid
+
+    def platform_grid(self):
+        """Kollisions-griddet. Det bygges først når noget støder ind i bidden, ikke når den kun tegnes."""
+        if self.grid is None:
+            self.grid = PlatformGrid(TILE_WIDTH, TILE_HEIGHT, self.platforms)
+        return self.grid
+
+
+# MAP
+class WorldMap:
+    """Simulation.Map for en World. Bidderne læses ind når de bruges og smides ud igen (LRU).
+
+    Bidder der er ændret af eksplosioner gemmes i edits, så de ikke mister
+    kraterne når de smides ud. edits udskiftes ved hver ændring, ligesom
+    Map.tiles, så det er både snapshot og tegn på at terrænet er ændret.
+    """
+
+    def __init__(self, world, merge=MERGE_MODE, capacity=RESIDENT_CHUNKS):
+        self.level_map = world
+        self.world = None
+        self.merge = merge
+        self.capacity = capacity
+        self.resident = OrderedDict()  # (cx, cy) -> Chunk, den mindst brugte først
+        self.edits = {}  # (cx, cy) -> tiles for de bidder eksplosioner har ændret
+        self.loads = 0  # Antal gange en bid er læst ind
+        self.ground = None
+        self.width = 0
+        self.height = 0
+        self.generation = 0
+        # Som Map, men en verden tegnes bid for bid (se WorldView), ikke med dirty regions
+        self.track_changes = False
+        self.dirty_regions = []
+        self.load_map()
+
+    @property
+    def tiles(self):
+        """Skifter hver gang terrænet ændres (se GameState.update_bombs)."""
+        return self.edits
+
+    @property
+    def platforms(self):
+        """Platformene i de bidder der er i hukommelsen."""
+        return [platform for chunk in self.resident.values() for platform in chunk.platforms]
+
+    def load_map(self):
+        """Starter verdenen forfra uden kratere. Bidderne læses ind igen efterhånden."""
+        if self.level_map is not self.world:
+            self.world = self.level_map
+            self.width = self.world.width
+            self.height = self.world.height
+            self.ground = pygame.Rect(0, self.height - TILE_HEIGHT, self.width, TILE_HEIGHT)
+            self.resident.clear()
+        self.restore({})
+        self.generation += 1
+
+    def chunk_keys(self, rect):
+        """Bidderne rect rører, række for række. Dele af rect uden for verdenen tæller ikke med."""
+        cx0 = max(0, rect.left // CHUNK_WIDTH)
+        cy0 = max(0, rect.top // CHUNK_HEIGHT)
+        cx1 = min(self.world.chunks_x - 1, (rect.right - 1) // CHUNK_WIDTH)
+        cy1 = min(self.world.chunks_y - 1, (rect.bottom - 1) // CHUNK_HEIGHT)
+        return [(cx, cy) for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)]
+
+    def chunk(self, key):
+        """Bidden key, læst ind fra verdens-filen (eller edits) hvis den ikke er i hukommelsen."""
+        chunk = self.resident.get(key)
+        if chunk is not None:
+            self.resident.move_to_end(key)
+            return chunk
+
+        tiles = self.edits.get(key)
+        spans = None
+        if tiles is None:
+            tiles, spans = self.world.read_chunk(key, self.merge)
+        if spans is None:
+            spans = tile_spans(tiles, self.merge)
+        col0, row0 = key[0] * CHUNK_COLUMNS, key[1] * CHUNK_ROWS
+        platforms = [span_rect((c0 + col0, r0 + row0, c1 + col0, r1 + row0), TILE_WIDTH, TILE_HEIGHT)
+                     for c0, r0, c1, r1 in spans]
+        chunk = Chunk(key, tiles, platforms)
+        self.resident[key] = chunk
+        self.loads += 1
+        while len(self.resident) > self.capacity:
+            self.resident.popitem(last=False)
+        return chunk
+
+    def prefetch(self, rect):
+        """Læser bidderne under rect ind (fx kameraet med en margin), før spillet får brug for dem."""
+        for key in self.chunk_keys(rect):
+            self.chunk(key)
+
+    def nearby(self, rect):
+        """Platforme der ligger i samme felter som rect, fra de bidder rect rører."""
+        keys = self.chunk_keys(rect)
+        if len(keys) == 1:
+            return self.chunk(keys[0]).platform_grid().query(rect)
+        found = []
+        for key in keys:
+            found.extend(self.chunk(key).platform_grid().query(rect))
+        # Samme rækkefølge som Map.nearby, også når rect går hen over kanten mellem to bidder
+        found.sort(key=lambda platform: (platform.top, platform.left))
+        return found
+
+    def carve(self, center, radius):
+        """Fjerner de felter en cirkulær eksplosion rører, i alle de bidder den rammer."""
+        x, y = center
+        area = pygame.Rect(x - radius, y - radius, radius * 2 + 1, radius * 2 + 1)
+        edits = None
+        for key in self.chunk_keys(area):
+            chunk = self.chunk(key)
+            carved = carve_platforms(chunk.tiles, chunk.platforms, chunk.platform_grid(), center, radius,
+                                     self.merge, chunk.origin)
+            if carved is None:
+                continue
+            chunk.tiles, chunk.platforms, chunk.grid, _ = carved
+            if edits is None:
+                edits = dict(self.edits)
+            edits[key] = chunk.tiles
+        if edits is not None:
+            self.edits = edits
+
+    def bounds(self):
+        return pygame.Rect(0, 0, self.width, self.height)
+
+    def spawn_area(self):
+        """Bidden med det første startpunkt, hvor ekstra spillere kan starte."""
+        x, y = self.world.spawn_points[0] if self.world.spawn_points else (0, 0)
+        chunk = self.chunk((min(self.world.chunks_x - 1, max(0, x // CHUNK_WIDTH)),
+                            min(self.world.chunks_y - 1, max(0, y // CHUNK_HEIGHT))))
+        return chunk.tiles, chunk.rect.topleft
+
+    def snapshot(self):
+        return self.edits
+
+    def restore(self, edits):
+        if edits is self.edits:
+            return
+        # Bidder hvor kraterne ikke passer til snapshottet læses ind igen
+        for key in set(self.edits) | set(edits):
+            if self.edits.get(key) is not edits.get(key):
+                self.resident.pop(key, None)
+        self.edits = edits
+        self.generation += 1
+
+
+# KOMPILERING
+def encode_world(path, merge=MERGE_MODE):
+    """Verdenen i path som bytes i cache-formatet. Verdenen fyldes op med tomme felter til hele bidder."""
+    name, rows, spawn_points = parse_level(path)
+    if not rows:
+        raise ValueError(f"{path}: verdenen er tom")
+    columns = max(len(row) for row in rows)
+    chunks_x = -(-columns // CHUNK_COLUMNS)
+    chunks_y = -(-len(rows) // CHUNK_ROWS)
+    tiles = np.zeros((chunks_y * CHUNK_ROWS, chunks_x * CHUNK_COLUMNS), dtype=bool)
+    tiles[:len(rows), :columns] = level_tiles([row.ljust(columns, ".") for row in rows])
+
+    bits = []
+    spans = []
+    starts = [0]
+    for cy in range(chunks_y):
+        for cx in range(chunks_x):
+            chunk = tiles[cy * CHUNK_ROWS:(cy + 1) * CHUNK_ROWS, cx * CHUNK_COLUMNS:(cx + 1) * CHUNK_COLUMNS]
+            bits.append(np.packbits(chunk).tobytes())
+            spans.extend(tile_spans(chunk, merge))
+            starts.append(len(spans))
+
+    encoded_name = name.encode("utf-8")[:255]
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, tiles.shape[0], tiles.shape[1], CHUNK_ROWS, CHUNK_COLUMNS,
+                    len(spawn_points), len(encoded_name)),
+        encoded_name,
+        np.array(spawn_points, dtype="<i4").tobytes(),
+        np.array(starts, dtype="<u4").tobytes(),
+        b"".join(bits),
+        np.array(spans, dtype="<u2").reshape(-1, 4).tobytes(),
+    ])
+
+
+def read_world(buffer, merge):
+    """World med views i buffer, eller None hvis cachen er fra en anden version eller ødelagt."""
+    try:
+        magic, version, rows, columns, chunk_rows, chunk_columns, spawns, name_length = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION or (chunk_rows, chunk_columns) != (CHUNK_ROWS, CHUNK_COLUMNS):
+            return None
+        offset = HEADER.size
+        name = bytes(buffer[offset:offset + name_length]).decode("utf-8")
+        offset += name_length
+        spawn_points = np.frombuffer(buffer, "<i4", spawns * 2, offset).reshape(spawns, 2)
+        offset += spawn_points.nbytes
+        chunks = (rows // CHUNK_ROWS) * (columns // CHUNK_COLUMNS)
+        starts = np.frombuffer(buffer, "<u4", chunks + 1, offset)
+        offset += starts.nbytes
+        chunk_bytes = -(-CHUNK_ROWS * CHUNK_COLUMNS // 8)
+        bits = np.frombuffer(buffer, np.uint8, chunks * chunk_bytes, offset).reshape(chunks, chunk_bytes)
+        offset += bits.nbytes
+        spans = np.frombuffer(buffer, "<u2", int(starts[-1]) * 4, offset).reshape(-1, 4)
+    except (struct.error, ValueError, UnicodeDecodeError):
+        return None
+    return World(name, rows, columns, [tuple(point) for point in spawn_points.tolist()], bits, starts, spans,
+                 merge, buffer)
+
+
+def cache_path(path, merge=MERGE_MODE):
+    name = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    return os.path.join(LEVEL_CACHE_DIR, f"{name}-{file_hash(path)[:16]}-{merge}.wld")
+
+
+def load_world(path, merge=MERGE_MODE):
+    """Indlæser en verden fra cachen, og kompilerer den først hvis kilden er ny eller ændret."""
+    cached = cache_path(path, merge)
+    world = _worlds.get(cached)
+    if world is not None:
+        return world
+
+    world = load_cached(cached, lambda: encode_world(path, merge), read_world, merge)
+    _worlds[cached] = world
+    return world
+
+
+def generate_world(seed, screens_x, screens_y):
+    """En verden af tilfældige baner fra LevelGenerator, screens_x x screens_y skærme.
+
+    Hver skærm kan gennemføres for sig. Gulvene går hele vejen på tværs, så man
+    kan gå fra skærm til skærm, og man kommer ned til skærmen under ved at
+    sprænge hul i gulvet. Returnerer rækkerne med startpunkt 1 og 2 i den første skærm.
+    """
+    rows = []
+    for sy in range(screens_y):
+        screens = [generate_level(seed + sy * screens_x + sx)[0] for sx in range(screens_x)]
+        rows.extend("".join(screen[row] for screen in screens) for row in range(ROWS))
+    for number, (x, y) in enumerate(SPAWN_POINTS, 1):
+        row, col = int(y // TILE_HEIGHT), int(x // TILE_WIDTH)
+        rows[row] = rows[row][:col] + str(number) + rows[row][col + 1:]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kompilér en stor verden, eller lav en ny.")
+    parser.add_argument("path", help="verdenen (samme format som banerne i levels/)")
+    parser.add_argument("--generate", action="store_true", help="lav en ny tilfældig verden i path")
+    parser.add_argument("--screens", default="10x3", help="størrelse i skærme (bredde x højde) med --generate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.generate:
+        screens_x, screens_y = (int(value) for value in args.screens.lower().split("x"))
+        rows = generate_world(args.seed, screens_x, screens_y)
+        os.makedirs(os.path.dirname(os.path.abspath(args.path)), exist_ok=True)
+        with open(args.path, "w", encoding="utf-8") as f:
+            f.write(f"# {screens_x} x {screens_y} skærme, python World.py --generate --seed {args.seed}\n")
+            f.write("\n".join(rows) + "\n")
+
+    world = load_world(args.path)
+    chunk_bytes = CHUNK_ROWS * CHUNK_COLUMNS
+    print(f"{world.name}: {world.columns} x {world.rows} felter, {world.width} x {world.height} pixels, "
+          f"{world.chunks_x} x {world.chunks_y} bidder ({world.chunks_x * world.chunks_y} skærme), "
+          f"{len(world.spans)} platforme, start {world.spawn_points}")
+    print(f"Cache: {cache_path(args.path)} ({len(world.buffer)} bytes). "
+          f"Højst {RESIDENT_CHUNKS} bidder i hukommelsen ({RESIDENT_CHUNKS * chunk_bytes} bytes tiles)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from Env import VectorBomberEnv, game_observation
+from Replay import INPUT_TABLE
+from Simulation import GameState
+
+
+@pytest.mark.parametrize("rules", [
+    {},
+    {"chain_reactions": True},
+    {"player_count": 5},
+    {"merge": None},
+    {"merge": "rows", "chain_reactions": True, "explosion_radius": 60},
+])
+def test_vector_env_matches_game_state(rules):
+    """VectorBomberEnv og GameState giver de samme kampe tick for tick på de samme handlinger."""
+    num_envs = 4
+    env = VectorBomberEnv(num_envs, max_ticks=10 ** 9, **rules)
+    env.reset()
+    games = [GameState(**rules) for _ in range(num_envs)]
+    rng = np.random.default_rng(0)
+    deaths = 0
+
+    for tick in range(1500):
+        actions = rng.integers(0, 16, size=(num_envs, env.num_players))
+        observation, rewards, dones, info = env.step(actions)
+        deaths += int((rewards < 0).sum())
+        for index, game in enumerate(games):
+            game.step([INPUT_TABLE[int(action)] for action in actions[index]])
+            if dones[index]:
+                assert info["winner"][index] == game.winner
+                games[index] = GameState(**rules)
+                continue
+            expected = game_observation(game)
+            assert np.array_equal(observation["players"][index], expected["players"]), tick
+            assert np.array_equal(observation["tiles"][index], expected["tiles"]), tick
+            assert np.array_equal(observation["bombs"][index][:len(expected["bombs"])], expected["bombs"]), tick
+
+    # Kampene skal faktisk have eksplosioner og dødsfald med
+    assert deaths > 0
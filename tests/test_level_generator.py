@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+import pytest
+
+from LevelGenerator import MAX_AIR_TICKS, generate_level, random_tiles, surfaces, tile_rows, validate
+from Levels import LEVEL_DIR, level_files, load_level
+from Map import span_rect
+from Simulation import COLUMNS, PLAYER_SIZE, ROWS, TILE_HEIGHT, TILE_WIDTH, GameState
+
+# To spillere der står på gulvet i række 16
+FLOOR_SPAWNS = [(200, 495), (800, 495)]
+IDLE = {}
+MAX_WALK_TICKS = 400
+
+
+def hold(*keys):
+    return dict.fromkeys(keys, True)
+
+
+def fly(game, player, inputs_for):
+    """Opdaterer spilleren til den lander. Returnerer (x, y), eller None hvis den dør eller aldrig lander."""
+    for tick in range(MAX_AIR_TICKS):
+        deaths = len(game.events)
+        player.update(inputs_for(tick), game)
+        if len(game.events) > deaths:
+            return None
+        if player.on_ground:
+            return player.rect.topleft
+    return None
+
+
+def place(player, x, y, on_ground):
+    player.rect.topleft = (x, y)
+    player.velocity_y = 0
+    player.on_ground = on_ground
+
+
+def replay(tiles, spawn):
+    """Fladerne (række, første kolonne) spilleren kan nå fra spawn i GameState.
+
+    Spilleren går langs hver flade tick for tick og prøver fra hver plads et hop med fuld
+    fart til hver side og et hop lige op med siden først fra toppen. Går den ud over en
+    kant, falder den videre med tasten holdt nede.
+    """
+    game = GameState(tile_rows(tiles), [spawn])
+    player = game.players[0]
+    _, rows, col0, col1 = surfaces(tiles[None])
+    targets = [(span_rect((first, row, end, row + 1), TILE_WIDTH, TILE_HEIGHT), (row, first))
+               for row, first, end in zip(rows.tolist(), col0.tolist(), col1.tolist())]
+    jumps = []
+    for key in ("left", "right"):
+        jumps.append(lambda tick, key=key: hold("up", key) if tick == 0 else hold(key))
+        jumps.append(lambda tick, key=key: hold("up") if tick == 0 else hold(key) if player.velocity_y >= 0 else IDLE)
+
+    place(player, spawn[0] - PLAYER_SIZE // 2, spawn[1] - PLAYER_SIZE // 2, False)
+    landed = fly(game, player, lambda tick: IDLE)
+    queue = [] if landed is None else [landed]
+    seen, reached = set(), set()
+    while queue:
+        start = queue.pop()
+        if start in seen:
+            continue
+        for key in ("left", "right"):
+            place(player, *start, True)
+            for _ in range(MAX_WALK_TICKS):
+                x, y = player.rect.topleft
+                if (x, y) not in seen:
+                    seen.add((x, y))
+                    reached |= {name for rect, name in targets
+                                if rect.top == y + PLAYER_SIZE and rect.left < x + PLAYER_SIZE and rect.right > x}
+                    for jump in jumps:
+                        place(player, x, y, True)
+                        landed = fly(game, player, jump)
+                        if landed is not None and landed not in seen:
+                            queue.append(landed)
+                    place(player, x, y, True)
+                deaths = len(game.events)
+                player.update(hold(key), game)
+                if len(game.events) > deaths:
+                    break
+                if not player.on_ground:
+                    landed = fly(game, player, lambda tick: hold(key))
+                    if landed is not None:
+                        queue.append(landed)
+                    break
+                if player.rect.topleft == (x, y):
+                    break
+    return reached, {name for _, name in targets}
+
+
+def stairs():
+    """Gulv, et trin i række 13 og en hylde i række 11 der kun kan nås fra trinnet."""
+    tiles = np.zeros((ROWS, COLUMNS), dtype=bool)
+    tiles[16] = True
+    tiles[13, 10:21] = True
+    tiles[11, 27:51] = True
+    return tiles
+
+
+def test_shipped_levels():
+    bombs = load_level(os.path.join(LEVEL_DIR, "01-bombs.json"))
+    assert validate(np.array(bombs.tiles, dtype=bool), bombs.spawn_points)
+    # Tårnbanen har en flade under et hængende felt, hvor hullerne ved siden af er
+    # smallere end spilleren; den kan ikke nås og skal afvises
+    towers = load_level(os.path.join(LEVEL_DIR, "03-towers.txt"))
+    tiles = np.array(towers.tiles, dtype=bool)
+    assert not validate(tiles, towers.spawn_points)
+    reached, everything = replay(tiles, towers.spawn_points[0])
+    assert reached != everything
+
+
+def validated_levels():
+    for seed in range(3):
+        rows, spawn_points, _ = generate_level(seed)
+        yield pytest.param(np.array([[tile == "X" for tile in row] for row in rows]), spawn_points,
+                           id=f"generated-{seed}")
+    for path in level_files():
+        level = load_level(path)
+        tiles = np.array(level.tiles, dtype=bool)
+        if validate(tiles, level.spawn_points):
+            yield pytest.param(tiles, level.spawn_points, id=os.path.basename(path))
+
+
+@pytest.mark.parametrize("tiles, spawn_points", list(validated_levels()))
+def test_validated_levels_can_be_replayed(tiles, spawn_points):
+    # Valideringen må afvise for meget, men alt den godkender skal kunne nås i spillet
+    for spawn in spawn_points:
+        reached, everything = replay(tiles, spawn)
+        assert reached == everything, (spawn, sorted(everything - reached))
+
+
+def test_stairs_validate():
+    assert validate(stairs(), FLOOR_SPAWNS)
+
+
+def test_ceiling_over_the_only_route_is_rejected():
+    # Et loft lige over trinnet: man kan gå op på trinnet, men ikke hoppe videre derfra
+    tiles = stairs()
+    tiles[10, 8:25] = True
+    assert not validate(tiles, FLOOR_SPAWNS)
+
+
+def test_batch_matches_single_candidates():
+    candidates = random_tiles(np.random.default_rng(3), count=40)
+    assert validate(candidates).tolist() == [validate(tiles) for tiles in candidates]
+
+
+def test_generated_levels_are_deterministic_and_valid():
+    for seed in range(5):
+        rows, spawn_points, _ = generate_level(seed)
+        assert generate_level(seed)[0] == rows
+        assert validate(np.array([[tile == "X" for tile in row] for row in rows]), spawn_points)
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+import Levels
+from Levels import LEVEL_DIR, LevelRotation, cache_path, level_files, load_level, parse_level
+from Map import tile_spans
+
+
+@pytest.fixture
+def level_source(tmp_path, monkeypatch):
+    """En kopi af classic-banen i en tom mappe, med sin egen cache."""
+    monkeypatch.setattr(Levels, "LEVEL_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(Levels, "_levels", {})
+    path = tmp_path / "classic.json"
+    with open(os.path.join(LEVEL_DIR, "02-classic.json"), encoding="utf-8") as f:
+        path.write_text(f.read(), encoding="utf-8")
+    return str(path)
+
+
+def test_every_level_compiles():
+    for path in level_files():
+        level = load_level(path)
+        _, rows, spawn_points = parse_level(path)
+        assert list(level) == rows
+        assert level.spans.tolist() == [list(span) for span in tile_spans(rows)]
+        assert level.spawn_points == spawn_points
+
+
+def test_classic_spawns():
+    assert load_level(os.path.join(LEVEL_DIR, "02-classic.json")).spawn_points == [(200, 100), (600, 100)]
+
+
+@pytest.mark.parametrize("garbage", [b"", b"JMLV\x01", b"not a level cache at all"])
+def test_broken_cache_is_recompiled(level_source, garbage):
+    cached = cache_path(level_source)
+    os.makedirs(os.path.dirname(cached))
+    with open(cached, "wb") as f:
+        f.write(garbage)
+
+    level = load_level(level_source)
+    assert level.spawn_points == [(200, 100), (600, 100)]
+    assert os.path.getsize(cached) > len(garbage)
+
+
+def test_truncated_cache_is_recompiled(level_source):
+    cached = cache_path(level_source)
+    load_level(level_source)
+    with open(cached, "r+b") as f:
+        f.truncate(os.path.getsize(cached) - 10)
+    Levels._levels.clear()
+
+    level = load_level(level_source)
+    assert np.array_equal(level.tiles, Levels.level_tiles(parse_level(level_source)[1]))
+
+
+def test_stale_caches_are_pruned(level_source):
+    old = cache_path(level_source)
+    load_level(level_source)
+    other_merge = cache_path(level_source, None)
+    load_level(level_source, None)
+
+    # Banen ændres: en ny hash, og den gamle cache med samme merge slettes
+    with open(level_source, "a", encoding="utf-8") as f:
+        f.write("\n")
+    Levels._levels.clear()
+    load_level(level_source)
+    new = cache_path(level_source)
+    assert new != old
+    assert os.path.exists(new) and not os.path.exists(old)
+    assert os.path.exists(other_merge)
+
+
+def test_rotation_skips_broken_levels(level_source, capsys):
+    directory = os.path.dirname(level_source)
+    with open(os.path.join(directory, "00-broken.txt"), "w", encoding="utf-8") as f:
+        f.write("XX..\n")
+    rotation = LevelRotation(directory)
+    assert rotation.next().spawn_points == [(200, 100), (600, 100)]
+    assert rotation.next().spawn_points == [(200, 100), (600, 100)]
+    assert "00-broken.txt" in capsys.readouterr().err
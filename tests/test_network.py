@@ -0,0 +1,62 @@
+import asyncio
+import random
+
+import numpy as np
+
+from Network import (CLIENT_TIMEOUT, JOIN, SNAPSHOT_INTERVAL, UDP_OVERHEAD, GameServer, decode_snapshot,
+                     encode_snapshot, loopback)
+from Policies import RandomPolicy
+
+
+class FakeTransport:
+    def __init__(self):
+        self.packets = []
+
+    def sendto(self, packet, addr=None):
+        self.packets.append((packet, addr))
+
+
+def same_state(state, other):
+    return state[:4] == other[:4] and np.array_equal(state[4], other[4])
+
+
+def test_snapshot_round_trip():
+    """Et delta mod en ældre baseline giver præcis serverens state igen."""
+    server = GameServer()
+    game = server.game
+    policies = [RandomPolicy(random.Random(index)) for index in range(len(game.players))]
+    states = []
+    for _ in range(3000):
+        game.step([policy(game, index) for index, policy in enumerate(policies)])
+        if game.tick % SNAPSHOT_INTERVAL == 0:
+            states.append(server.capture())
+
+    num_players, num_tiles = len(game.players), game.map.tiles.size
+    for index, state in enumerate(states):
+        full = decode_snapshot(encode_snapshot(state), {}, num_players, num_tiles)
+        assert same_state(full, state)
+        if index >= 3:
+            baseline = states[index - 3]
+            decoded = decode_snapshot(encode_snapshot(state, baseline), {baseline[0]: baseline}, num_players, num_tiles)
+            assert same_state(decoded, state)
+
+
+def test_loopback_clients_follow_server_under_1kb():
+    server, clients = asyncio.run(loopback(seconds=20, speed=20))
+    seconds = server.game.tick / 60
+    for client in clients:
+        assert client.index is not None and client.latest is not None
+        # Klientens kopi er det snapshot serveren sendte for det tick
+        assert same_state(client.latest, server.history[client.latest[0]])
+        remote = next(other for other in server.clients.values() if other.index == client.index)
+        assert (remote.bytes_sent + remote.packets_sent * UDP_OVERHEAD) / seconds < 1000
+
+
+def test_silent_client_is_dropped():
+    server = GameServer()
+    server.connection_made(FakeTransport())
+    server.datagram_received(bytes((JOIN,)), ("127.0.0.1", 1))
+    assert len(server.clients) == 1
+    for _ in range(CLIENT_TIMEOUT + SNAPSHOT_INTERVAL * 2):
+        server.tick()
+    assert not server.clients
@@ -0,0 +1,41 @@
+import random
+import struct
+
+import pytest
+
+from Policies import RandomPolicy
+from Replay import HEADER, MAGIC, Replay, ReplayRecorder
+from Rollback import same_state
+from Simulation import GameState
+
+RULES = {"bomb_timer": 2000, "explosion_radius": 60, "jump_strength": -14, "chain_reactions": True,
+         "merge": "rows"}
+
+
+def test_round_trip_replays_the_same_match(tmp_path):
+    path = tmp_path / "kamp.jmr"
+    game = GameState(**RULES)
+    policies = [RandomPolicy(random.Random(index)) for index in range(len(game.players))]
+    with ReplayRecorder(path, game, seed=7, level_name="test") as recorder:
+        for _ in range(1200):
+            inputs = [policy(game, index) for index, policy in enumerate(policies)]
+            recorder.record(inputs)
+            game.step(inputs)
+
+    replay = Replay.load(path)
+    assert (replay.seed, replay.level_name, len(replay)) == (7, "test", 1200)
+    played = replay.game
+    assert played.bomb_fuse_ticks == game.bomb_fuse_ticks and played.map.merge == "rows"
+    assert same_state(replay.run().snapshot(), game.snapshot())
+
+    # Spol tilbage og frem igen
+    replay.seek(300)
+    replay.seek(1200)
+    assert same_state(replay.game.snapshot(), game.snapshot())
+
+
+def test_old_version_is_rejected(tmp_path):
+    path = tmp_path / "gammel.jmr"
+    path.write_bytes(HEADER.pack(MAGIC, 1, 0, 20, 80, 2, 0) + struct.pack("<4h", 0, 0, 0, 0))
+    with pytest.raises(ValueError, match="version 1"):
+        Replay.load(path)
@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from Policies import RandomPolicy
+from Rollback import MAX_ROLLBACK, run_peers, same_state
+from Simulation import GameState
+
+
+@pytest.mark.parametrize("delay", [2, MAX_ROLLBACK])
+def test_peers_stay_in_sync(delay):
+    sessions, _ = run_peers(30, delay, seed=delay)
+    assert sum(session.rollbacks for session in sessions) > 0
+    assert same_state(sessions[0].game.snapshot(), sessions[1].game.snapshot())
+
+
+@pytest.mark.parametrize("chain_reactions", [False, True])
+def test_restore_and_resimulate_matches(chain_reactions):
+    """Et tick simuleret igen fra et snapshot giver den samme tilstand som første gang."""
+    game = GameState(chain_reactions=chain_reactions)
+    policies = [RandomPolicy(random.Random(index)) for index in range(len(game.players))]
+    inputs = []
+    snapshots = []
+    for _ in range(2000):
+        snapshots.append(game.snapshot())
+        tick_inputs = [policy(game, index) for index, policy in enumerate(policies)]
+        inputs.append(tick_inputs)
+        game.step(tick_inputs)
+    snapshots.append(game.snapshot())
+
+    for start in range(0, 2000, 97):
+        game.restore(snapshots[start])
+        for tick in range(start, min(start + MAX_ROLLBACK, 2000)):
+            game.step(inputs[tick])
+            assert same_state(game.snapshot(), snapshots[tick + 1])
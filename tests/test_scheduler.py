@@ -0,0 +1,53 @@
+from Scheduler import TickScheduler
+
+
+def test_timers_run_in_due_then_schedule_order():
+    timers = TickScheduler()
+    fired = []
+    timers.schedule(3, fired.append, "c")
+    timers.schedule(2, fired.append, "a")
+    timers.schedule(2, fired.append, "b")
+    timers.run(1)
+    assert fired == []
+    timers.run(3)
+    assert fired == ["a", "b", "c"]
+    assert len(timers) == 0
+
+
+def test_cancel_and_reschedule():
+    timers = TickScheduler()
+    fired = []
+    cancelled = timers.schedule(2, fired.append, "cancelled")
+    moved = timers.schedule(2, fired.append, "moved")
+    timers.schedule(3, fired.append, "kept")
+    timers.cancel(cancelled)
+    timers.cancel(cancelled)
+    timers.reschedule(moved, 5)
+    assert len(timers) == 2
+    timers.run(4)
+    assert fired == ["kept"]
+    timers.run(5)
+    assert fired == ["kept", "moved"]
+
+    # En udløbet timer kan sættes i gang igen
+    timers.reschedule(moved, 7)
+    timers.run(7)
+    assert fired == ["kept", "moved", "moved"]
+    assert len(timers) == 0
+
+
+def test_cancelling_many_timers_inside_a_callback():
+    # Over 64 aflysninger rydder heapen op midt i run(); timere sat undervejs skal stadig køre
+    timers = TickScheduler()
+    fired = []
+    victims = [timers.schedule(2, fired.append, index) for index in range(200)]
+
+    def cancel_most():
+        for timer in victims[:150]:
+            timers.cancel(timer)
+        timers.schedule(2, fired.append, "late")
+
+    timers.schedule(1, cancel_most)
+    timers.run(2)
+    assert fired == list(range(150, 200)) + ["late"]
+    assert len(timers) == 0 and timers.stale == 0
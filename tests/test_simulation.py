@@ -0,0 +1,63 @@
+import hashlib
+import random
+
+import pytest
+
+from Policies import ChasePolicy
+from Replay import INPUT_TABLE
+from Simulation import PLAYER_SIZE, GameState
+
+IDLE = {"up": False, "left": False, "right": False, "drop": False}
+
+# Hashes af trajectory(): ændrer en af dem sig, har en ændring flyttet spillet
+TRAJECTORY_HASHES = {False: "3294287446334a43", True: "dd33b55f221dde7e"}
+
+
+def trajectory(chain_reactions, seeds=4, ticks=1500):
+    """Hash af spillere og bomber efter hvert tick i dueller med tilfældige taster mod en ChasePolicy."""
+    digest = hashlib.sha256()
+    for seed in range(seeds):
+        game = GameState(chain_reactions=chain_reactions)
+        rng = random.Random(seed)
+        chase = ChasePolicy(random.Random(seed))
+        for _ in range(ticks):
+            game.step([INPUT_TABLE[rng.randrange(len(INPUT_TABLE))], chase(game, 1)])
+            if game.winner is not None:
+                game.reset()
+            digest.update(repr(([tuple(player.rect) for player in game.players],
+                                [player.velocity_y for player in game.players],
+                                [player.score for player in game.players],
+                                [tuple(bomb.rect) for bomb in game.bombs])).encode())
+    return digest.hexdigest()[:16]
+
+
+@pytest.mark.parametrize("chain_reactions", [False, True])
+def test_trajectory_hash(chain_reactions):
+    assert trajectory(chain_reactions) == TRAJECTORY_HASHES[chain_reactions]
+
+
+def test_fast_fall_lands_on_platform():
+    # Et fald på flere felter i et tick må ikke gå igennem platformen
+    game = GameState()
+    platform = max(game.map.platforms, key=lambda rect: (rect.width, rect.top))
+    player = game.players[0]
+    player.rect.midbottom = (platform.centerx, platform.top - 1)
+    player.velocity_y = PLAYER_SIZE * 4
+    game.step([IDLE, IDLE])
+    assert player.rect.bottom == platform.top
+    assert player.on_ground
+
+
+def test_explosions_leave_snapshots_alone():
+    # Grid og platforme deles med snapshottet og må kun kopieres, ikke ændres
+    game = GameState()
+    state = game.map.snapshot()
+    tiles, platforms, grid = state
+    cells = {cell: list(bucket) for cell, bucket in grid.cells.items()}
+    for platform in platforms[::3]:
+        game.map.carve(platform.center, 40)
+    assert game.map.tiles is not tiles
+    assert {cell: list(bucket) for cell, bucket in grid.cells.items()} == cells
+
+    game.map.restore(state)
+    assert game.map.platforms == list(platforms)